@@ -0,0 +1,6 @@
+"""Fake ``adsk`` package for running the add-in outside Fusion.
+
+Put the ``bench`` folder first on ``sys.path`` and ``import adsk.core`` picks
+this up instead of Fusion's. See bench/README.md.
+"""
+from . import core, fusion
@@ -0,0 +1,152 @@
+"""Call recording shared by the fake adsk modules.
+
+Every API method and property of the fake goes through ``recorder``, which
+counts the calls and adds up a modeled wall time from a per-call latency
+table. Feature operations additionally charge a recompute cost that grows
+with the amount of geometry they touch, e.g. the number of pattern instances.
+"""
+
+import collections
+import functools
+import time
+
+
+# Modeled costs in seconds. These are a model of where Fusion spends time,
+# not measurements; override them with Recorder.configure().
+DEFAULT_LATENCY = 0.00005
+DEFAULT_LATENCIES = {
+    'Sketches.add': 0.005,
+    'SketchDimensions.addDistanceDimension': 0.002,
+    'SketchDimensions.addDiameterDimension': 0.002,
+    'GeometricConstraints.addCoincident': 0.001,
+    'GeometricConstraints.addHorizontal': 0.001,
+    'GeometricConstraints.addVertical': 0.001,
+    'GeometricConstraints.addMidPoint': 0.001,
+    'ModelParameter.expression': 0.001,
+    'UserParameters.add': 0.002,
+    'UserParameter.expression': 0.002,
+    'ExtrudeFeatures.add': 0.02,
+    'ExtrudeFeatures.addSimple': 0.02,
+    'RevolveFeatures.add': 0.03,
+    'MirrorFeatures.add': 0.02,
+    'MoveFeatures.add': 0.01,
+    'CombineFeatures.add': 0.02,
+    'RectangularPatternFeatures.add': 0.02,
+    'BaseFeatures.add': 0.005,
+    'Features.copyPasteBodies': 0.01,
+    'Occurrences.addNewComponent': 0.01,
+    'Occurrences.addExistingComponent': 0.002,
+    'BRepBodies.add': 0.005,
+    'TemporaryBRepManager.createBox': 0.0005,
+    'TemporaryBRepManager.createCylinderOrCone': 0.0005,
+    'TemporaryBRepManager.copy': 0.0005,
+    'TemporaryBRepManager.booleanOperation': 0.003,
+    # recompute charges, per unit of work
+    'recompute.sketchEntity': 0.0002,
+    'recompute.patternInstance': 0.008,
+    'recompute.occurrenceInstance': 0.0005,
+    'recompute.graphicsTriangle': 0.000001,
+    'recompute.combineTool': 0.015,
+    'recompute.timelineFeature': 0.001,
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = dict(DEFAULT_LATENCIES)
+        self.defaultLatency = DEFAULT_LATENCY
+        self.realtime = False
+        self.reset()
+
+    def reset(self):
+        self.calls = collections.Counter()
+        self.charges = collections.Counter()
+        self.modeledTime = 0.0
+
+    def configure(self, latencies=None, defaultLatency=None, realtime=None):
+        """Change the latency table; with ``realtime`` the costs are also slept."""
+        if latencies:
+            self.latencies.update(latencies)
+        if defaultLatency is not None:
+            self.defaultLatency = defaultLatency
+        if realtime is not None:
+            self.realtime = realtime
+
+    def record(self, name):
+        self.calls[name] += 1
+        self._spend(self.latencies.get(name, self.defaultLatency))
+
+    def charge(self, name, units=1):
+        if units <= 0:
+            return
+        name = 'recompute.' + name
+        self.charges[name] += units
+        self._spend(self.latencies.get(name, 0.0) * units)
+
+    @property
+    def callCount(self):
+        return sum(self.calls.values())
+
+    def _spend(self, seconds):
+        self.modeledTime += seconds
+        if self.realtime and seconds:
+            time.sleep(seconds)
+
+
+recorder = Recorder()
+
+
+def api(fn):
+    """Record calls to a fake API method as ``Class.method``."""
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        recorder.record(f'{type(self).__name__}.{fn.__name__}')
+        return fn(self, *args, **kwargs)
+    return wrapper
+
+
+def api_static(owner):
+    """Record calls to a fake static API method, e.g. ``Point3D.create``."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            recorder.record(f'{owner}.{fn.__name__}')
+            return fn(*args, **kwargs)
+        return staticmethod(wrapper)
+    return decorate
+
+
+def api_property(fn):
+    """A read-only API property; reading it counts as a call."""
+    return property(api(fn))
+
+
+def api_attribute(name, default=None):
+    """A read/write API property backed by ``_<name>``; setting it counts as a call."""
+    private = '_' + name
+
+    def getter(self):
+        return getattr(self, private, default)
+
+    def setter(self, value):
+        recorder.record(f'{type(self).__name__}.{name}')
+        setattr(self, private, value)
+
+    return property(getter, setter)
+
+
+class ApiObject:
+    """Base class of the fake objects; ``isValid`` like the real API."""
+    isValid = True
+
+    @property
+    def attributes(self):
+        from .core import Attributes
+        recorder.record(f'{type(self).__name__}.attributes')
+        if '_attributes' not in self.__dict__:
+            self._attributes = Attributes(self)
+        return self._attributes
+
+    @property
+    def objectType(self):
+        return f'{type(self).__module__}::{type(self).__name__}'
@@ -0,0 +1,955 @@
+"""Fake of the parts of ``adsk.core`` the add-in uses.
+
+Only behaviour the add-in depends on is modelled. Calls are recorded by
+``adsk._fake.recorder``.
+"""
+
+import math
+
+from ._fake import ApiObject, api, api_attribute, api_property, api_static, recorder
+
+
+# ---------------------------------------------------------------- enums
+
+class LogLevels:
+    InfoLogLevel = 0
+    WarningLogLevel = 1
+    ErrorLogLevel = 2
+
+
+class LogTypes:
+    ConsoleLogType = 0
+    FileLogType = 1
+
+
+class DropDownStyles:
+    LabeledIconDropDownStyle = 0
+    CheckBoxDropDownStyle = 1
+    TextListDropDownStyle = 2
+
+
+class MessageBoxButtonTypes:
+    OKButtonType = 0
+    OKCancelButtonType = 1
+    RetryCancelButtonType = 2
+    YesNoButtonType = 3
+    YesNoCancelButtonType = 4
+
+
+class MessageBoxIconTypes:
+    NoIconIconType = 0
+    CriticalIconType = 16
+    QuestionIconType = 32
+    WarningIconType = 48
+    InformationIconType = 64
+
+
+class DialogResults:
+    DialogError = -1
+    DialogOK = 0
+    DialogCancel = 1
+    DialogYes = 2
+    DialogNo = 3
+
+
+# ---------------------------------------------------------------- geometry
+
+class Point3D(ApiObject):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = x, y, z
+
+    @api_static('Point3D')
+    def create(x=0.0, y=0.0, z=0.0):
+        return Point3D(x, y, z)
+
+    @api
+    def asArray(self):
+        return (self.x, self.y, self.z)
+
+    @api
+    def copy(self):
+        return Point3D(self.x, self.y, self.z)
+
+    @api
+    def translateBy(self, vector):
+        self.x += vector.x
+        self.y += vector.y
+        self.z += vector.z
+        return True
+
+    @api
+    def distanceTo(self, point):
+        return math.dist(self.asArray(), point.asArray())
+
+
+class Vector3D(ApiObject):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = x, y, z
+
+    @api_static('Vector3D')
+    def create(x=0.0, y=0.0, z=0.0):
+        return Vector3D(x, y, z)
+
+    @api
+    def asArray(self):
+        return (self.x, self.y, self.z)
+
+
+class Matrix3D(ApiObject):
+    def __init__(self):
+        self.translation = Vector3D()
+
+    @api_static('Matrix3D')
+    def create():
+        return Matrix3D()
+
+    @api
+    def setToIdentity(self):
+        self.translation = Vector3D()
+        return True
+
+
+class OrientedBoundingBox3D(ApiObject):
+    def __init__(self, centerPoint, lengthDirection, widthDirection, length, width, height):
+        self.centerPoint = centerPoint
+        self.lengthDirection, self.widthDirection = lengthDirection, widthDirection
+        self.length, self.width, self.height = length, width, height
+
+    @api_static('OrientedBoundingBox3D')
+    def create(centerPoint, lengthDirection, widthDirection, length, width, height):
+        return OrientedBoundingBox3D(centerPoint, lengthDirection, widthDirection, length, width, height)
+
+
+class Color(ApiObject):
+    def __init__(self, red, green, blue, opacity):
+        self.red, self.green, self.blue, self.opacity = red, green, blue, opacity
+
+    @api_static('Color')
+    def create(red, green, blue, opacity):
+        return Color(red, green, blue, opacity)
+
+
+class ObjectCollection(ApiObject):
+    def __init__(self):
+        self._items = []
+
+    @api_static('ObjectCollection')
+    def create():
+        return ObjectCollection()
+
+    @api
+    def add(self, item):
+        self._items.append(item)
+        return True
+
+    @api
+    def item(self, index):
+        return self._items[index] if 0 <= index < len(self._items) else None
+
+    @api
+    def clear(self):
+        self._items = []
+        return True
+
+    @api_property
+    def count(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ValueInput(ApiObject):
+    def __init__(self, realValue=None, stringValue=None):
+        self.realValue = realValue
+        self.stringValue = stringValue
+
+    @api_static('ValueInput')
+    def createByReal(value):
+        return ValueInput(realValue=value)
+
+    @api_static('ValueInput')
+    def createByString(value):
+        return ValueInput(stringValue=value)
+
+    @property
+    def valueType(self):
+        return 1 if self.stringValue is not None else 0
+
+    def _expression(self):
+        return self.stringValue if self.stringValue is not None else repr(self.realValue)
+
+
+# ---------------------------------------------------------------- attributes
+
+class Attribute(ApiObject):
+    def __init__(self, owner, groupName, name, value):
+        self._owner = owner
+        self.groupName, self.name, self.value = groupName, name, value
+
+    @api_property
+    def parent(self):
+        return self._owner
+
+    @api
+    def deleteMe(self):
+        self._owner._attributes._items.remove(self)
+        self.isValid = False
+        return True
+
+
+class Attributes(ApiObject):
+    def __init__(self, owner):
+        self._owner = owner
+        self._items = []
+
+    @api
+    def add(self, groupName, name, value):
+        existing = self._find(groupName, name)
+        if existing is not None:
+            existing.value = value
+            return existing
+        attribute = Attribute(self._owner, groupName, name, value)
+        self._items.append(attribute)
+        return attribute
+
+    @api
+    def itemByName(self, groupName, name):
+        return self._find(groupName, name)
+
+    @api_property
+    def count(self):
+        return len(self._items)
+
+    def _find(self, groupName, name):
+        for attribute in self._items:
+            if attribute.groupName == groupName and attribute.name == name:
+                return attribute
+        return None
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+
+# ---------------------------------------------------------------- units
+
+# internal length unit is the centimetre
+_LENGTH_UNITS = {'mm': 0.1, 'cm': 1.0, 'm': 100.0, 'in': 2.54, 'ft': 30.48, '': 1.0}
+
+
+class UnitsManager(ApiObject):
+    def __init__(self, defaultLengthUnits='mm'):
+        self._defaultLengthUnits = defaultLengthUnits
+
+    @api_property
+    def defaultLengthUnits(self):
+        return self._defaultLengthUnits
+
+    @api
+    def convert(self, valueInInputUnits, inputUnits, outputUnits):
+        return valueInInputUnits * _LENGTH_UNITS[inputUnits] / _LENGTH_UNITS[outputUnits]
+
+    def _internal(self, text, units):
+        """Value of a plain number typed into an input with ``units``, in cm."""
+        return float(text) * _LENGTH_UNITS.get(units, 1.0)
+
+
+# ---------------------------------------------------------------- events
+
+class Event(ApiObject):
+    def __init__(self, name='event'):
+        self.name = name
+        self._handlers = []
+
+    def remove(self, handler):
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+            return True
+        return False
+
+    def _add(self, handler):
+        self._handlers.append(handler)
+        return True
+
+    def _fire(self, args):
+        """Deliver ``args`` to every handler, like Fusion does."""
+        for handler in list(self._handlers):
+            handler.notify(args)
+
+
+class CommandCreatedEvent(Event):
+    @api
+    def add(self, handler: 'CommandCreatedEventHandler') -> bool:
+        return self._add(handler)
+
+
+class CommandEvent(Event):
+    @api
+    def add(self, handler: 'CommandEventHandler') -> bool:
+        return self._add(handler)
+
+
+class InputChangedEvent(Event):
+    @api
+    def add(self, handler: 'InputChangedEventHandler') -> bool:
+        return self._add(handler)
+
+
+class ValidateInputsEvent(Event):
+    @api
+    def add(self, handler: 'ValidateInputsEventHandler') -> bool:
+        return self._add(handler)
+
+
+class CustomEvent(Event):
+    def __init__(self, eventId):
+        super().__init__(eventId)
+        self.eventId = eventId
+
+    @api
+    def add(self, handler: 'CustomEventHandler') -> bool:
+        return self._add(handler)
+
+
+class DocumentEvent(Event):
+    @api
+    def add(self, handler: 'DocumentEventHandler') -> bool:
+        return self._add(handler)
+
+
+class _EventHandler:
+    def __init__(self):
+        pass
+
+    def notify(self, args):
+        pass
+
+
+class CommandCreatedEventHandler(_EventHandler):
+    pass
+
+
+class CommandEventHandler(_EventHandler):
+    pass
+
+
+class InputChangedEventHandler(_EventHandler):
+    pass
+
+
+class ValidateInputsEventHandler(_EventHandler):
+    pass
+
+
+class CustomEventHandler(_EventHandler):
+    pass
+
+
+class DocumentEventHandler(_EventHandler):
+    pass
+
+
+class EventArgs(ApiObject):
+    def __init__(self, firingEvent=None):
+        self.firingEvent = firingEvent
+
+
+class CommandCreatedEventArgs(EventArgs):
+    def __init__(self, command):
+        super().__init__()
+        self.command = command
+
+
+class CommandEventArgs(EventArgs):
+    def __init__(self, command):
+        super().__init__()
+        self.command = command
+        self.isValidResult = False
+        self.executeFailed = False
+        self.executeFailedMessage = ''
+
+
+class InputChangedEventArgs(EventArgs):
+    def __init__(self, command, changedInput):
+        super().__init__()
+        self.input = changedInput
+        self.inputs = command.commandInputs
+
+
+class ValidateInputsEventArgs(EventArgs):
+    def __init__(self, command):
+        super().__init__()
+        self.inputs = command.commandInputs
+        self.areInputsValid = True
+
+
+class CustomEventArgs(EventArgs):
+    def __init__(self, additionalInfo=''):
+        super().__init__()
+        self.additionalInfo = additionalInfo
+
+
+class DocumentEventArgs(EventArgs):
+    def __init__(self, document):
+        super().__init__()
+        self.document = document
+
+
+# ---------------------------------------------------------------- command inputs
+
+class CommandInput(ApiObject):
+    def __init__(self, parent, id, name):
+        self._parent = parent
+        self.id = id
+        self.name = name
+        self._isVisible = True
+        self._isEnabled = True
+
+    isVisible = api_attribute('isVisible', True)
+    isEnabled = api_attribute('isEnabled', True)
+
+    @api_property
+    def parentCommand(self):
+        return self._parent._command
+
+
+class ValueCommandInput(CommandInput):
+    def __init__(self, parent, id, name, unitType, initialValue):
+        super().__init__(parent, id, name)
+        self.unitType = unitType
+        self._expression = initialValue._expression()
+        self._value = (initialValue.realValue if initialValue.realValue is not None
+                       else parent._unitsManager._internal(initialValue.stringValue, unitType))
+
+    @property
+    def value(self):
+        recorder.record('ValueCommandInput.value')
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        recorder.record('ValueCommandInput.value')
+        self._value = value
+
+    @property
+    def expression(self):
+        recorder.record('ValueCommandInput.expression')
+        return self._expression
+
+    @expression.setter
+    def expression(self, expression):
+        recorder.record('ValueCommandInput.expression')
+        self._expression = expression
+        self._value = self._parent._unitsManager._internal(expression, self.unitType)
+
+
+class BoolValueCommandInput(CommandInput):
+    def __init__(self, parent, id, name, isCheckBox, resourceFolder='', initialValue=False):
+        super().__init__(parent, id, name)
+        self.isCheckBox = isCheckBox
+        self._value = initialValue
+
+    value = api_attribute('value', False)
+
+
+class ListItem(ApiObject):
+    def __init__(self, name, isSelected):
+        self.name = name
+        self.isSelected = isSelected
+
+
+class ListItems(ApiObject):
+    def __init__(self):
+        self._items = []
+
+    @api
+    def add(self, name, isSelected, resourceFolder=''):
+        item = ListItem(name, isSelected)
+        if isSelected:
+            for other in self._items:
+                other.isSelected = False
+        self._items.append(item)
+        return item
+
+    @api
+    def item(self, index):
+        return self._items[index]
+
+    @api_property
+    def count(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+
+class DropDownCommandInput(CommandInput):
+    def __init__(self, parent, id, name, dropDownStyle):
+        super().__init__(parent, id, name)
+        self.dropDownStyle = dropDownStyle
+        self._listItems = ListItems()
+
+    @api_property
+    def listItems(self):
+        return self._listItems
+
+    @api_property
+    def selectedItem(self):
+        for item in self._listItems:
+            if item.isSelected:
+                return item
+        return None
+
+    def _select(self, name):
+        for item in self._listItems:
+            item.isSelected = item.name == name
+
+
+class TextBoxCommandInput(CommandInput):
+    def __init__(self, parent, id, name, formattedText, numRows, isReadOnly):
+        super().__init__(parent, id, name)
+        self._formattedText = formattedText
+        self.numRows = numRows
+        self.isReadOnly = isReadOnly
+
+    formattedText = api_attribute('formattedText', '')
+    text = api_attribute('formattedText', '')
+
+
+class IntegerSpinnerCommandInput(CommandInput):
+    def __init__(self, parent, id, name, min, max, spinStep, initialValue):
+        super().__init__(parent, id, name)
+        self.minimumValue, self.maximumValue, self.spinStep = min, max, spinStep
+        self._value = initialValue
+
+    value = api_attribute('value', 0)
+
+
+class TableCommandInput(CommandInput):
+    def __init__(self, parent, id, name, numberOfColumns, columnRatio):
+        super().__init__(parent, id, name)
+        self.numberOfColumns = numberOfColumns
+        self.columnRatio = columnRatio
+        self._rows = []
+        self._toolbarInputs = []
+        self._selectedRow = -1
+        # inputs made for the table are found by itemById of the dialog, like in Fusion
+        self._commandInputs = CommandInputs(parent._command, parent._unitsManager, parent._inputs)
+
+    maximumVisibleRows = api_attribute('maximumVisibleRows', 4)
+    selectedRow = api_attribute('selectedRow', -1)
+
+    @api_property
+    def commandInputs(self):
+        return self._commandInputs
+
+    @api_property
+    def rowCount(self):
+        return len(self._rows)
+
+    @api
+    def addCommandInput(self, input, row, column, rowSpan=0, columnSpan=0):
+        while len(self._rows) <= row:
+            self._rows.append({})
+        self._rows[row][column] = input
+        return True
+
+    @api
+    def addToolbarCommandInput(self, input):
+        self._toolbarInputs.append(input)
+        return True
+
+    @api
+    def getInputAtPosition(self, row, column):
+        return self._rows[row].get(column) if 0 <= row < len(self._rows) else None
+
+    @api
+    def deleteRow(self, row):
+        for commandInput in self._rows.pop(row).values():
+            self._parent._inputs.remove(commandInput)
+        self._selectedRow = min(self._selectedRow, len(self._rows) - 1)
+        return True
+
+
+class CommandInputs(ApiObject):
+    def __init__(self, command, unitsManager, inputs=None):
+        self._command = command
+        self._unitsManager = unitsManager
+        self._inputs = [] if inputs is None else inputs
+
+    def _add(self, commandInput):
+        self._inputs.append(commandInput)
+        return commandInput
+
+    @api
+    def addValueInput(self, id, name, unitType, initialValue):
+        return self._add(ValueCommandInput(self, id, name, unitType, initialValue))
+
+    @api
+    def addBoolValueInput(self, id, name, isCheckBox, resourceFolder='', initialValue=False):
+        return self._add(BoolValueCommandInput(self, id, name, isCheckBox, resourceFolder, initialValue))
+
+    @api
+    def addDropDownCommandInput(self, id, name, dropDownStyle):
+        return self._add(DropDownCommandInput(self, id, name, dropDownStyle))
+
+    @api
+    def addTextBoxCommandInput(self, id, name, formattedText, numRows, isReadOnly):
+        return self._add(TextBoxCommandInput(self, id, name, formattedText, numRows, isReadOnly))
+
+    @api
+    def addIntegerSpinnerCommandInput(self, id, name, min, max, spinStep, initialValue):
+        return self._add(IntegerSpinnerCommandInput(self, id, name, min, max, spinStep, initialValue))
+
+    @api
+    def addTableCommandInput(self, id, name, numberOfColumns, columnRatio):
+        return self._add(TableCommandInput(self, id, name, numberOfColumns, columnRatio))
+
+    @api
+    def itemById(self, id):
+        for commandInput in self._inputs:
+            if commandInput.id == id:
+                return commandInput
+        return None
+
+    @api
+    def item(self, index):
+        return self._inputs[index]
+
+    @api_property
+    def count(self):
+        return len(self._inputs)
+
+    @api_property
+    def command(self):
+        return self._command
+
+    def __iter__(self):
+        return iter(list(self._inputs))
+
+
+class Command(ApiObject):
+    def __init__(self, parentCommandDefinition, unitsManager):
+        self._parentCommandDefinition = parentCommandDefinition
+        self._commandInputs = CommandInputs(self, unitsManager)
+        self.execute = CommandEvent('execute')
+        self.executePreview = CommandEvent('executePreview')
+        self.inputChanged = InputChangedEvent('inputChanged')
+        self.validateInputs = ValidateInputsEvent('validateInputs')
+        self.destroy = CommandEvent('destroy')
+        self.isOKButtonVisible = True
+        self.okButtonText = 'OK'
+
+    @api_property
+    def commandInputs(self):
+        return self._commandInputs
+
+    @api_property
+    def parentCommandDefinition(self):
+        return self._parentCommandDefinition
+
+    @api
+    def doExecute(self, terminate):
+        self.execute._fire(CommandEventArgs(self))
+        return True
+
+
+# ---------------------------------------------------------------- user interface
+
+class CommandDefinition(ApiObject):
+    def __init__(self, definitions, id, name, tooltip, resourceFolder):
+        self._definitions = definitions
+        self.id = id
+        self.name = name
+        self.tooltip = tooltip
+        self.resourceFolder = resourceFolder
+        self.commandCreated = CommandCreatedEvent('commandCreated')
+
+    @api
+    def deleteMe(self):
+        self._definitions._items.remove(self)
+        self.isValid = False
+        return True
+
+    def _createCommand(self, unitsManager):
+        """Create a command the way a button click does and fire commandCreated."""
+        command = Command(self, unitsManager)
+        self.commandCreated._fire(CommandCreatedEventArgs(command))
+        return command
+
+
+class CommandDefinitions(ApiObject):
+    def __init__(self):
+        self._items = []
+
+    @api
+    def addButtonDefinition(self, id, name, tooltip, resourceFolder=''):
+        definition = CommandDefinition(self, id, name, tooltip, resourceFolder)
+        self._items.append(definition)
+        return definition
+
+    @api
+    def itemById(self, id):
+        for definition in self._items:
+            if definition.id == id:
+                return definition
+        return None
+
+
+class CommandControl(ApiObject):
+    def __init__(self, controls, commandDefinition):
+        self._controls = controls
+        self.id = commandDefinition.id
+        self.commandDefinition = commandDefinition
+        self._isPromoted = False
+
+    isPromoted = api_attribute('isPromoted', False)
+
+    @api
+    def deleteMe(self):
+        self._controls._items.remove(self)
+        self.isValid = False
+        return True
+
+
+class ToolbarControls(ApiObject):
+    def __init__(self):
+        self._items = []
+
+    @api
+    def addCommand(self, commandDefinition, positionID='', isBefore=True):
+        control = CommandControl(self, commandDefinition)
+        self._items.append(control)
+        return control
+
+    @api
+    def itemById(self, id):
+        for control in self._items:
+            if control.id == id:
+                return control
+        return None
+
+
+class ToolbarPanel(ApiObject):
+    def __init__(self, id):
+        self.id = id
+        self._controls = ToolbarControls()
+
+    @api_property
+    def controls(self):
+        return self._controls
+
+
+class _ItemsById(ApiObject):
+    def __init__(self, factory):
+        self._factory = factory
+        self._items = {}
+
+    @api
+    def itemById(self, id):
+        if id not in self._items:
+            self._items[id] = self._factory(id)
+        return self._items[id]
+
+
+class Workspace(ApiObject):
+    def __init__(self, id):
+        self.id = id
+        self._toolbarPanels = _ItemsById(ToolbarPanel)
+
+    @api_property
+    def toolbarPanels(self):
+        return self._toolbarPanels
+
+
+class ProgressDialog(ApiObject):
+    def __init__(self):
+        self.isShowing = False
+        self.wasCancelled = False
+        self.progressValue = 0
+        self.message = ''
+        self.title = ''
+        self.isCancelButtonShown = True
+        self.cancelButtonText = 'Cancel'
+        self.minimumValue = 0
+        self.maximumValue = 100
+
+    @api
+    def show(self, title, message, minimumValue, maximumValue, delay=0):
+        self.title, self.message = title, message
+        self.minimumValue, self.maximumValue = minimumValue, maximumValue
+        self.isShowing = True
+        return True
+
+    @api
+    def hide(self):
+        self.isShowing = False
+        return True
+
+
+class UserInterface(ApiObject):
+    def __init__(self):
+        self._commandDefinitions = CommandDefinitions()
+        self._workspaces = _ItemsById(Workspace)
+        self._messages = []
+        # what the user answers to the next questions; OK or Yes when none are left
+        self._answers = []
+
+    @api_property
+    def commandDefinitions(self):
+        return self._commandDefinitions
+
+    @api_property
+    def workspaces(self):
+        return self._workspaces
+
+    @api
+    def messageBox(self, text, title='', buttons=0, icon=0):
+        self._messages.append(text)
+        if self._answers:
+            return self._answers.pop(0)
+        if buttons in (MessageBoxButtonTypes.YesNoButtonType, MessageBoxButtonTypes.YesNoCancelButtonType):
+            return DialogResults.DialogYes
+        return DialogResults.DialogOK
+
+    @api
+    def createProgressDialog(self):
+        return ProgressDialog()
+
+
+# ---------------------------------------------------------------- application
+
+class Viewport(ApiObject):
+    @api
+    def refresh(self):
+        return True
+
+
+class Document(ApiObject):
+    _created = 0
+
+    def __init__(self, name, product):
+        Document._created += 1
+        self.name = name
+        self.creationId = f'fake-document-{Document._created}'
+        self._product = product
+
+    @api_property
+    def products(self):
+        return [self._product]
+
+    @api_property
+    def design(self):
+        return self._product
+
+    @api
+    def activate(self):
+        return Application.get()._activate(self)
+
+    @api
+    def close(self, saveChanges):
+        return Application.get()._close(self)
+
+
+class Application(ApiObject):
+    _instance = None
+
+    def __init__(self, designFactory=None):
+        self._userInterface = UserInterface()
+        self._designFactory = designFactory
+        self._documents = []
+        self._activeDocument = None
+        self._log = []
+        self._customEvents = {}
+        self._pending = []
+        self._viewport = Viewport()
+        self.documentActivated = DocumentEvent('documentActivated')
+        self.documentClosed = DocumentEvent('documentClosed')
+
+    @api_static('Application')
+    def get():
+        return Application._instance
+
+    @api_property
+    def userInterface(self):
+        return self._userInterface
+
+    @api_property
+    def activeProduct(self):
+        return self._activeDocument._product if self._activeDocument else None
+
+    @api_property
+    def activeDocument(self):
+        return self._activeDocument
+
+    @api_property
+    def documents(self):
+        return list(self._documents)
+
+    @api_property
+    def activeViewport(self):
+        return self._viewport
+
+    @api
+    def log(self, message, level=LogLevels.InfoLogLevel, type=LogTypes.ConsoleLogType):
+        self._log.append((level, type, message))
+        return True
+
+    @api
+    def registerCustomEvent(self, eventId):
+        event = self._customEvents.get(eventId) or CustomEvent(eventId)
+        self._customEvents[eventId] = event
+        return event
+
+    @api
+    def unregisterCustomEvent(self, eventId):
+        return self._customEvents.pop(eventId, None) is not None
+
+    @api
+    def fireCustomEvent(self, eventId, additionalInfo=''):
+        # Fusion queues custom events; the fake delivers them from _drain()
+        event = self._customEvents.get(eventId)
+        if event is None:
+            return False
+        self._pending.append((event, additionalInfo))
+        return True
+
+    # -- fake only
+
+    def _newDocument(self, name='Untitled'):
+        document = Document(name, self._designFactory())
+        self._documents.append(document)
+        self._activate(document)
+        return document
+
+    def _activate(self, document):
+        self._activeDocument = document
+        self.documentActivated._fire(DocumentEventArgs(document))
+        return True
+
+    def _close(self, document):
+        self._documents.remove(document)
+        if self._activeDocument is document:
+            self._activeDocument = self._documents[-1] if self._documents else None
+        self.documentClosed._fire(DocumentEventArgs(document))
+        return True
+
+    def _drain(self, limit=100000):
+        """Deliver queued custom events until none are left (or ``limit`` is hit)."""
+        delivered = 0
+        while self._pending and delivered < limit:
+            event, info = self._pending.pop(0)
+            event._fire(CustomEventArgs(info))
+            delivered += 1
+        return delivered
+
+
+def _newApplication(designFactory):
+    """Start a fresh fake session with one empty document open."""
+    recorder.reset()
+    Application._instance = Application(designFactory)
+    Application._instance._newDocument()
+    return Application._instance
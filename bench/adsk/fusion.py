@@ -0,0 +1,1444 @@
+"""Fake of the parts of ``adsk.fusion`` the add-in uses.
+
+Geometry is not computed. Features keep track of which bodies they create,
+join, cut or consume so body and timeline counts behave like Fusion's, and
+charge a modeled recompute cost for the work Fusion would do.
+"""
+
+import math
+import re
+
+from . import core
+from ._fake import ApiObject, api, api_attribute, api_property, api_static, recorder
+
+
+# ---------------------------------------------------------------- enums
+
+class FeatureOperations:
+    JoinFeatureOperation = 0
+    CutFeatureOperation = 1
+    IntersectFeatureOperation = 2
+    NewBodyFeatureOperation = 3
+    NewComponentFeatureOperation = 4
+
+
+class DimensionOrientations:
+    AlignedDimensionOrientation = 0
+    HorizontalDimensionOrientation = 1
+    VerticalDimensionOrientation = 2
+
+
+class PatternDistanceType:
+    ExtentPatternDistanceType = 0
+    SpacingPatternDistanceType = 1
+
+
+class PatternComputeOptions:
+    OptimizedPatternCompute = 0
+    IdenticalPatternCompute = 1
+    AdjustPatternCompute = 2
+
+
+class DesignTypes:
+    DirectDesignType = 0
+    ParametricDesignType = 1
+
+
+class ExtentDirections:
+    PositiveExtentDirection = 0
+    NegativeExtentDirection = 1
+    SymmetricExtentDirection = 2
+
+
+class BooleanTypes:
+    DifferenceBooleanType = 0
+    IntersectionBooleanType = 1
+    UnionBooleanType = 2
+
+
+# ---------------------------------------------------------------- expressions
+
+_UNITS = {'mm': 0.1, 'cm': 1.0, 'm': 100.0, 'in': 2.54, 'ft': 30.48,
+          'deg': math.pi / 180, 'rad': 1.0}
+_FUNCTIONS = {'floor': math.floor, 'ceil': math.ceil, 'round': round, 'abs': abs,
+              'max': max, 'min': min, 'sqrt': math.sqrt, 'sin': math.sin, 'cos': math.cos,
+              'tan': math.tan, 'PI': math.pi}
+_TOKENS = re.compile(r'\s*(?:((?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(mm|cm|m|in|ft|deg|rad)?(?![\w])'
+                     r'|([A-Za-z_]\w*)|(\S))')
+
+
+def _evaluate(expression, lookup):
+    """Evaluate a Fusion expression, resolving names with ``lookup(name)``.
+
+    Good enough for the expressions the add-in writes; not a full
+    implementation of Fusion's expression language.
+    """
+    if isinstance(expression, (int, float)):
+        return float(expression)
+    python = []
+    for number, unit, name, other in _TOKENS.findall(expression.strip()):
+        if number:
+            python.append(repr(float(number) * _UNITS.get(unit, 1.0)))
+        elif name:
+            if name in _UNITS:
+                python.append(f'*{_UNITS[name]!r}')
+            elif name in _FUNCTIONS:
+                python.append(name)
+            else:
+                python.append(repr(lookup(name)))
+        else:
+            python.append({';': ',', '^': '**'}.get(other, other))
+    return float(eval(' '.join(python), {'__builtins__': {}}, dict(_FUNCTIONS)))
+
+
+def _value_of(valueInput, design):
+    if valueInput.realValue is not None:
+        return valueInput.realValue
+    return _evaluate(valueInput.stringValue, design._parameterValue)
+
+
+def _expressions_of(input):
+    """The expressions in the ValueInputs of a feature or plane input, which Fusion keeps with the feature."""
+    expressions = []
+    values = list(vars(input).values())
+    while values:
+        value = values.pop(0)
+        if isinstance(value, core.ValueInput):
+            if value.stringValue is not None:
+                expressions.append(value.stringValue)
+        elif isinstance(value, (ExtentDefinition, OffsetStartDefinition)):
+            values.extend(vars(value).values())
+        elif isinstance(value, tuple):
+            values.extend(value)
+    return expressions
+
+
+# ---------------------------------------------------------------- collections
+
+class _Collection(ApiObject):
+    def __init__(self, items=None):
+        self._items = list(items or [])
+
+    @api
+    def item(self, index):
+        return self._items[index] if 0 <= index < len(self._items) else None
+
+    @api_property
+    def count(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+
+# ---------------------------------------------------------------- parameters
+
+class Parameter(ApiObject):
+    def __init__(self, design, name, expression, unit, comment=''):
+        self._design = design
+        self._name = name
+        self._expression = expression
+        self.unit = unit
+        self.comment = comment
+
+    @api_property
+    def name(self):
+        return self._name
+
+    @property
+    def expression(self):
+        recorder.record(f'{type(self).__name__}.expression')
+        return self._expression
+
+    @expression.setter
+    def expression(self, expression):
+        recorder.record(f'{type(self).__name__}.expression')
+        if expression != self._expression:
+            self._expression = expression
+            self._changed()
+
+    @api_property
+    def value(self):
+        return self._value()
+
+    def _value(self):
+        return _evaluate(self._expression, self._design._parameterValue)
+
+    @api
+    def deleteMe(self):
+        self.isValid = False
+        return True
+
+    def _changed(self):
+        pass
+
+
+class UserParameter(Parameter):
+    def _changed(self):
+        self._design._parameterChanged()
+
+
+class ModelParameter(Parameter):
+    pass
+
+
+class UserParameters(_Collection):
+    def __init__(self, design):
+        super().__init__()
+        self._design = design
+
+    @api
+    def add(self, name, value, units, comment):
+        if self._find(name) is not None:
+            raise RuntimeError(f'3 : A parameter named {name} already exists')
+        parameter = UserParameter(self._design, name, value._expression(), units, comment)
+        self._items.append(parameter)
+        return parameter
+
+    @api
+    def itemByName(self, name):
+        return self._find(name)
+
+    def __iter__(self):
+        # iterating the real collection fetches every item through the API
+        recorder.record('UserParameters.count')
+        for parameter in list(self._items):
+            recorder.record('UserParameters.item')
+            yield parameter
+
+    def _find(self, name):
+        for parameter in self._items:
+            if parameter._name == name:
+                return parameter
+        return None
+
+
+# ---------------------------------------------------------------- timeline entities
+
+class TimelineObject(ApiObject):
+    def __init__(self, timeline, entity):
+        self._timeline = timeline
+        self._entity = entity
+
+    @api_property
+    def entity(self):
+        return self._entity
+
+    @api_property
+    def index(self):
+        return self._timeline._items.index(self._entity)
+
+
+class _TimelineEntity(ApiObject):
+    """Base of the sketches, construction geometry and features that sit in the timeline."""
+
+    @api_property
+    def timelineObject(self):
+        timeline = self._component._design._timeline
+        return TimelineObject(timeline, self) if self in timeline._items else None
+
+    @api
+    def deleteMe(self):
+        self._component._design._timeline._remove(self)
+        self._forget()
+        return True
+
+    def _forget(self):
+        # what else goes away with the entity; bodies are not tracked that far
+        self.isValid = False
+
+
+# ---------------------------------------------------------------- sketches
+
+class SketchEntity(ApiObject):
+    def __init__(self, sketch):
+        self._sketch = sketch
+        self._isConstruction = False
+
+    isConstruction = api_attribute('isConstruction', False)
+
+    @api_property
+    def parentSketch(self):
+        return self._sketch
+
+
+class SketchPoint(SketchEntity):
+    def __init__(self, sketch, point):
+        super().__init__(sketch)
+        self._geometry = core.Point3D(point.x, point.y, point.z)
+
+    @api_property
+    def geometry(self):
+        return self._geometry
+
+    @api
+    def move(self, vector):
+        self._geometry.translateBy(vector)
+        return True
+
+
+class SketchLine(SketchEntity):
+    def __init__(self, sketch, start, end):
+        super().__init__(sketch)
+        self._start = SketchPoint(sketch, start)
+        self._end = SketchPoint(sketch, end)
+
+    @api_property
+    def startSketchPoint(self):
+        return self._start
+
+    @api_property
+    def endSketchPoint(self):
+        return self._end
+
+
+class SketchCircle(SketchEntity):
+    def __init__(self, sketch, center, radius):
+        super().__init__(sketch)
+        self._center = SketchPoint(sketch, center)
+        self.radius = radius
+
+    @api_property
+    def centerSketchPoint(self):
+        return self._center
+
+
+class SketchLineList(_Collection):
+    pass
+
+
+class SketchLines(_Collection):
+    def __init__(self, sketch):
+        super().__init__()
+        self._sketch = sketch
+
+    def _new(self, start, end):
+        line = SketchLine(self._sketch, start, end)
+        self._items.append(line)
+        self._sketch._entityAdded()
+        return line
+
+    @api
+    def addByTwoPoints(self, startPoint, endPoint):
+        start = startPoint.geometry if isinstance(startPoint, SketchPoint) else startPoint
+        end = endPoint.geometry if isinstance(endPoint, SketchPoint) else endPoint
+        return self._new(start, end)
+
+    @api
+    def addCenterPointRectangle(self, centerPoint, cornerPoint):
+        cx, cy = centerPoint.x, centerPoint.y
+        dx, dy = cornerPoint.x - cx, cornerPoint.y - cy
+        return self._rectangle((cx - dx, cy - dy), (cx + dx, cy + dy))
+
+    @api
+    def addTwoPointRectangle(self, pointOne, pointTwo):
+        return self._rectangle((pointOne.x, pointOne.y), (pointTwo.x, pointTwo.y))
+
+    def _rectangle(self, low, high):
+        (x0, y0), (x1, y1) = low, high
+        corners = [core.Point3D(x0, y0, 0), core.Point3D(x1, y0, 0),
+                   core.Point3D(x1, y1, 0), core.Point3D(x0, y1, 0)]
+        return SketchLineList([self._new(corners[i], corners[(i + 1) % 4]) for i in range(4)])
+
+
+class SketchCircles(_Collection):
+    def __init__(self, sketch):
+        super().__init__()
+        self._sketch = sketch
+
+    @api
+    def addByCenterRadius(self, centerPoint, radius):
+        center = centerPoint.geometry if isinstance(centerPoint, SketchPoint) else centerPoint
+        circle = SketchCircle(self._sketch, center, radius)
+        self._items.append(circle)
+        self._sketch._entityAdded()
+        return circle
+
+
+class SketchCurves(ApiObject):
+    def __init__(self, sketch):
+        self._sketchLines = SketchLines(sketch)
+        self._sketchCircles = SketchCircles(sketch)
+
+    @api_property
+    def sketchLines(self):
+        return self._sketchLines
+
+    @api_property
+    def sketchCircles(self):
+        return self._sketchCircles
+
+
+class SketchPoints(_Collection):
+    def __init__(self, sketch):
+        super().__init__()
+        self._sketch = sketch
+
+    @api
+    def add(self, point):
+        sketchPoint = SketchPoint(self._sketch, point)
+        self._items.append(sketchPoint)
+        self._sketch._entityAdded()
+        return sketchPoint
+
+
+class SketchDimension(ApiObject):
+    def __init__(self, sketch, parameter):
+        self._sketch = sketch
+        self._parameter = parameter
+
+    @api_property
+    def parameter(self):
+        return self._parameter
+
+
+class SketchDimensions(_Collection):
+    def __init__(self, sketch):
+        super().__init__()
+        self._sketch = sketch
+
+    def _new(self, value):
+        parameter = self._sketch._design._newModelParameter(value)
+        dimension = SketchDimension(self._sketch, parameter)
+        self._items.append(dimension)
+        self._sketch._entityAdded()
+        return dimension
+
+    @api
+    def addDistanceDimension(self, pointOne, pointTwo, orientation, textPoint, isDriving=True):
+        one, two = pointOne.geometry, pointTwo.geometry
+        if orientation == DimensionOrientations.HorizontalDimensionOrientation:
+            value = abs(two.x - one.x)
+        elif orientation == DimensionOrientations.VerticalDimensionOrientation:
+            value = abs(two.y - one.y)
+        else:
+            value = one.distanceTo(two)
+        return self._new(value)
+
+    @api
+    def addDiameterDimension(self, circle, textPoint, isDriving=True):
+        return self._new(circle.radius * 2)
+
+
+class GeometricConstraints(_Collection):
+    def __init__(self, sketch):
+        super().__init__()
+        self._sketch = sketch
+
+    def _new(self, kind, *entities):
+        self._items.append((kind, entities))
+        self._sketch._entityAdded()
+        return self._items[-1]
+
+    @api
+    def addCoincident(self, point, entity):
+        return self._new('coincident', point, entity)
+
+    @api
+    def addHorizontal(self, line):
+        return self._new('horizontal', line)
+
+    @api
+    def addVertical(self, line):
+        return self._new('vertical', line)
+
+    @api
+    def addMidPoint(self, point, midPointCurve):
+        return self._new('midpoint', point, midPointCurve)
+
+
+class Profile(ApiObject):
+    def __init__(self, sketch, index):
+        self._sketch = sketch
+        self._index = index
+
+    @api_property
+    def parentSketch(self):
+        return self._sketch
+
+
+class Profiles(_Collection):
+    pass
+
+
+class Sketch(_TimelineEntity):
+    def __init__(self, component, planarEntity):
+        self._component = component
+        self._design = component._design
+        self._referencePlane = planarEntity
+        self._name = f'Sketch{len(self._design._sketches) + 1}'
+        self._isComputeDeferred = False
+        self._sketchPoints = SketchPoints(self)
+        self._sketchCurves = SketchCurves(self)
+        self._sketchDimensions = SketchDimensions(self)
+        self._geometricConstraints = GeometricConstraints(self)
+        self._originPoint = SketchPoint(self, core.Point3D())
+
+    name = api_attribute('name')
+
+    @property
+    def isComputeDeferred(self):
+        recorder.record('Sketch.isComputeDeferred')
+        return self._isComputeDeferred
+
+    @isComputeDeferred.setter
+    def isComputeDeferred(self, value):
+        recorder.record('Sketch.isComputeDeferred')
+        if self._isComputeDeferred and not value:
+            self._solve()
+        self._isComputeDeferred = value
+
+    @api_property
+    def sketchPoints(self):
+        return self._sketchPoints
+
+    @api_property
+    def sketchCurves(self):
+        return self._sketchCurves
+
+    @api_property
+    def sketchDimensions(self):
+        return self._sketchDimensions
+
+    @api_property
+    def geometricConstraints(self):
+        return self._geometricConstraints
+
+    @api_property
+    def originPoint(self):
+        return self._originPoint
+
+    @api_property
+    def referencePlane(self):
+        return self._referencePlane
+
+    @api_property
+    def parentComponent(self):
+        return self._component
+
+    @api_property
+    def profiles(self):
+        return Profiles([Profile(self, i) for i in range(self._loopCount())])
+
+    @api
+    def modelToSketchSpace(self, modelCoordinate):
+        # only the loop structure of a sketch matters here, so the plane's
+        # orientation is not modelled
+        return core.Point3D.create(modelCoordinate.x, modelCoordinate.y, modelCoordinate.z)
+
+    # -- fake only
+
+    @property
+    def _entityCount(self):
+        return (len(self._sketchPoints) + len(self._sketchCurves._sketchLines)
+                + len(self._sketchCurves._sketchCircles) + len(self._sketchDimensions)
+                + len(self._geometricConstraints))
+
+    def _entityAdded(self):
+        # every edit re-solves the sketch unless compute is deferred
+        if not self._isComputeDeferred:
+            self._solve()
+
+    def _solve(self):
+        recorder.charge('sketchEntity', self._entityCount)
+
+    def _loopCount(self):
+        """Closed loops formed by the non-construction lines, plus circles."""
+        def key(point):
+            return (round(point.x, 9), round(point.y, 9))
+
+        parent = {}
+
+        def find(k):
+            while parent.setdefault(k, k) != k:
+                k = parent[k]
+            return k
+
+        degree = {}
+        for line in self._sketchCurves._sketchLines:
+            if line._isConstruction:
+                continue
+            a, b = key(line._start._geometry), key(line._end._geometry)
+            degree[a] = degree.get(a, 0) + 1
+            degree[b] = degree.get(b, 0) + 1
+            parent[find(a)] = find(b)
+
+        components = {}
+        for k, d in degree.items():
+            components.setdefault(find(k), []).append(d)
+        loops = sum(1 for degrees in components.values() if all(d == 2 for d in degrees))
+        return loops + len(self._sketchCurves._sketchCircles)
+
+
+class Sketches(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    @api
+    def add(self, planarEntity, occurrenceForCreation=None):
+        sketch = Sketch(self._component, planarEntity)
+        self._items.append(sketch)
+        self._component._design._sketches.append(sketch)
+        self._component._design._timeline._append(sketch)
+        return sketch
+
+
+# ---------------------------------------------------------------- construction geometry
+
+class ConstructionPlane(_TimelineEntity):
+    def __init__(self, component, name):
+        self._component = component
+        self.name = name
+        self._expressions = []
+
+
+class ConstructionAxis(ApiObject):
+    def __init__(self, component, name):
+        self._component = component
+        self.name = name
+
+
+class ConstructionPoint(ApiObject):
+    def __init__(self, component, name):
+        self._component = component
+        self.name = name
+
+
+class ConstructionPlaneInput(ApiObject):
+    @api
+    def setByOffset(self, planarEntity, offset):
+        self.planarEntity, self.offset = planarEntity, offset
+        return True
+
+
+class ConstructionPlanes(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    @api
+    def createInput(self, occurrenceForCreation=None):
+        return ConstructionPlaneInput()
+
+    @api
+    def add(self, input):
+        plane = ConstructionPlane(self._component, f'Plane{len(self._items) + 1}')
+        plane._expressions = _expressions_of(input)
+        self._items.append(plane)
+        self._component._design._timeline._append(plane)
+        return plane
+
+
+# ---------------------------------------------------------------- bodies
+
+class BRepBody(ApiObject):
+    def __init__(self, component, name):
+        self._component = component
+        self._name = name
+        self._isLightBulbOn = True
+
+    name = api_attribute('name')
+    isLightBulbOn = api_attribute('isLightBulbOn', True)
+
+    @api_property
+    def parentComponent(self):
+        return self._component
+
+    @api
+    def createForAssemblyContext(self, occurrence):
+        proxy = BRepBody(self._component, self._name)
+        proxy._nativeObject, proxy._assemblyContext = self, occurrence
+        return proxy
+
+    @api_property
+    def assemblyContext(self):
+        return getattr(self, '_assemblyContext', None)
+
+    @api
+    def deleteMe(self):
+        self._component._bRepBodies._remove(self)
+        return True
+
+
+class BRepBodies(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def _new(self):
+        design = self._component._design
+        design._bodyCounter += 1
+        body = BRepBody(self._component, f'Body{design._bodyCounter}')
+        self._items.append(body)
+        return body
+
+    def _remove(self, body):
+        if body in self._items:
+            self._items.remove(body)
+        body.isValid = False
+
+    @api
+    def add(self, body, baseFeature=None):
+        # like Fusion, a parametric design only takes bodies inside a base feature edit
+        design = self._component._design
+        if design._designType == DesignTypes.ParametricDesignType and (
+                baseFeature is None or baseFeature is not design._editedBaseFeature):
+            raise RuntimeError('3 : bodies can only be added to a base feature being edited')
+        added = self._new()
+        if baseFeature is not None:
+            baseFeature._bodies._items.append(added)
+        return added
+
+
+class TemporaryBRepManager(ApiObject):
+    """Transient bodies; no geometry, only the calls and their cost."""
+
+    _instance = None
+
+    @api_static('TemporaryBRepManager')
+    def get():
+        if TemporaryBRepManager._instance is None:
+            TemporaryBRepManager._instance = TemporaryBRepManager()
+        return TemporaryBRepManager._instance
+
+    def _body(self):
+        return BRepBody(None, 'Temporary')
+
+    @api
+    def createBox(self, box):
+        return self._body()
+
+    @api
+    def createCylinderOrCone(self, pointOne, pointOneRadius, pointTwo, pointTwoRadius):
+        return self._body()
+
+    @api
+    def createSphere(self, center, radius):
+        return self._body()
+
+    @api
+    def copy(self, body):
+        return self._body()
+
+    @api
+    def transform(self, body, transform):
+        return True
+
+    @api
+    def booleanOperation(self, targetBody, toolBody, booleanType):
+        return True
+
+
+# ---------------------------------------------------------------- features
+
+class Feature(_TimelineEntity):
+    def __init__(self, component, bodies=()):
+        self._component = component
+        self._bodies = _Collection(bodies)
+        self._name = f'{type(self).__name__}{len(component._design._timeline._items) + 1}'
+        self._expressions = []
+
+    name = api_attribute('name')
+
+    @api_property
+    def bodies(self):
+        return self._bodies
+
+    @api_property
+    def parentComponent(self):
+        return self._component
+
+
+class ExtrudeFeature(Feature):
+    pass
+
+
+class RevolveFeature(Feature):
+    pass
+
+
+class MirrorFeature(Feature):
+    pass
+
+
+class CombineFeature(Feature):
+    pass
+
+
+class MoveFeature(Feature):
+    pass
+
+
+class RectangularPatternFeature(Feature):
+    def __init__(self, component, bodies=(), elements=()):
+        super().__init__(component, bodies)
+        self._patternElements = _Collection(elements)
+
+    @api_property
+    def patternElements(self):
+        return self._patternElements
+
+    def _forget(self):
+        # the occurrences the pattern added, not the ones it was given
+        for element in self._patternElements._items[1:]:
+            for occurrence in element._occurrences._items:
+                self._component._occurrences._items.remove(occurrence)
+                occurrence.isValid = False
+        super()._forget()
+
+
+class PatternElement(ApiObject):
+    def __init__(self, occurrences):
+        self._occurrences = _Collection(occurrences)
+
+    @api_property
+    def occurrences(self):
+        return self._occurrences
+
+
+class ExtentDefinition(ApiObject):
+    pass
+
+
+class DistanceExtentDefinition(ExtentDefinition):
+    def __init__(self, distance):
+        self.distance = distance
+
+    @api_static('DistanceExtentDefinition')
+    def create(distance):
+        return DistanceExtentDefinition(distance)
+
+
+class OffsetStartDefinition(ApiObject):
+    def __init__(self, offset):
+        self.offset = offset
+
+    @api_static('OffsetStartDefinition')
+    def create(offset):
+        return OffsetStartDefinition(offset)
+
+
+class _FeatureInput(ApiObject):
+    def __init__(self, operation=FeatureOperations.NewBodyFeatureOperation):
+        self.operation = operation
+        self.participantBodies = []
+        self.isSolid = True
+
+
+class _ProfileFeatures(_Collection):
+    """Shared body handling of the profile based features."""
+
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def _apply(self, cls, operation, participantBodies=(), input=None):
+        bodies = self._component._bRepBodies
+        if operation in (FeatureOperations.NewBodyFeatureOperation,
+                         FeatureOperations.NewComponentFeatureOperation):
+            result = [bodies._new()]
+        elif operation == FeatureOperations.JoinFeatureOperation:
+            # without participants Fusion joins to the body the profile touches;
+            # the add-in always builds on the body it made last
+            result = list(participantBodies) or bodies._items[-1:] or [bodies._new()]
+        else:
+            result = list(participantBodies) or list(bodies._items)
+        feature = cls(self._component, result)
+        if input is not None:
+            feature._expressions = _expressions_of(input)
+        self._items.append(feature)
+        self._component._design._timeline._append(feature)
+        return feature
+
+
+class ExtrudeFeatureInput(_FeatureInput):
+    def __init__(self, profile, operation):
+        super().__init__(operation)
+        self.profile = profile
+        self.startExtent = None
+        self.extentOne = None
+        self.taperAngleOne = None
+
+    @api
+    def setDistanceExtent(self, isSymmetric, distance):
+        self.extentOne = DistanceExtentDefinition(distance)
+        return True
+
+    @api
+    def setOneSideExtent(self, extent, direction, taperAngle=None):
+        self.extentOne = extent
+        self.taperAngleOne = taperAngle
+        return True
+
+
+class ExtrudeFeatures(_ProfileFeatures):
+    @api
+    def addSimple(self, profile, distance, operation):
+        feature = self._apply(ExtrudeFeature, operation)
+        feature._expressions = [distance.stringValue] if distance.stringValue is not None else []
+        return feature
+
+    @api
+    def createInput(self, profile, operation):
+        return ExtrudeFeatureInput(profile, operation)
+
+    @api
+    def add(self, input):
+        return self._apply(ExtrudeFeature, input.operation, input.participantBodies, input)
+
+
+class RevolveFeatureInput(_FeatureInput):
+    def __init__(self, profile, axis, operation):
+        super().__init__(operation)
+        self.profile, self.axis = profile, axis
+
+    @api
+    def setAngleExtent(self, isSymmetric, angle):
+        self.isSymmetric, self.angle = isSymmetric, angle
+        return True
+
+
+class RevolveFeatures(_ProfileFeatures):
+    @api
+    def createInput(self, profile, axis, operation):
+        return RevolveFeatureInput(profile, axis, operation)
+
+    @api
+    def add(self, input):
+        return self._apply(RevolveFeature, input.operation, input.participantBodies, input)
+
+
+class MirrorFeatureInput(_FeatureInput):
+    def __init__(self, inputEntities, mirrorPlane):
+        super().__init__()
+        self.inputEntities, self.mirrorPlane = inputEntities, mirrorPlane
+        self.isCombine = False
+
+
+class MirrorFeatures(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    @api
+    def createInput(self, inputEntities, mirrorPlane):
+        return MirrorFeatureInput(inputEntities, mirrorPlane)
+
+    @api
+    def add(self, input):
+        sources = [entity for entity in input.inputEntities if isinstance(entity, BRepBody)]
+        bodies = sources if input.isCombine else [self._component._bRepBodies._new() for _ in sources]
+        feature = MirrorFeature(self._component, bodies)
+        self._items.append(feature)
+        self._component._design._timeline._append(feature)
+        return feature
+
+
+class CombineFeatureInput(ApiObject):
+    def __init__(self, targetBody, toolBodies):
+        self.targetBody, self.toolBodies = targetBody, toolBodies
+        self.isNewComponent = False
+        self.isKeepToolBodies = False
+        self.operation = FeatureOperations.JoinFeatureOperation
+
+
+class CombineFeatures(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    @api
+    def createInput(self, targetBody, toolBodies):
+        return CombineFeatureInput(targetBody, toolBodies)
+
+    @api
+    def add(self, input):
+        tools = [body for body in input.toolBodies if body is not input.targetBody]
+        recorder.charge('combineTool', len(tools))
+        if not input.isKeepToolBodies:
+            for body in tools:
+                body._component._bRepBodies._remove(body)
+        feature = CombineFeature(self._component, [input.targetBody])
+        self._items.append(feature)
+        self._component._design._timeline._append(feature)
+        return feature
+
+
+class MoveFeatureInput(ApiObject):
+    def __init__(self, inputEntities):
+        self.inputEntities = inputEntities
+        self.translation = None
+
+    @api
+    def defineAsTranslateXYZ(self, xDistance, yDistance, zDistance, isDesignSpace):
+        self.translation = (xDistance, yDistance, zDistance)
+        return True
+
+    @api
+    def defineAsFreeMove(self, transform):
+        self.transform = transform
+        return True
+
+
+class MoveFeatures(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    @api
+    def createInput2(self, inputEntities):
+        return MoveFeatureInput(inputEntities)
+
+    @api
+    def add(self, input):
+        feature = MoveFeature(self._component, [e for e in input.inputEntities if isinstance(e, BRepBody)])
+        feature._expressions = _expressions_of(input)
+        self._items.append(feature)
+        self._component._design._timeline._append(feature)
+        return feature
+
+
+class BaseFeature(Feature):
+    @api
+    def startEdit(self):
+        self._component._design._editedBaseFeature = self
+        return True
+
+    @api
+    def finishEdit(self):
+        self._component._design._editedBaseFeature = None
+        return True
+
+
+class BaseFeatures(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    @api
+    def add(self):
+        feature = BaseFeature(self._component)
+        self._items.append(feature)
+        self._component._design._timeline._append(feature)
+        return feature
+
+
+class CopyPasteBody(Feature):
+    pass
+
+
+class RectangularPatternFeatureInput(ApiObject):
+    def __init__(self, inputEntities, directionOneEntity, quantityOne, distanceOne, patternDistanceType):
+        self.inputEntities = inputEntities
+        self.directionOneEntity = directionOneEntity
+        self.quantityOne, self.distanceOne = quantityOne, distanceOne
+        self.patternDistanceType = patternDistanceType
+        self.quantityTwo = core.ValueInput(realValue=1)
+        self.patternComputeOption = PatternComputeOptions.OptimizedPatternCompute
+
+    @api
+    def setDirectionTwo(self, directionTwoEntity, quantityTwo, distanceTwo):
+        self.directionTwoEntity = directionTwoEntity
+        self.quantityTwo, self.distanceTwo = quantityTwo, distanceTwo
+        return True
+
+
+class RectangularPatternFeatures(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    @api
+    def createInput(self, inputEntities, directionOneEntity, quantityOne, distanceOne, patternDistanceType):
+        return RectangularPatternFeatureInput(inputEntities, directionOneEntity, quantityOne,
+                                              distanceOne, patternDistanceType)
+
+    @api
+    def add(self, input):
+        design = self._component._design
+        quantity = int(_value_of(input.quantityOne, design)) * int(_value_of(input.quantityTwo, design))
+        sources = [entity for entity in input.inputEntities if isinstance(entity, BRepBody)]
+        recorder.charge('patternInstance',
+                        quantity * sum(1 for entity in input.inputEntities if not isinstance(entity, Occurrence)))
+        # A pattern of bodies hands back one body per instance, including one on
+        # top of the original; that is the duplicate the README warns about.
+        bodies = [self._component._bRepBodies._new() for _ in sources for _ in range(quantity)]
+        # occurrences are patterned as new occurrences of the same component
+        occurrences = [entity for entity in input.inputEntities if isinstance(entity, Occurrence)]
+        elements = [PatternElement(occurrences)]
+        for _ in range(quantity - 1):
+            elements.append(PatternElement([self._component._occurrences._new(occurrence._sourceComponent,
+                                                                              core.Matrix3D())
+                                            for occurrence in occurrences]))
+        recorder.charge('occurrenceInstance', len(occurrences) * quantity)
+        feature = RectangularPatternFeature(self._component, bodies, elements)
+        feature._expressions = _expressions_of(input)
+        self._items.append(feature)
+        design._timeline._append(feature)
+        return feature
+
+
+class Features(ApiObject):
+    def __init__(self, component):
+        self._extrudeFeatures = ExtrudeFeatures(component)
+        self._revolveFeatures = RevolveFeatures(component)
+        self._mirrorFeatures = MirrorFeatures(component)
+        self._combineFeatures = CombineFeatures(component)
+        self._moveFeatures = MoveFeatures(component)
+        self._rectangularPatternFeatures = RectangularPatternFeatures(component)
+        self._baseFeatures = BaseFeatures(component)
+
+    @api_property
+    def extrudeFeatures(self):
+        return self._extrudeFeatures
+
+    @api_property
+    def revolveFeatures(self):
+        return self._revolveFeatures
+
+    @api_property
+    def mirrorFeatures(self):
+        return self._mirrorFeatures
+
+    @api_property
+    def combineFeatures(self):
+        return self._combineFeatures
+
+    @api_property
+    def moveFeatures(self):
+        return self._moveFeatures
+
+    @api_property
+    def rectangularPatternFeatures(self):
+        return self._rectangularPatternFeatures
+
+    @api_property
+    def baseFeatures(self):
+        return self._baseFeatures
+
+    @api
+    def copyPasteBodies(self, sourceBodies):
+        component = self._baseFeatures._component
+        sources = list(sourceBodies) if isinstance(sourceBodies, core.ObjectCollection) else [sourceBodies]
+        feature = CopyPasteBody(component, [component._bRepBodies._new() for _ in sources])
+        component._design._timeline._append(feature)
+        return feature
+
+
+# ---------------------------------------------------------------- custom graphics
+
+class CustomGraphicsCoordinates(ApiObject):
+    def __init__(self, coordinates):
+        self._coordinates = list(coordinates)
+
+    @api_static('CustomGraphicsCoordinates')
+    def create(coordinates):
+        return CustomGraphicsCoordinates(coordinates)
+
+    @api_property
+    def coordinateCount(self):
+        return len(self._coordinates) // 3
+
+
+class CustomGraphicsSolidColorEffect(ApiObject):
+    def __init__(self, color):
+        self.color = color
+
+    @api_static('CustomGraphicsSolidColorEffect')
+    def create(color):
+        return CustomGraphicsSolidColorEffect(color)
+
+
+class CustomGraphicsMesh(ApiObject):
+    def __init__(self, coordinates, coordinateIndexList):
+        self._coordinates = coordinates
+        self._coordinateIndexList = list(coordinateIndexList)
+
+    color = api_attribute('color')
+
+
+class CustomGraphicsGroup(_Collection):
+    def __init__(self, groups):
+        super().__init__()
+        self._groups = groups
+
+    @api
+    def addMesh(self, coordinates, coordinateIndexList, normalVectors, normalIndexList):
+        # drawing cost grows with the triangle count, but is far below a recompute
+        recorder.charge('graphicsTriangle', len(coordinateIndexList) // 3)
+        mesh = CustomGraphicsMesh(coordinates, coordinateIndexList)
+        self._items.append(mesh)
+        return mesh
+
+    @api
+    def deleteMe(self):
+        self._groups._items.remove(self)
+        self.isValid = False
+        return True
+
+
+class CustomGraphicsGroups(_Collection):
+    @api
+    def add(self):
+        group = CustomGraphicsGroup(self)
+        self._items.append(group)
+        return group
+
+
+# ---------------------------------------------------------------- components and design
+
+class Occurrence(ApiObject):
+    def __init__(self, parent, component, transform):
+        self._parent = parent
+        self._sourceComponent = component
+        self._transform = transform
+        self._isLightBulbOn = True
+
+    transform = api_attribute('transform')
+    isLightBulbOn = api_attribute('isLightBulbOn', True)
+
+    @api_property
+    def component(self):
+        return self._sourceComponent
+
+    @api
+    def deleteMe(self):
+        self._parent._occurrences._items.remove(self)
+        self.isValid = False
+        return True
+
+
+class Occurrences(_Collection):
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def _new(self, component, transform):
+        occurrence = Occurrence(self._component, component, transform)
+        self._items.append(occurrence)
+        return occurrence
+
+    @api
+    def addNewComponent(self, transform):
+        design = self._component._design
+        design._componentCounter += 1
+        return self._new(Component(design, f'Component{design._componentCounter}'), transform)
+
+    @api
+    def addExistingComponent(self, component, transform):
+        return self._new(component, transform)
+
+
+class Component(ApiObject):
+    def __init__(self, design, name):
+        self._design = design
+        self._name = name
+        self._sketches = Sketches(self)
+        self._features = Features(self)
+        self._bRepBodies = BRepBodies(self)
+        self._constructionPlanes = ConstructionPlanes(self)
+        self._planes = {n: ConstructionPlane(self, n) for n in ('XY', 'XZ', 'YZ')}
+        self._axes = {n: ConstructionAxis(self, n) for n in ('X', 'Y', 'Z')}
+        self._origin = ConstructionPoint(self, 'Origin')
+        self._occurrences = Occurrences(self)
+        self._customGraphicsGroups = CustomGraphicsGroups()
+
+    name = api_attribute('name')
+
+    @api_property
+    def sketches(self):
+        return self._sketches
+
+    @api_property
+    def features(self):
+        return self._features
+
+    @api_property
+    def bRepBodies(self):
+        return self._bRepBodies
+
+    @api_property
+    def constructionPlanes(self):
+        return self._constructionPlanes
+
+    @api_property
+    def xYConstructionPlane(self):
+        return self._planes['XY']
+
+    @api_property
+    def xZConstructionPlane(self):
+        return self._planes['XZ']
+
+    @api_property
+    def yZConstructionPlane(self):
+        return self._planes['YZ']
+
+    @api_property
+    def xConstructionAxis(self):
+        return self._axes['X']
+
+    @api_property
+    def yConstructionAxis(self):
+        return self._axes['Y']
+
+    @api_property
+    def zConstructionAxis(self):
+        return self._axes['Z']
+
+    @api_property
+    def originConstructionPoint(self):
+        return self._origin
+
+    @api_property
+    def parentDesign(self):
+        return self._design
+
+    @api_property
+    def occurrences(self):
+        return self._occurrences
+
+    @api_property
+    def customGraphicsGroups(self):
+        return self._customGraphicsGroups
+
+
+class TimelineGroup(ApiObject):
+    def __init__(self, timeline, startIndex, endIndex):
+        self._timeline = timeline
+        self._entities = timeline._items[startIndex:endIndex + 1]
+        self.name = 'Group'
+
+    @api_property
+    def count(self):
+        return len(self._entities)
+
+
+class TimelineGroups(_Collection):
+    def __init__(self, timeline):
+        super().__init__()
+        self._timeline = timeline
+
+    @api
+    def add(self, startIndex, endIndex):
+        group = TimelineGroup(self._timeline, startIndex, endIndex)
+        self._items.append(group)
+        return group
+
+
+class Timeline(_Collection):
+    def __init__(self):
+        super().__init__()
+        self._markerPosition = 0
+        self._timelineGroups = TimelineGroups(self)
+
+    @api_property
+    def timelineGroups(self):
+        return self._timelineGroups
+
+    def _append(self, entity):
+        self._items.append(entity)
+        self._markerPosition = len(self._items)
+
+    def _remove(self, entity):
+        if entity in self._items:
+            self._items.remove(entity)
+            self._markerPosition = min(self._markerPosition, len(self._items))
+
+    markerPosition = api_attribute('markerPosition', 0)
+
+    @api
+    def item(self, index):
+        return TimelineObject(self, self._items[index]) if 0 <= index < len(self._items) else None
+
+    @api
+    def deleteAllAfterMarker(self):
+        for entity in self._items[self._markerPosition:]:
+            entity._forget()
+        del self._items[self._markerPosition:]
+        return True
+
+
+class FusionUnitsManager(core.UnitsManager):
+    pass
+
+
+class Design(ApiObject):
+    def __init__(self, defaultLengthUnits='mm'):
+        self._unitsManager = FusionUnitsManager(defaultLengthUnits)
+        self._sketches = []
+        self._modelParameters = []
+        self._bodyCounter = 0
+        self._timeline = Timeline()
+        self._userParameters = UserParameters(self)
+        self._designType = DesignTypes.ParametricDesignType
+        self._editedBaseFeature = None
+        self._componentCounter = 0
+        self._rootComponent = Component(self, 'root')
+
+    @api_static('Design')
+    def cast(obj):
+        return obj if isinstance(obj, Design) else None
+
+    designType = api_attribute('designType', DesignTypes.ParametricDesignType)
+
+    @api_property
+    def rootComponent(self):
+        return self._rootComponent
+
+    @api_property
+    def userParameters(self):
+        return self._userParameters
+
+    @api_property
+    def timeline(self):
+        return self._timeline
+
+    @api_property
+    def unitsManager(self):
+        return self._unitsManager
+
+    @api_property
+    def fusionUnitsManager(self):
+        return self._unitsManager
+
+    @api
+    def findAttributes(self, groupName, attributeName):
+        entities = self._timeline._items + self._rootComponent._occurrences._items
+        return [attribute for entity in entities if '_attributes' in entity.__dict__
+                for attribute in entity._attributes
+                if attribute.groupName == groupName and attribute.name == attributeName]
+
+    @api
+    def modifyParameters(self, parameters, values):
+        for parameter, value in zip(parameters, values):
+            parameter._expression = value._expression()
+        self._parameterChanged()
+        return True
+
+    # -- fake only
+
+    def _newModelParameter(self, value):
+        parameter = ModelParameter(self, f'd{len(self._modelParameters) + 1}', value, 'cm')
+        self._modelParameters.append(parameter)
+        return parameter
+
+    def _parameterValue(self, name):
+        for parameter in self._userParameters._items + self._modelParameters:
+            if parameter._name == name:
+                return parameter._value()
+        raise NameError(f'unknown parameter {name}')
+
+    def _parameterChanged(self):
+        # a changed expression recomputes the timeline after it
+        recorder.charge('timelineFeature', len(self._timeline))
+
+    @property
+    def _dimensionCount(self):
+        return sum(len(sketch._sketchDimensions) for sketch in self._sketches)
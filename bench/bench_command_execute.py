@@ -0,0 +1,196 @@
+"""Operation-count and latency benchmark for command_execute.
+
+Runs the add-in against the fake adsk package in bench/adsk over a sweep of
+back sizes and reports, per case, the number of API calls, sketches, sketch
+dimensions, timeline features and bodies, plus the modeled wall time of
+command_execute and of one command_preview before it.
+
+    python bench/bench_command_execute.py             print the table
+    python bench/bench_command_execute.py --check     exit 1 when the sketch or dimension
+                                                      counts go above bench/baseline.json
+    python bench/bench_command_execute.py --update    rewrite bench/baseline.json
+    python bench/bench_command_execute.py --batch 5   five backs of each case from one batch table
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import re
+import sys
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDIN_DIR = os.path.dirname(BENCH_DIR)
+ADDIN_PACKAGE = 'MulticonnectBackGenerator'
+BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+sys.path.insert(0, BENCH_DIR)
+import adsk.core
+import adsk.fusion
+from adsk._fake import recorder
+
+
+# (width mm, height mm, tools only, generation mode); the default mode has no suffix in the case name
+DEFAULT_MODE = 'Pattern'
+CASES = [(width, height, False, DEFAULT_MODE) for width in (140, 280, 560, 1000, 2000) for height in (30, 100, 300)]
+CASES += [(140, 30, True, DEFAULT_MODE), (2000, 300, True, DEFAULT_MODE)]
+CASES += [(width, height, toolsOnly, mode)
+          for mode in ('Single sketch', 'Fast (no history)', 'Components')
+          for width, height, toolsOnly in ((140, 30, False), (2000, 300, False), (2000, 300, True))]
+
+# Counts that must not go up without updating the baseline.
+CHECKED = ('sketches', 'dimensions')
+
+
+def load_addin():
+    """Import the add-in's command module fresh, the way Fusion would."""
+    for name in list(sys.modules):
+        if name == ADDIN_PACKAGE or name.startswith(ADDIN_PACKAGE + '.'):
+            del sys.modules[name]
+    package = types.ModuleType(ADDIN_PACKAGE)
+    package.__path__ = [ADDIN_DIR]
+    sys.modules[ADDIN_PACKAGE] = package
+    return importlib.import_module(ADDIN_PACKAGE + '.commands.commandDialog.entry')
+
+
+def case_name(width, height, toolsOnly, mode=DEFAULT_MODE):
+    name = f'{width}x{height}' + (' tools' if toolsOnly else '')
+    if mode != DEFAULT_MODE:
+        name += ' ' + re.sub(r'\W+', '-', mode.lower()).strip('-')
+    return name
+
+
+def run_case(width, height, toolsOnly, mode=DEFAULT_MODE, inputs=None, repeat=1, batch=0):
+    """Generate one back, or ``repeat`` identical backs in one document, and return the metrics.
+
+    With ``batch``, each command makes that many backs from rows added to the batch table.
+    """
+    app = adsk.core._newApplication(adsk.fusion.Design)
+    with contextlib.redirect_stdout(io.StringIO()):
+        entry = load_addin()
+        entry.start()
+        startupCalls = recorder.callCount
+        recorder.reset()
+
+        for _ in range(repeat):
+            definition = app.userInterface.commandDefinitions.itemById(entry.CMD_ID)
+            command = definition._createCommand(app.activeProduct.unitsManager)
+            commandInputs = command.commandInputs
+            commandInputs.itemById('width_value_input').value = width / 10
+            commandInputs.itemById('height_value_input').value = height / 10
+            commandInputs.itemById('tools_only').value = toolsOnly
+            _set_input(commandInputs.itemById('generation_mode'), mode)
+            for id, value in (inputs or {}).items():
+                _set_input(commandInputs.itemById(id), value)
+            for _ in range(batch):
+                command.inputChanged._fire(adsk.core.InputChangedEventArgs(command, commandInputs.itemById('batch_add')))
+
+            previewStart = (recorder.callCount, recorder.modeledTime)
+            command.executePreview._fire(adsk.core.CommandEventArgs(command))
+            previewCalls = recorder.callCount - previewStart[0]
+            previewTime = recorder.modeledTime - previewStart[1]
+
+            command.execute._fire(adsk.core.CommandEventArgs(command))
+            app._drain()
+            command.destroy._fire(adsk.core.CommandEventArgs(command))
+        entry.stop()
+
+    design = app.activeProduct
+    return {
+        'calls': recorder.callCount,
+        'sketches': len(design._sketches),
+        'dimensions': design._dimensionCount,
+        'features': len(design._timeline),
+        'bodies': len(design._rootComponent._bRepBodies),
+        'modeled_ms': round(recorder.modeledTime * 1000, 1),
+        'preview_ms': round(previewTime * 1000, 2),
+        'preview_calls': previewCalls,
+        'startup_calls': startupCalls,
+        'failures': list(app.userInterface._messages),
+    }
+
+
+def _set_input(commandInput, value):
+    if isinstance(commandInput, adsk.core.DropDownCommandInput):
+        commandInput._select(value)
+    else:
+        commandInput.value = value
+
+
+def run(cases=CASES, inputs=None, repeat=1, batch=0):
+    return {case_name(*case): run_case(*case, inputs=inputs, repeat=repeat, batch=batch) for case in cases}
+
+
+def print_table(results, out=sys.stdout):
+    columns = ('calls', 'sketches', 'dimensions', 'features', 'bodies', 'modeled_ms', 'preview_ms')
+    print(f'{"case":<32}' + ''.join(f'{c:>12}' for c in columns), file=out)
+    for name, metrics in results.items():
+        print(f'{name:<32}' + ''.join(f'{metrics[c]:>12}' for c in columns), file=out)
+
+
+def regressions(results, baseline):
+    problems = []
+    for name, metrics in results.items():
+        if metrics['failures']:
+            problems.append(f'{name}: command_execute failed: {metrics["failures"][0].splitlines()[-1]}')
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        for key in CHECKED:
+            if metrics[key] > expected[key]:
+                problems.append(f'{name}: {key} went up from {expected[key]} to {metrics[key]}')
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--check', action='store_true', help='fail on count regressions against the baseline')
+    parser.add_argument('--update', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--latencies', help='JSON file of per-call latencies in seconds to use instead of the defaults')
+    parser.add_argument('--realtime', action='store_true', help='sleep for the modeled latencies')
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='make this many backs per document and report the totals (not for --check/--update)')
+    parser.add_argument('--batch', type=int, default=0,
+                        help='make this many backs per command from the batch table (not for --check/--update)')
+    args = parser.parse_args(argv)
+
+    if args.latencies:
+        with open(args.latencies) as f:
+            recorder.configure(latencies=json.load(f))
+    recorder.configure(realtime=args.realtime)
+
+    if args.repeat != 1 and (args.check or args.update):
+        parser.error('--repeat changes the counts, it can\'t be used with --check or --update')
+    if args.batch and (args.check or args.update):
+        parser.error('--batch changes the counts, it can\'t be used with --check or --update')
+    cases = [case for case in CASES if case[3] in ('Pattern', 'Fast (no history)')] if args.batch else CASES
+    results = run(cases, repeat=args.repeat, batch=args.batch)
+    print_table(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update:
+        with open(BASELINE, 'w') as f:
+            json.dump({name: {key: metrics[key] for key in CHECKED} for name, metrics in results.items()},
+                      f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    problems = []
+    if args.check:
+        with open(BASELINE) as f:
+            problems = regressions(results, json.load(f))
+    else:
+        problems = [p for p in regressions(results, {}) if 'failed' in p]
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,44 +3,48 @@ import os
 import adsk.fusion
 
 from ...lib import fusionAddInUtils as futil
+from ...lib import multiconnectBack as mcback
 from ... import config
 import math
 import collections
+import inspect
+import itertools
+import json
+import time
 import traceback
+import uuid
 
 
 UserParm = collections.namedtuple('UserParm', 'name value unit desc')
 FParm = collections.namedtuple('FParm', 'value fRef')
-SketchAxes = collections.namedtuple('SketchAxes', 'x y')
 
 valueFromExpr = adsk.core.ValueInput.createByString
 
 
 app = adsk.core.Application.get()
 ui = app.userInterface
+logger = futil.get_logger(__name__)
 
 
+# The design is looked up from the active document when a handler first
+# needs it, not when the add-in is loaded, and looked up again after another
+# document has been activated or closed. use_design() binds the globals below
+# to the design a handler works on. Only command_execute changes the design;
+# the other handlers read its user parameters, see design_parameter_value.
+DesignContext = collections.namedtuple('DesignContext', 'document design root features userParams')
+designContext = None
 
+document = None
+design = None
+root = None
+features = None
+userParams = None
 
-design = adsk.fusion.Design.cast(app.activeProduct)
-root = design.rootComponent
-features = root.features
 
 # We will create and use some user parameters
-userParams = design.userParameters
-
-
-# Create a new user parameter if it doesn't exist
 paramName = "DotRadius"
-paramValue = 1.015  # Default value
 paramUnit = "cm"  # Supports 'mm', 'cm', 'in', etc.
 
-existingParam = userParams.itemByName(paramName)
-if existingParam is None:
-    userParams.add(paramName, adsk.core.ValueInput.createByReal(paramValue), paramUnit, "Radius of the connector dot")
-
-dotDiameter = userParams.itemByName(paramName)
-
 # TODO move these into the command dialog
 onRampEveryXSlots = 1
 distanceBetweenSlots = 2.5
@@ -64,13 +68,16 @@ WORKSPACE_ID = 'FusionSolidEnvironment'
 PANEL_ID = 'SolidScriptsAddinsPanel'
 COMMAND_BESIDE_ID = 'ScriptsManagerCommand'
 
+# Ways of building the slots, offered in the dialog
+PATTERN_MODE = 'Pattern'
+SINGLE_SKETCH_MODE = 'Single sketch'
+FAST_MODE = 'Fast (no history)'
+COMPONENTS_MODE = 'Components'
+GENERATION_MODES = [PATTERN_MODE, SINGLE_SKETCH_MODE, FAST_MODE, COMPONENTS_MODE]
+
 # Resource location for command icons, here we assume a sub folder in this directory named "resources".
 ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
 
-# Local list of event handlers used to maintain a reference so
-# they are not released and garbage collected.
-local_handlers = []
-
 onRampEveryXSlotsParm = "onRampEveryXSlots"
 distanceBetweenSlotsParm = "distanceBetweenSlots"
 baseThicknessParm = "baseThickness"
@@ -89,8 +96,133 @@ generalModelUserParms = [
 # we need to define this here so it becomes global
 dUserParms = None
 
-# the current sketch axes
-sketchAxes = None
+# Backs made by the add-in are recognised by attributes on their sketches,
+# features and occurrences; the value is the JSON of a BackTag, whose
+# parameterSuffix names the back's own user parameters, see back_parameter_names
+ATTRIBUTE_GROUP = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}'
+BACK_ATTRIBUTE = 'back'
+TEMPLATE_ATTRIBUTE = 'slotTemplate'
+BackTag = collections.namedtuple('BackTag', 'id made generationMode toolsOnly slotCount parameterSuffix',
+                                 defaults=('',))
+
+# The user parameters every parametric back has of its own, by the names the
+# plans use; a back's are these names with its parameterSuffix, such as
+# backWidth_2, so making or updating one back doesn't resize the others
+BACK_PARAMETERS = ('width', 'height', 'tools_only', 'backHeight', 'backWidth', 'slotCount', 'backThickness')
+
+# modes whose features follow changes of the user parameters
+UPDATABLE_MODES = (PATTERN_MODE, COMPONENTS_MODE)
+
+# What the inputs of each open dialog work out to, see dialog_state; backs
+# are what OK makes, more than one for a batch or a back split into tiles.
+# Dialogs are told apart by the id in their hidden dialog_id input:
+# {dialog id: DialogState}
+DialogState = collections.namedtuple('DialogState',
+                                     'layout backs generationMode updateExisting printSettings isValid')
+dialogStates = {}
+
+# The backs and print settings the size, material and print estimate in
+# each dialog were worked out for, see show_estimate: {dialog id: shown}
+estimatesShown = {}
+
+# The rows of the batch table get inputs with ids numbered from this
+batchRowNumbers = itertools.count()
+
+# modes whose backs don't depend on the user parameters they share, so that
+# several can be made in a batch or as tiles
+BATCH_MODES = (PATTERN_MODE, FAST_MODE)
+
+# the backs of a batch are stacked along z and the tiles of a back spread
+# along x, this far apart
+BATCH_SPACING = 1.0
+
+# A back of a batch and where create_back_batch moves it
+PlacedBack = collections.namedtuple('PlacedBack', 'layout x z')
+
+# The generation in progress, run in chunks by generation_step; what it adds
+# to the timeline is put in a group named group, if it has one, its chunks
+# are timed as part of the span trace, and it takes the place of the back
+# replaced, if any, see ReplacedBack
+GENERATE_EVENT_ID = f'{CMD_ID}_generate'
+Generation = collections.namedtuple('Generation',
+                                    'steps progressDialog timelineStart context tag group trace replaced')
+generation = None
+
+# A back made again by "Update Existing Back": the id of the old back, deleted
+# once the new one is finished, and the (user parameter, expression) of the
+# parameters the new back took over, set back if it is cancelled or fails
+ReplacedBack = collections.namedtuple('ReplacedBack', 'id parameters')
+
+# Custom graphics of the preview and the layout they show, and their colours
+# (red, green, blue, opacity)
+previewGraphics = None
+previewLayout = None
+PREVIEW_BACK_COLOR = (180, 180, 180, 160)
+PREVIEW_SLOT_COLOR = (230, 120, 40, 255)
+
+# fast mode joins this many slots per chunk
+SLOTS_PER_CHUNK = 20
+
+# Origin planes and axes of a component, by their names in back plans
+PLAN_PLANES = {'xy': 'xYConstructionPlane', 'xz': 'xZConstructionPlane', 'yz': 'yZConstructionPlane'}
+PLAN_AXES = {'x': 'xConstructionAxis', 'y': 'yConstructionAxis', 'z': 'zConstructionAxis'}
+
+# A feature of a plan made as a temporary body: the piece it added to (or cut
+# from) its body, kept for patterns of the feature
+TemporaryFeature = collections.namedtuple('TemporaryFeature', 'piece operation body')
+
+# Slot tools kept for reuse, per document until it is closed: {creationId: {kind: SlotToolCacheEntry}}
+SlotToolCacheEntry = collections.namedtuple('SlotToolCacheEntry', 'key body')
+slotToolCache = {}
+
+
+def active_design_context():
+    global designContext
+
+    document = app.activeDocument
+    if designContext is None or designContext.document != document or not designContext.design.isValid:
+        activeDesign = adsk.fusion.Design.cast(app.activeProduct)
+        if activeDesign is None:
+            raise RuntimeError('Multiconnect backs can only be made in a design')
+        designRoot = activeDesign.rootComponent
+        designContext = DesignContext(document, activeDesign, designRoot, designRoot.features,
+                                      activeDesign.userParameters)
+    return designContext
+
+
+def use_design(context):
+    global document, design, root, features, userParams
+    document, design, root, features, userParams = context
+
+
+def design_parameter_value(name, default):
+    # The value of a user parameter of the design, or default when there is
+    # none yet. The parameter is looked up every time rather than kept, as
+    # Fusion may have deleted it, for instance when it rolled back a preview.
+    parameter = userParams.itemByName(name)
+    return default if parameter is None else parameter.value
+
+
+def add_dot_radius():
+    # Create the dot radius user parameter if it doesn't exist; only OK does,
+    # validation and the preview go by mcback.DOT_RADIUS until then
+    add_missing_user_parms([UserParm(paramName, mcback.DOT_RADIUS, paramUnit, "Radius of the connector dot")])
+
+
+def forget_design(args: adsk.core.DocumentEventArgs):
+    # another document is active (or the one we had is gone)
+    global designContext
+    designContext = None
+
+
+def forget_closed_documents(args: adsk.core.DocumentEventArgs):
+    # The slot tools kept for documents that are no longer open. Fusion has
+    # no document to hand over once it is closed, so the cache is checked
+    # against the documents still open.
+    forget_design(args)
+    openDocuments = {openDocument.creationId for openDocument in app.documents}
+    for creationId in set(slotToolCache) - openDocuments:
+        del slotToolCache[creationId]
 
 
 # Executed when add-in is run.
@@ -101,6 +233,14 @@ def start():
     # Define an event handler for the command created event. It will be called when the button is clicked.
     futil.add_handler(cmd_def.commandCreated, command_created)
 
+    # The design is looked up again when the active document changes
+    futil.add_handler(app.documentActivated, forget_design)
+    futil.add_handler(app.documentClosed, forget_closed_documents)
+
+    # Generation steps are run from this event
+    generate_event = app.registerCustomEvent(GENERATE_EVENT_ID)
+    futil.add_handler(generate_event, generation_step)
+
     # ******** Add a button into the UI so the user can run the command. ********
     # Get the target workspace the button will be created in.
     workspace = ui.workspaces.itemById(WORKSPACE_ID)
@@ -131,16 +271,33 @@ def stop():
     if command_definition:
         command_definition.deleteMe()
 
+    slotToolCache.clear()
+
+    global generation
+    if generation is not None:
+        finish_generation(rollback=True)
+    app.unregisterCustomEvent(GENERATE_EVENT_ID)
+
+    for name, stats in futil.handler_stats().items():
+        if stats.count:
+            logger.info('%s handled %d events in %.1f ms, longest %.1f ms', name, stats.count,
+                        stats.total * 1000, stats.longest * 1000)
+    futil.flush_log()
+
 
 # Function that is called when a user clicks the corresponding button in the UI.
 # This defines the contents of the command dialog and connects to the command related events.
 def command_created(args: adsk.core.CommandCreatedEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Created Event')
+    logger.info('%s Command Created Event', CMD_NAME)
 
     # https://help.autodesk.com/view/fusion360/ENU/?contextId=CommandInputs
     inputs = args.command.commandInputs
 
+    # what tells this dialog's state apart from that of any other, see dialog_state
+    dialogIdInput = inputs.addTextBoxCommandInput('dialog_id', 'Dialog', uuid.uuid4().hex, 1, True)
+    dialogIdInput.isVisible = False
+
     # Create a value input field for the width
     defaultLengthUnits = app.activeProduct.unitsManager.defaultLengthUnits
     default_value = adsk.core.ValueInput.createByString('140')
@@ -154,396 +311,1308 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
     # boolean input for whether to create the back and cut
     inputs.addBoolValueInput('tools_only', 'Tools Only', True)
 
-    # TODO Connect to the events that are needed by this command.
-    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
-    futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
-    futil.add_handler(args.command.executePreview, command_preview, local_handlers=local_handlers)
-    futil.add_handler(args.command.validateInputs, command_validate_input, local_handlers=local_handlers)
-    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
-
-
-def join_bodies(bodies):
-    # join this bodies into a single one, keeping the name of the first
-
-    body = bodies.item(0)
-    name = body.name
-
-    tools = adsk.core.ObjectCollection.create()
-
-    for i in range(1, bodies.count):
-        tools.add(bodies.item(i))
-
-    combineFeatures = features.combineFeatures
-    combineInput = combineFeatures.createInput(body, tools)
-    combineInput.isNewComponent = False
-    combineInput.isKeepToolBodies = False
-    combineInput.operation = adsk.fusion.FeatureOperations.JoinFeatureOperation
-    combineFeatures.add(combineInput)
-    body.name = name
-    return body
-
+    # how the slots are built
+    generation_mode_input = inputs.addDropDownCommandInput('generation_mode', 'Generation Mode',
+                                                           adsk.core.DropDownStyles.TextListDropDownStyle)
+    for mode in GENERATION_MODES:
+        generation_mode_input.listItems.add(mode, mode == PATTERN_MODE)
+
+    # change the last back made instead of adding another one
+    inputs.addBoolValueInput('update_existing', 'Update Existing Back', True)
+
+    # several backs in one go, one per row; Add Row copies the width and height above
+    batchTable = inputs.addTableCommandInput('batch_table', 'Batch', 2, '1:1')
+    batchTable.maximumVisibleRows = 6
+    for id, name in (('batch_add', 'Add Row'), ('batch_remove', 'Remove Row')):
+        batchTable.addToolbarCommandInput(batchTable.commandInputs.addBoolValueInput(id, name, False, '', False))
+
+    # split backs wider than the printer bed between slots
+    inputs.addBoolValueInput('tile_to_bed', 'Tile to Printer Bed', True)
+    for id, name in (('bed_width', 'Bed Width'), ('bed_depth', 'Bed Depth')):
+        bedInput = inputs.addValueInput(id, name, defaultLengthUnits, adsk.core.ValueInput.createByString('256'))
+        bedInput.isVisible = False
+
+    # what OK would make and what it takes to print, filled in by command_validate_input
+    inputs.addValueInput('nozzle_diameter', 'Nozzle Diameter', 'mm', adsk.core.ValueInput.createByString('0.4'))
+    inputs.addValueInput('layer_height', 'Layer Height', 'mm', adsk.core.ValueInput.createByString('0.2'))
+    for id, name in (('back_size', 'Size'), ('back_material', 'Material'), ('print_estimate', 'Print Estimate')):
+        inputs.addTextBoxCommandInput(id, name, '', 1, True)
 
-
-def create_user_parm_if_needed(param):
-    fRef = userParams.itemByName(param.name)
-
-    if fRef is None:
-        fRef=userParams.add(param.name,
-                            adsk.core.ValueInput.createByString(str(param.value)),
-                            param.unit, param.desc)
-        
-    return (param.name, FParm(param.value, fRef))
+    # TODO Connect to the events that are needed by this command.
+    futil.add_handler(args.command.execute, command_execute, command=args.command)
+    futil.add_handler(args.command.inputChanged, command_input_changed, command=args.command)
+    futil.add_handler(args.command.executePreview, command_preview, command=args.command)
+    futil.add_handler(args.command.validateInputs, command_validate_input, command=args.command)
+    futil.add_handler(args.command.destroy, command_destroy, command=args.command)
+
+
+def add_missing_user_parms(params):
+    # Create the parameters the design doesn't have yet. Those it has, like
+    # the settings all backs share, are the user's to change and are left as
+    # they are, or every back made after a change would undo it.
+    for param in params:
+        if userParams.itemByName(param.name) is None:
+            userParams.add(param.name, value_input(param.value), param.unit, param.desc)
+
+
+def sync_user_parms(params):
+    # Bring the design's user parameters in line with params. The existing
+    # parameters are read once into an index; missing ones are created and
+    # the ones whose value differs are changed together, so the timeline is
+    # recomputed once rather than once per parameter. The parameters are
+    # worked out in Python first, so a set Fusion couldn't compute raises
+    # before anything in the design is changed.
+    existing = {fRef.name: fRef for fRef in userParams}
+    values = resolve_user_parms(params, existing)
+    logger.debug('%s user parameters %s', CMD_NAME, values)
+
+    changed = []
+    changedValues = []
+    synced = {}
+    for param in params:
+        fRef = existing.get(param.name)
+        if fRef is None:
+            fRef = userParams.add(param.name, value_input(param.value), param.unit, param.desc)
+        elif user_parm_differs(fRef, param):
+            changed.append(fRef)
+            changedValues.append(value_input(param.value))
+        synced[param.name] = FParm(param.value, fRef)
+
+    if changed:
+        design.modifyParameters(changed, changedValues)
+    futil.count('parameters changed', len(changed))
+
+    return synced
+
+
+def resolve_user_parms(params, existing=None):
+    # {name: value} of the user parameters, raises mcback.ExpressionError;
+    # the parameters they refer to that aren't among them are taken from
+    # existing, {name: fRef} of the design's
+    parameters = {param.name: param.value for param in params}
+    referenced = set().union(*(mcback.expression_names(value) for value in parameters.values()
+                               if isinstance(value, str)))
+    for name in referenced.difference(parameters).intersection(existing or {}):
+        parameters[name] = existing[name].value
+    return mcback.resolve(parameters, {param.name: param.unit for param in params})
+
+
+def user_parm_differs(fRef, param):
+    if isinstance(param.value, str):
+        return fRef.expression.replace(' ', '') != param.value.replace(' ', '')
+    return not math.isclose(fRef.value, param.value, abs_tol=1e-9)
+
+
+def value_input(value):
+    # numbers are in internal units, strings are expressions
+    if isinstance(value, str):
+        return adsk.core.ValueInput.createByString(value)
+    return adsk.core.ValueInput.createByReal(value)
 
 # This event handler is called when the user clicks the OK button in the command dialog or 
 # is immediately called after the created event not command inputs were created for the dialog.
 def command_execute(args: adsk.core.CommandEventArgs):
 
+    # Every stage is timed in a trace when tracing is on. The trace ends with
+    # the command, or when the generation it started finishes.
+    run = futil.open_span('command_execute')
     try:
 
         # Get a reference to your command's inputs.
-        inputs = args.command.commandInputs
-        width_value_input: adsk.core.TextBoxCommandInput = inputs.itemById('width_value_input')
-        height_value_input: adsk.core.ValueCommandInput = inputs.itemById('height_value_input')
-        tool_only_input = inputs.itemById('tools_only')
-    
-        backWidth = max(width_value_input.value, distanceBetweenSlots)
-        slotCount = math.floor(backWidth/distanceBetweenSlots)
-    
-        modelUserParms = [
-            UserParm("width", width_value_input.value, "cm", "width of the model"),
-            UserParm("height", height_value_input.value, "cm", 'height of the model'),
-            UserParm("tools_only", 1 if tool_only_input.value else 0, "", 'who knows'),
-            UserParm("backHeight", f'max(height;2.5cm)', "cm", 'height of the back'),
-            UserParm("backWidth", f'max(width;{distanceBetweenSlotsParm})', "cm", 'height of the back'),
-            UserParm("slotCount", 'floor(backWidth/distanceBetweenSlots)', '', 'number of slots'),
-            UserParm("backThickness", "0.65", "cm", 'thickness of the back')
-        ]
-
-        dUserParms = dict(map(create_user_parm_if_needed, generalModelUserParms + modelUserParms))
-    
-    
-        slot_tool = create_slot()
-        
-        # Move the tool to the middle slot location
-        bodies = adsk.core.ObjectCollection.create()
-        bodies.add(slot_tool)
-    
-        # offset to the edge location, because symmetrical patterns aren't working correctly in the API
-
-        ax = adsk.core.ValueInput.createByString("distanceBetweenSlots * ( 1 - slotCount)/2")
-        ay = adsk.core.ValueInput.createByString("backThickness - 0.5cm")
-        az = adsk.core.ValueInput.createByString("backHeight - 1.3cm")
-
-        moveFeats = features.moveFeatures
-        moveFeatureInput = moveFeats.createInput2(bodies)
-        moveFeatureInput.defineAsTranslateXYZ(ax, ay, az, True)
-        moveFeats.add(moveFeatureInput)
-    
-        #  Make more slots
-        rectangularPatterns = features.rectangularPatternFeatures
-        patternInput = rectangularPatterns.createInput(
-            bodies, 
-            root.xConstructionAxis,
-            adsk.core.ValueInput.createByString("slotCount"),
-            adsk.core.ValueInput.createByString("distanceBetweenSlots"), 
-            adsk.fusion.PatternDistanceType.SpacingPatternDistanceType)
-
-        patternInput.setDirectionTwo(root.yConstructionAxis,
-                                     adsk.core.ValueInput.createByString('1'),
-                                     adsk.core.ValueInput.createByString('0cm'))
-
-        slotPattern = rectangularPatterns.add(patternInput)
-        slotBodies = adsk.core.ObjectCollection.create()
-        for body in slotPattern.bodies:
-            slotBodies.add(body)
-
-        # joint the slots into a body
-        slots = join_bodies(slotBodies)
-
-        if not tool_only_input.value:
-        # Make the overall shape
-            back = create_back_cube("backWidth", "backThickness", "backHeight")
-    
-            # Subtract the slot tool
-            combineFeatures = features.combineFeatures
-    
-            input: adsk.fusion.CombineFeatureInput = combineFeatures.createInput(back, slotBodies)
-            input.isNewComponent = False
-            input.isKeepToolBodies = False
-            input.operation = adsk.fusion.FeatureOperations.CutFeatureOperation
-            combineFeature = combineFeatures.add(input)
-
+        with futil.span('read inputs', parent=run):
+            inputs = args.command.commandInputs
+            use_design(active_design_context())
+            state = dialog_state(inputs)
+            if not state.isValid:
+                # OK is disabled for these inputs, see command_validate_input
+                logger.info('%s inputs are not valid, nothing made', CMD_NAME)
+                return
+            layout = state.layout
+            tools_only = layout.params.toolsOnly
+            clear_preview()
+            add_dot_radius()
+        if run:
+            run.args.update(generationMode=state.generationMode, backs=len(state.backs),
+                            width=layout.params.width, height=layout.params.height, toolsOnly=tools_only)
+
+        done, replacedTag = False, None
+        with futil.span('update existing back', parent=run):
+            if state.updateExisting:
+                done, replacedTag = update_existing_back(state)
+        if done:
+            return
+        replaced = ReplacedBack(replacedTag.id, ()) if replacedTag else None
+
+        if len(state.backs) > 1:
+            # the tag of a batch has the slot counts of all its backs
+            tag = BackTag(id=uuid.uuid4().hex, made=time.time(), generationMode=state.generationMode,
+                          toolsOnly=tools_only, slotCount=[back.layout.slotCount for back in state.backs])
+            if state.generationMode != FAST_MODE:
+                with futil.span('sync user parameters', parent=run):
+                    add_missing_user_parms(generalModelUserParms)
+            start_generation(create_back_batch(state.backs, state.generationMode), tag,
+                             group=f'{len(state.backs)} Multiconnect Backs', trace=run, replaced=replaced)
+            return
+
+        if state.generationMode == FAST_MODE:
+            # nothing in the design refers to the user parameters, so they are left alone
+            tag = BackTag(id=uuid.uuid4().hex, made=time.time(), generationMode=state.generationMode,
+                          toolsOnly=tools_only, slotCount=layout.slotCount)
+            start_generation(create_back_fast(layout), tag, trace=run, replaced=replaced)
+            return
+
+        # the back gets user parameters of its own, or those of the back it replaces
+        with futil.span('sync user parameters', parent=run):
+            suffix = replacedTag.parameterSuffix if replacedTag else ''
+            suffix = suffix or new_parameter_suffix()
+            names = back_parameter_names(suffix)
+            if replaced:
+                replaced = replaced._replace(parameters=parameter_expressions(names.values()))
+            add_missing_user_parms(generalModelUserParms)
+            dUserParms = sync_user_parms(model_user_parms(layout, names))
+        tag = BackTag(id=uuid.uuid4().hex, made=time.time(), generationMode=state.generationMode,
+                      toolsOnly=tools_only, slotCount=layout.slotCount, parameterSuffix=suffix)
+
+        if state.generationMode == SINGLE_SKETCH_MODE:
+            steps = create_back_single_sketch(layout, tools_only, names)
+        elif state.generationMode == COMPONENTS_MODE:
+            steps = create_back_components(layout, names)
+        else:
+            steps = create_back_pattern(layout, names)
+        start_generation(steps, tag, trace=run, replaced=replaced)
 
     except:
         if ui:
             ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
         app.log(f'Failed:\n{traceback.format_exc()}')
-    
-    
-def create_point_dimensions_xy(sketch, x, y):
-    global sketchAxes
 
-    # we first create the points (anywhere)
-    point = adsk.core.Point3D.create(0,  0,0)
-    point0 = adsk.core.Point3D.create(0, 0,0)
-    sketchPoints = sketch.sketchPoints
+    finally:
+        if generation is None or generation.trace is not run:
+            futil.close_span(run)
+
+
+def model_user_parms(layout, names=None):
+    # the user parameters that drive the features of one back, named as
+    # names maps them (see back_parameter_names), or as the plans name them
+    tools_only = layout.params.toolsOnly
+    names = names or back_parameter_names('')
+    return [
+        UserParm(names["width"], layout.params.width, "cm", "width of the model"),
+        UserParm(names["height"], layout.params.height, "cm", 'height of the model'),
+        UserParm(names["tools_only"], 1 if tools_only else 0, "", 'who knows'),
+        UserParm(names["backHeight"], mcback.rename(mcback.BACK_EXPRESSIONS['backHeight'], names), "cm",
+                 'height of the back'),
+        UserParm(names["backWidth"], mcback.rename(mcback.BACK_EXPRESSIONS['backWidth'], names), "cm",
+                 'height of the back'),
+        UserParm(names["slotCount"], mcback.rename(mcback.BACK_EXPRESSIONS['slotCount'], names), '',
+                 'number of slots'),
+        UserParm(names["backThickness"], layout.params.backThickness, "cm", 'thickness of the back')
+    ]
+
+
+def back_parameter_names(suffix):
+    # {name in the plans: name of the back's user parameter}; backs made
+    # before backs had parameters of their own share them, with suffix ''
+    return {name: name + suffix for name in BACK_PARAMETERS}
+
+
+def new_parameter_suffix():
+    # the first suffix _1, _2, ... that no back's parameters have yet
+    n = 1
+    while userParams.itemByName(f'{BACK_PARAMETERS[0]}_{n}') is not None:
+        n += 1
+    return f'_{n}'
+
+
+def update_existing_back(state):
+    # Changes the most recent back made by the add-in instead of making another
+    # one. When the back's features can follow the new size (same mode, same
+    # slot count and height, as its slot tool is fixed, see shared_tool_plan)
+    # only the back's own user parameters are changed and Fusion recomputes
+    # the timeline. Otherwise, and always for a batch or tiles, a new back is
+    # generated to take its place and over its parameters, and the old back's
+    # features are deleted once the new one is finished, so a cancel or a
+    # failure leaves the old one as it was. Features added after the back may
+    # build on it and would fail or go with it, so the user is asked first.
+    # Returns (done, replaced): done when nothing is left to make, and the
+    # BackTag of the back the new one replaces, or None.
+    backs = find_backs()
+    if not backs:
+        logger.info('%s found no back to update, making a new one', CMD_NAME)
+        return False, None
+
+    tag, entities = max(backs.values(), key=lambda back: back[0].made)
+    layout = state.layout
+    names = back_parameter_names(tag.parameterSuffix)
+    backHeight = userParams.itemByName(names['backHeight']) if tag.parameterSuffix else None
+    if (len(state.backs) == 1 and tag.generationMode == state.generationMode and tag.generationMode in UPDATABLE_MODES
+            and tag.toolsOnly == layout.params.toolsOnly and tag.slotCount == layout.slotCount
+            and backHeight is not None and math.isclose(backHeight.value, layout.backHeight, abs_tol=1e-9)):
+        sync_user_parms(model_user_parms(layout, names))
+        logger.info('%s updated back %s in place', CMD_NAME, tag.id)
+        return True, None
+
+    later = later_features(entities)
+    if later:
+        answer = ui.messageBox(f'The back is made again to change it. {len(later)} timeline features after it may '
+                               f'build on it and fail or be lost.\n\nMake the back again?', CMD_NAME,
+                               adsk.core.MessageBoxButtonTypes.YesNoButtonType,
+                               adsk.core.MessageBoxIconTypes.WarningIconType)
+        if answer != adsk.core.DialogResults.DialogYes:
+            logger.info('%s left back %s as it is', CMD_NAME, tag.id)
+            return True, None
+
+    logger.info('%s makes back %s again', CMD_NAME, tag.id)
+    return False, tag
+
+
+def parameter_expressions(names):
+    # (user parameter, expression) of those of names the design has
+    return tuple((fRef, fRef.expression) for fRef in map(userParams.itemByName, names) if fRef is not None)
+
+
+def restore_parameters(parameters):
+    # set the (user parameter, expression) pairs back, in one recompute
+    parameters = [(fRef, expression) for fRef, expression in parameters if fRef.isValid]
+    if parameters:
+        design.modifyParameters([fRef for fRef, _ in parameters],
+                                [adsk.core.ValueInput.createByString(expression) for _, expression in parameters])
+
+
+def find_backs():
+    # {back id: (BackTag, [tagged entities])} for every back made by the add-in
+    backs = {}
+    for attribute in design.findAttributes(ATTRIBUTE_GROUP, BACK_ATTRIBUTE):
+        tag = BackTag(**json.loads(attribute.value))
+        backs.setdefault(tag.id, (tag, []))[1].append(attribute.parent)
+    return backs
+
+
+def delete_back(entities):
+    # latest timeline entries first, so nothing is deleted from under a later feature
+    for entity in sorted(entities, key=timeline_index, reverse=True):
+        if entity.isValid:
+            entity.deleteMe()
+
+
+def later_features(entities):
+    # the timeline entries after the first of a back's that no back is made of
+    timelineIndices = [index for index in map(timeline_index, entities) if index >= 0]
+    if not timelineIndices:
+        return []
+    timeline = design.timeline
+    later = []
+    for i in range(min(timelineIndices) + 1, timeline.count):
+        entity = timeline.item(i).entity
+        if entity is not None and not (entity.attributes.itemByName(ATTRIBUTE_GROUP, BACK_ATTRIBUTE)
+                                       or entity.attributes.itemByName(ATTRIBUTE_GROUP, TEMPLATE_ATTRIBUTE)):
+            later.append(entity)
+    return later
+
+
+def timeline_index(entity):
+    # -1 for what isn't in the timeline
+    timelineObject = getattr(entity, 'timelineObject', None)
+    return timelineObject.index if timelineObject else -1
+
+
+def tag_back(entity, tag):
+    entity.attributes.add(ATTRIBUTE_GROUP, BACK_ATTRIBUTE, json.dumps(tag._asdict()))
+
+
+def tag_timeline(start, tag):
+    # tag everything after start in the timeline, except shared slot templates
+    if start is None:
+        return
+    timeline = design.timeline
+    for i in range(start, timeline.count):
+        entity = timeline.item(i).entity
+        if entity is not None and not entity.attributes.itemByName(ATTRIBUTE_GROUP, TEMPLATE_ATTRIBUTE):
+            tag_back(entity, tag)
+
+
+def group_timeline(start, name):
+    # One timeline entry for everything after start, to suppress, roll back
+    # or delete together. It is not one undo step: the features are added in
+    # custom events after the command has ended, each its own step.
+    if start is None or name is None:
+        return
+    timeline = design.timeline
+    if timeline.count > start:
+        group = timeline.timelineGroups.add(start, timeline.count - 1)
+        group.name = name
+
+
+def timeline_position():
+    # None in a design without history
+    if design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+        return design.timeline.markerPosition
+    return None
+
+
+def dialog_state(inputs):
+    # The handlers of one dialog share what its inputs work out to. It is
+    # worked out again on the first request after an input has changed, so
+    # the validation, preview and OK that follow a change read the inputs
+    # once between them; each change still costs one read.
+    dialogId = dialog_id(inputs)
+    state = dialogStates.get(dialogId)
+
+    if state is None:
+        toolsOnly = inputs.itemById('tools_only').value
+
+        def back_layout(width, height):
+            return mcback.layout(mcback.BackParams(width, height,
+                                                   design_parameter_value(paramName, mcback.DOT_RADIUS),
+                                                   design_parameter_value(distanceBetweenSlotsParm,
+                                                                          distanceBetweenSlots),
+                                                   design_parameter_value(onRampEveryXSlotsParm, onRampEveryXSlots),
+                                                   baseThickness, toolsOnly=toolsOnly))
+
+        width = inputs.itemById('width_value_input').value
+        height = inputs.itemById('height_value_input').value
+        batchTable = inputs.itemById('batch_table')
+        batchSizes = [(batchTable.getInputAtPosition(row, 0).value, batchTable.getInputAtPosition(row, 1).value)
+                      for row in range(batchTable.rowCount)]
+        generationMode = inputs.itemById('generation_mode').selectedItem.name
+        bed = None
+        if inputs.itemById('tile_to_bed').value:
+            bed = (inputs.itemById('bed_width').value, inputs.itemById('bed_depth').value)
+
+        try:
+            layout = back_layout(width, height)
+            backs = tuple(placed_backs([back_layout(*size) for size in batchSizes] or [layout], bed))
+        except ValueError:
+            # a size no back can be made at (mcback.ExpressionError), or a back that doesn't fit on the bed
+            layout, backs = None, ()
+        state = dialogStates[dialogId] = DialogState(
+            layout=layout,
+            backs=backs,
+            generationMode=generationMode,
+            updateExisting=inputs.itemById('update_existing').value,
+            printSettings=mcback.PrintSettings(nozzleDiameter=inputs.itemById('nozzle_diameter').value,
+                                               layerHeight=inputs.itemById('layer_height').value),
+            isValid=(all(w >= 0 and h >= 0 for w, h in [(width, height)] + batchSizes)
+                     and layout is not None and len(backs) > 0
+                     and (len(backs) == 1 or generationMode in BATCH_MODES)))
+    return state
+
+
+def dialog_id(inputs):
+    return inputs.itemById('dialog_id').text
+
+
+def placed_backs(layouts, bed=None):
+    # The backs stacked along z, each split into tiles spread along x when a
+    # bed (width, depth) is given. Raises ValueError when a back doesn't fit.
+    backs = []
+    z = 0
+    for layout in layouts:
+        tiles = mcback.tiles(layout.params, *bed) if bed else [mcback.Tile(layout.params, 0)]
+        for i, tile in enumerate(tiles):
+            x = tile.x + BATCH_SPACING * (i - (len(tiles) - 1) / 2)
+            backs.append(PlacedBack(mcback.layout(tile.params), x, z))
+        z += layout.backHeight + BATCH_SPACING
+    return backs
+
+
+def invalidate_dialog_state(inputs):
+    dialogStates.pop(dialog_id(inputs), None)
+
+
+def show_estimate(inputs, state):
+    # The size of the back, its volume and surface area, and the filament and
+    # time it takes to print, all worked out in closed form by mcback from
+    # the layouts, so they follow every change of the inputs. A batch or a
+    # back in tiles is printed piece by piece; the pieces are added up.
+    dialogId = dialog_id(inputs)
+    shown = (state.backs, state.printSettings, state.isValid)
+    if estimatesShown.get(dialogId) == shown:
+        return
+    estimatesShown[dialogId] = shown
+
+    size = material = estimate = ''
+    if state.isValid:
+        pieces = [mcback.back_properties(back.layout) for back in state.backs]
+        largest = max(pieces, key=lambda piece: piece.bounds[1][0] - piece.bounds[0][0])
+        size = ' x '.join(f'{(high - low) * 10:.1f}' for low, high in zip(*largest.bounds)) + ' mm'
+        if len(pieces) > 1:
+            size = f'{len(pieces)} pieces, the widest {size}'
+
+        if state.layout.params.toolsOnly:
+            material = 'Tools only, nothing to print'
+        else:
+            material = (f'{sum(piece.volume for piece in pieces):.1f} cm³, '
+                        f'{sum(piece.area for piece in pieces):.0f} cm² of surface')
+            settings = state.printSettings
+            if settings.nozzleDiameter > 0 and settings.layerHeight > 0:
+                prints = [mcback.print_estimate(piece, settings) for piece in pieces]
+                minutes = round(sum(p.seconds for p in prints) / 60)
+                estimate = (f'{sum(p.mass for p in prints):.0f} g, '
+                            f'{sum(p.filamentLength for p in prints) / 100:.1f} m of filament, '
+                            f'{minutes // 60} h {minutes % 60:02d} min')
+
+    for id, text in (('back_size', size), ('back_material', material), ('print_estimate', estimate)):
+        inputs.itemById(id).formattedText = text
+
+
+def start_generation(steps, tag, group=None, trace=None, replaced=None):
+    # The create_back_* functions are generators that yield (fraction done,
+    # what comes next) between chunks of work. Each chunk runs in its own
+    # custom event, so Fusion gets to update its UI in between, and a progress
+    # dialog lets the user cancel. A cancel or a failure deletes everything
+    # the generation added to the timeline, and sets back the parameters of
+    # the back it was to replace. Once finished, what was added is tagged as
+    # the back described by tag, and only then is the replaced back deleted.
+    global generation
+
+    if generation is not None:
+        ui.messageBox('A back is still being generated, please wait for it to finish.')
+        return
+
+    progressDialog = ui.createProgressDialog()
+    progressDialog.isCancelButtonShown = True
+    progressDialog.show(CMD_NAME, 'Building slot tool', 0, 100, 1)
+
+    generation = Generation(steps, progressDialog, timeline_position(), designContext, tag, group, trace, replaced)
+    app.fireCustomEvent(GENERATE_EVENT_ID)
+
+
+def generation_step(args: adsk.core.CustomEventArgs):
+    # runs the next chunk of the current generation
+    global generation
+
+    current = generation
+    if current is None:
+        return
+
+    if not current.context.design.isValid:
+        # the document was closed, so there is nothing left to finish or roll back
+        generation = None
+        current.progressDialog.hide()
+        return
+
+    # keep working on the design the generation started in
+    use_design(current.context)
+
+    if current.progressDialog.wasCancelled:
+        logger.info('%s generation cancelled', CMD_NAME)
+        finish_generation(rollback=True)
+        return
 
-    sketchP = sketchPoints.add(point)
-    sketchP0 = sketchPoints.add(point0)
-    # then we constraint them to their position
-    
-    sketchDimensions = sketch.sketchDimensions
-    
-    if x:
-        dimx = sketchDimensions.addDistanceDimension(sketchP, sketchP0, 
-                                                     adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation,
-                                                     adsk.core.Point3D.create(0, 0, 0))
-        dimx.parameter.expression = x
-    else:
-        sketch.geometricConstraints.addCoincident(sketchP, sketchAxes.y)
-
-    if y:
-        dimy = sketchDimensions.addDistanceDimension(sketchP, sketchP0,
-                                                     adsk.fusion.DimensionOrientations.VerticalDimensionOrientation,
-                                                     adsk.core.Point3D.create(0, 0, 0))
-        dimy.parameter.expression = y
-    else:
-        sketch.geometricConstraints.addCoincident(sketchP, sketchAxes.x)
-        
-    return sketchP
-
-
-
-def create_centered_rectangle_dimensions(sketch, centerPoint, widthStr, heightStr,
-                                         labelPointX=None, labelPointY=None):
-    # centerPoint is a sketch point
-
-    if labelPointX == None:
-        labelPointX = adsk.core.Point3D.create(0, 0, 0)
-    if labelPointY == None:
-        labelPointY = adsk.core.Point3D.create(0, 0, 0)
-    labelPointCX = adsk.core.Point3D.create(0, 0, 0)
-    labelPointCY = adsk.core.Point3D.create(0, 0, 0)
-
-    lines = sketch.sketchCurves.sketchLines
-    dimensions = sketch.sketchDimensions
-    # create the rectangle to any point, we'll constraint it latere
-    point = adsk.core.Point3D.create(10, 10, 0)
-
-    # create rectangle
-    rect = lines.addCenterPointRectangle(centerPoint.geometry, point)
-
-    # Apply dimensions using user parameters
-    # length horizontal
-    dimensions.addDistanceDimension(rect[0].startSketchPoint, rect[0].endSketchPoint, 
-                                    adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, 
-                                    labelPointX).parameter.expression = widthStr
-    # length vertical
-    dimensions.addDistanceDimension(rect[1].startSketchPoint, rect[1].endSketchPoint, 
-                                    adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, 
-                                    labelPointY).parameter.expression = heightStr
-
-    # position of the corner with respect to the centerPoint
-    cornerx = dimensions.addDistanceDimension(rect[0].startSketchPoint, centerPoint, 
-                                    adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation,
-                                                     labelPointCX)
-    cornerx.parameter.expression = widthStr + "/2"
-
-    cornery = dimensions.addDistanceDimension(rect[1].startSketchPoint, centerPoint, 
-                                    adsk.fusion.DimensionOrientations.VerticalDimensionOrientation,
-                                                     labelPointCY)
-    cornery.parameter.expression = heightStr + "/2"
-
-    return rect
-
-
-def create_axis(sketch, isx, len):
-    # isx true for x axis
-    if isx:
-        point1 = adsk.core.Point3D.create(-len, 0, 0)
-        point2 = adsk.core.Point3D.create(len, 0, 0)
-        constr = sketch.geometricConstraints.addHorizontal
-    else:
-        point1 = adsk.core.Point3D.create(0, -len, 0)
-        point2 = adsk.core.Point3D.create(0, len, 0)
-        constr = sketch.geometricConstraints.addVertical
-        
-    axis = sketch.sketchCurves.sketchLines.addByTwoPoints(
-        point1, point2)
-
-    sketch.geometricConstraints.addCoincident(sketch.originPoint, axis)
-    
-    # set the horizontal/vertical constraint
-    constr(axis)
+    try:
+        with futil.span('generation step', parent=current.trace):
+            fraction, message = next(current.steps)
+    except StopIteration:
+        finish_generation()
+        return
+    except:
+        logger.error('%s generation failed:\n%s', CMD_NAME, traceback.format_exc())
+        finish_generation(rollback=True)
+        ui.messageBox('Failed, the design was left as it was before:\n{}'.format(traceback.format_exc()))
+        return
+
+    current.progressDialog.progressValue = int(fraction * 100)
+    current.progressDialog.message = message
+    app.fireCustomEvent(GENERATE_EVENT_ID)
+
+
+def finish_generation(rollback=False):
+    global generation
+
+    current, generation = generation, None
+    use_design(current.context)
+    current.steps.close()
+    current.progressDialog.hide()
+
+    with futil.span('roll back' if rollback else 'tag back', parent=current.trace):
+        if not rollback:
+            tag_timeline(current.timelineStart, current.tag)
+            group_timeline(current.timelineStart, current.group)
+            # after tagging and grouping, which go by timeline indices after
+            # timelineStart, as the replaced back comes before it
+            if current.replaced is not None:
+                replacedEntities = find_backs().get(current.replaced.id, (None, []))[1]
+                delete_back(replacedEntities)
+                logger.info('%s deleted back %s, made again', CMD_NAME, current.replaced.id)
+        else:
+            # what isn't in the timeline, like the occurrences of the Components mode
+            backs = find_backs()
+            if current.tag.id in backs:
+                delete_back(backs[current.tag.id][1])
+
+            if current.timelineStart is not None:
+                timeline = design.timeline
+                timeline.markerPosition = current.timelineStart
+                timeline.deleteAllAfterMarker()
+            if current.replaced is not None:
+                restore_parameters(current.replaced.parameters)
+    futil.close_span(current.trace)
+    futil.flush_log()
+
+
+def create_back_pattern(layout, names):
+    # one slot tool is built, patterned as bodies and joined before the cut
+    plan = back_parameter_plan(layout, names)
+    slot_tool = cached_slot_tool(PATTERN_MODE, pattern_slot_tool_key(layout),
+                                 lambda: build_slot_template(shared_tool_plan(layout).tool),
+                                 copy_body, discard=lambda body: body.deleteMe())
+
+    yield from plan_steps(plan.placement + plan.back, timeline_emitter(), {'slot': slot_tool}, 0.3)
+
+
+def back_parameter_plan(layout, names):
+    # the plan of a back, with its features following the back's own parameters
+    plan = mcback.optimize(mcback.back_plan(layout))
+    return plan._replace(placement=mcback.rename_parameters(plan.placement, names),
+                         back=mcback.rename_parameters(plan.back, names))
+
+
+def shared_tool_plan(layout):
+    # The plan of a slot tool kept for other backs, see cached_slot_tool. It
+    # can't follow the parameters of any one back, so the sizes those drive
+    # are fixed; backs that need another size get another tool.
+    return mcback.optimize(mcback.back_plan(layout), fixed=BACK_PARAMETERS)
+
+
+def create_back_components(layout, names):
+    # The slot tool is its own component and every slot is an occurrence of
+    # it, so the design holds the tool's geometry once however many slots
+    # there are. Only the cut into the back turns the slots into geometry;
+    # with "tools only" the occurrences are the result.
+    toolPlan = shared_tool_plan(layout)
+    slot_tool = cached_slot_tool(COMPONENTS_MODE, component_slot_tool_key(layout),
+                                 lambda: build_slot_tool_component(toolPlan.tool + toolPlan.placement),
+                                 lambda body: body)
+    toolComponent = slot_tool.parentComponent
+    yield 0.3, 'Placing slots'
+
+    occurrence = root.occurrences.addExistingComponent(toolComponent, adsk.core.Matrix3D.create())
+    tag_back(occurrence, generation.tag)
+
+    occurrences = adsk.core.ObjectCollection.create()
+    occurrences.add(occurrence)
+    rectangularPatterns = features.rectangularPatternFeatures
+    patternInput = rectangularPatterns.createInput(
+        occurrences,
+        root.xConstructionAxis,
+        adsk.core.ValueInput.createByString(names["slotCount"]),
+        adsk.core.ValueInput.createByString("distanceBetweenSlots"),
+        adsk.fusion.PatternDistanceType.SpacingPatternDistanceType)
+    slotPattern = rectangularPatterns.add(patternInput)
 
-    ##sketch.originPoint
-    axis.isConstruction = True
-    return axis
+    if layout.params.toolsOnly:
+        return
+    yield 0.5, 'Making the back'
 
+    slotOccurrences = [occurrence]
+    for element in slotPattern.patternElements:
+        slotOccurrences += [o for o in element.occurrences if o != occurrence]
+    slotBodies = adsk.core.ObjectCollection.create()
+    for slotOccurrence in slotOccurrences:
+        slotBodies.add(slot_tool.createForAssemblyContext(slotOccurrence))
 
-def create_back_cube(w, d, h):
-    global sketchAxes
-    sketch = root.sketches.add(root.xYConstructionPlane)
-    sketch.name = "Back Profile"
-    wDim = adsk.core.ValueInput.createByString(w)
-    dDim = adsk.core.ValueInput.createByString(d)
+    back = create_back_cube(mcback.rename_parameters([mcback.back_box(layout)], names)[0])
+    yield 0.7, 'Cutting slots'
 
-    sketchAxes = SketchAxes(create_axis(sketch, True, 20),
-                            create_axis(sketch, False, 20))
-    
-    centerPoint = create_point_dimensions_xy(sketch, None, d + "/2.0")
+    # the tool bodies belong to the shared component, so they have to be kept
+    combineFeatures = features.combineFeatures
+    input: adsk.fusion.CombineFeatureInput = combineFeatures.createInput(back, slotBodies)
+    input.isNewComponent = False
+    input.isKeepToolBodies = True
+    input.operation = adsk.fusion.FeatureOperations.CutFeatureOperation
+    combineFeatures.add(input)
+
+    for slotOccurrence in slotOccurrences:
+        slotOccurrence.isLightBulbOn = False
+
+
+def build_slot_tool_component(ops):
+    # the component's first occurrence is only there to own it and stays hidden
+    templateOccurrence = root.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+    templateOccurrence.isLightBulbOn = False
+    toolComponent = templateOccurrence.component
+    toolComponent.name = "Slot Tool"
+
+    start = timeline_position()
+    slot_tool = emit_plan(ops, timeline_emitter(toolComponent))['slot']
+    tag_template(start)
+    return slot_tool
+
+
+def cached_slot_tool(kind, key, build, copy, discard=None):
+    # Most backs made in a session share their slot tool, so the first tool
+    # built for a document is kept and copied for every later back with the
+    # same key. The entry is replaced when the key changes or its body has been
+    # deleted; discard, if given, gets rid of a replaced body that is still
+    # valid. kind keeps the tools of the different generation modes apart.
+    # The tools are kept for the document the generation works in, which
+    # needn't be the active one by the time a step runs.
+    documentTools = slotToolCache.setdefault(document.creationId, {})
+    entry = documentTools.get(kind)
+
+    if entry is None or entry.key != key or not entry.body.isValid:
+        if entry is not None and entry.body.isValid and discard:
+            discard(entry.body)
+        with futil.span(f'build {kind} slot tool'):
+            entry = SlotToolCacheEntry(key, build())
+        documentTools[kind] = entry
+        logger.info('%s built a new %s slot tool', CMD_NAME, kind)
+    else:
+        futil.count('slot tools reused')
+
+    return copy(entry.body)
+
+
+def pattern_slot_tool_key(layout):
+    # the values of the shared parameters that drive the features of the
+    # slot tool, and the height of the back its length is fixed at
+    return tuple(userParams.itemByName(name).value
+                 for name in (paramName, distanceBetweenSlotsParm, onRampEveryXSlotsParm)) + (layout.backHeight,)
+
+
+def component_slot_tool_key(layout):
+    # the tool is moved into place, at the first slot, inside its component
+    return pattern_slot_tool_key(layout) + (layout.params.backThickness, layout.slotCount)
+
+
+def layout_slot_tool_key(layout):
+    # for tools built at the origin from the values the parameters would have
+    params = layout.params
+    return (params.dotRadius, params.distanceBetweenSlots, params.onRampEveryXSlots, layout.backHeight)
+
+
+def build_slot_template(ops):
+    # the template stays in the design, hidden, and only copies of it are used
+    start = timeline_position()
+    template = emit_plan(ops, timeline_emitter())['slot']
+    tag_template(start)
+    template.name = "Slot Template"
+    template.isLightBulbOn = False
+    return template
+
+
+def tag_template(start):
+    # Slot templates are shared by the backs made from them, so they are kept
+    # out of the back they happened to be made for and never deleted with it.
+    if start is None:
+        return
+    timeline = design.timeline
+    for i in range(start, timeline.count):
+        timeline.item(i).entity.attributes.add(ATTRIBUTE_GROUP, TEMPLATE_ATTRIBUTE, '')
+
+
+def copy_body(body):
+    copyFeature = features.copyPasteBodies(body)
+    copy = copyFeature.bodies.item(0)
+    copy.isLightBulbOn = True
+    return copy
+
+
+def create_back_single_sketch(layout, tools_only, names):
+    # All slot cross-sections go into one sketch and are cut (or made) by one
+    # extrude, the rounded ends are one revolve patterned as a feature, and the
+    # onramps and dimples are one sketch and one extrude each. The number of
+    # features doesn't depend on the number of slots and no tool bodies are
+    # copied or joined. Sketch geometry is placed at the coordinates worked out
+    # by mcback.layout instead of being dimensioned. The features follow the
+    # back's own parameters, as names maps them.
+    FeatureOperations = adsk.fusion.FeatureOperations
+    Point3D = adsk.core.Point3D
+
+    def expression(text):
+        return mcback.rename(text, names)
+
+    targets = []
+    if not tools_only:
+        targets.append(create_back_cube(mcback.rename_parameters([mcback.back_box(layout)], names)[0]))
+
+    # the slot profiles are drawn where the straight part of the slot ends
+    planeInput = root.constructionPlanes.createInput()
+    planeInput.setByOffset(root.xYConstructionPlane, valueFromExpr(expression("backHeight - 1.3cm")))
+    slotPlane = root.constructionPlanes.add(planeInput)
+
+    yield 0.1, 'Sketching slots'
+    slotSketch = root.sketches.add(slotPlane)
+    slotSketch.name = "Slot Profiles"
+    with futil.SketchBuilder(slotSketch) as builder:
+        for outline in mcback.slot_outlines(layout):
+            builder.polyline(outline)
+    yield 0.3, 'Extruding slots'
+
+    slotExtrude = extrude_profiles(slotSketch, expression("backHeight"),
+                                   FeatureOperations.NewBodyFeatureOperation if tools_only
+                                   else FeatureOperations.CutFeatureOperation,
+                                   targets, direction=adsk.fusion.ExtentDirections.NegativeExtentDirection)
+    if tools_only:
+        targets = list(slotExtrude.bodies)
+        for body in targets:
+            body.name = "Slot"
+
+    addOperation = FeatureOperations.JoinFeatureOperation if tools_only else FeatureOperations.CutFeatureOperation
+    removeOperation = FeatureOperations.CutFeatureOperation if tools_only else FeatureOperations.JoinFeatureOperation
+
+    yield 0.5, 'Rounding slot ends'
+    # rounded end of the first slot: half the profile turned through 180 degrees,
+    # which is the quarter revolve of the slot tool plus its mirror
+    x0 = layout.slotXs[0]
+    endSketch = root.sketches.add(slotPlane)
+    endSketch.name = "Slot End Profile"
+    with futil.SketchBuilder(endSketch) as builder:
+        builder.polyline([(x0 + x, layout.slotFloor + y) for x, y in mcback.slot_profile(layout.params.dotRadius)])
+        axisLine, = builder.polyline([(x0, layout.slotFloor), (x0, layout.slotFloor + 1)], closed=False)
+        axisLine.isConstruction = True
 
-    #    cornerPoint = create_point_dimensions_xy(sketch, w + "/2.0", d)
+    revolveFeats = features.revolveFeatures
+    revolveInput = revolveFeats.createInput(endSketch.profiles.item(0), axisLine, addOperation)
+    revolveInput.setAngleExtent(False, adsk.core.ValueInput.createByReal(math.pi))
+    revolveInput.participantBodies = targets
+    revolveFeature = revolveFeats.add(revolveInput)
+
+    # and the same for the other slots, patterning the feature rather than bodies
+    patternEntities = adsk.core.ObjectCollection.create()
+    patternEntities.add(revolveFeature)
+    rectangularPatterns = features.rectangularPatternFeatures
+    patternInput = rectangularPatterns.createInput(
+        patternEntities,
+        root.xConstructionAxis,
+        valueFromExpr(expression("slotCount")),
+        valueFromExpr("distanceBetweenSlots"),
+        adsk.fusion.PatternDistanceType.SpacingPatternDistanceType)
+    patternInput.patternComputeOption = adsk.fusion.PatternComputeOptions.IdenticalPatternCompute
+    rectangularPatterns.add(patternInput)
+    yield 0.7, 'Adding onramps'
+
+    if layout.onrampCount:
+        rampSketch = root.sketches.add(root.xZConstructionPlane)
+        rampSketch.name = "Ramp Sketch"
+        with futil.SketchBuilder(rampSketch) as builder:
+            for x in layout.slotXs:
+                for z in layout.onrampZs:
+                    builder.circle(rampSketch.modelToSketchSpace(Point3D.create(x, 0, z)),
+                                   layout.params.dotRadius)
+        extrude_profiles(rampSketch, f"{mcback.ONRAMP_LENGTH}cm", addOperation, targets,
+                         startOffset=expression("backThickness - 0.5cm"))
+
+    yield 0.85, 'Adding dimples'
+    # the dimples are cones, made as tapered extrudes
+    dimpleSketch = root.sketches.add(root.xZConstructionPlane)
+    dimpleSketch.name = "Dimple sketch"
+    with futil.SketchBuilder(dimpleSketch) as builder:
+        for x in layout.slotXs:
+            builder.circle(dimpleSketch.modelToSketchSpace(Point3D.create(x, 0, layout.slotTop)), mcback.DIMPLE_SIZE)
+    extrude_profiles(dimpleSketch, f"{mcback.DIMPLE_SIZE}cm", removeOperation, targets,
+                     startOffset=expression("backThickness - 0.5cm"), taperAngle="-45 deg")
+
+
+def create_back_fast(layout):
+    # The slot tools and the back are built as temporary B-rep bodies and
+    # combined in memory. Only the finished body goes into the design, in a
+    # single base feature, so no sketches, parameters or feature recomputes
+    # are involved and the result can't be edited parametrically.
+    plan = mcback.optimize(mcback.back_plan(layout), direct=True)
+    tbm = adsk.fusion.TemporaryBRepManager.get()
+
+    tool = cached_slot_tool(FAST_MODE, layout_slot_tool_key(layout),
+                            lambda: emit_plan(plan.tool, emit_temporary_op)['slot'], tbm.copy)
+
+    entities = {'slot': tool}
+    yield from plan_steps(plan.placement + plan.back, emit_temporary_op, entities, 0.1, 0.9)
+    return add_temporary_body(temporary_bodies(entities[plan.result])[0], plan.result.title())
+
+
+def create_back_batch(backs, generationMode):
+    # Every back of a batch, or tile of a back, is built from its own plan,
+    # with the expressions of the sizes that differ from back to back folded
+    # into their values, so the backs share the design's user parameters
+    # without following each other's. They are moved to where placed_backs put
+    # them but built in the order of their slot tools, so each tool is built
+    # once. Earlier tools are left in place, hidden, for the backs copied from them.
+    direct = generationMode == FAST_MODE
+    fixed = [parm.name for parm in generalModelUserParms + model_user_parms(backs[0].layout)]
+    order = sorted(range(len(backs)), key=lambda i: layout_slot_tool_key(backs[i].layout))
+    tbm = adsk.fusion.TemporaryBRepManager.get()
+
+    for n, i in enumerate(order):
+        layout, x, z = backs[i]
+        plan = mcback.optimize(mcback.back_plan(layout), direct=direct, fixed=fixed)
+        ops = plan.placement + plan.back
+        if x or z:
+            ops.append(mcback.Move('place', plan.result, mcback.const(x), mcback.const(0), mcback.const(z)))
+        start, end = n / len(backs), (n + 1) / len(backs)
+
+        if direct:
+            tool = cached_slot_tool(FAST_MODE, layout_slot_tool_key(layout),
+                                    lambda: emit_plan(plan.tool, emit_temporary_op)['slot'], tbm.copy)
+            entities = {'slot': tool}
+            yield from plan_steps(ops, emit_temporary_op, entities, start, end)
+            add_temporary_body(temporary_bodies(entities[plan.result])[0], plan.result.title())
+        else:
+            tool = cached_slot_tool(f'{PATTERN_MODE} batch', layout_slot_tool_key(layout),
+                                    lambda: build_slot_template(plan.tool), copy_body)
+            yield from plan_steps(ops, timeline_emitter(), {'slot': tool}, start, end)
+
+
+def plan_steps(ops, emit, entities, start=0.0, end=1.0):
+    # Emit the operations of a back plan one at a time, as steps of a
+    # generation with progress between start and end. An emitter that returns
+    # a generator runs in steps as well, yielding how far through it is.
+    step = (end - start) / max(len(ops), 1)
+    for i, op in enumerate(ops):
+        message = mcback.describe(op)
+        yield start + step * i, message
+        with futil.span(message, op=op.id):
+            progress = emit(op, entities)
+        if not inspect.isgenerator(progress):
+            continue
+        # the rest of the operation runs in later steps, each chunk in a span of its own
+        while True:
+            with futil.span(message, op=op.id):
+                fraction = next(progress, None)
+            if fraction is None:
+                break
+            yield start + step * (i + fraction), message
+
+
+def emit_plan(ops, emit, entities=None):
+    # Emit the operations all at once. entities maps the ids the plan uses but
+    # doesn't make to what they stand for; it is returned with what the plan made.
+    entities = dict(entities or {})
+    for _ in plan_steps(ops, emit, entities):
+        pass
+    return entities
+
+
+def timeline_emitter(component=None):
+    # emits operations as features of component, the root component by default
+    component = component or root
+    return lambda op, entities: TIMELINE_EMITTERS[type(op)](op, component, entities)
+
+
+def plan_value(expr):
+    return value_input(expr.value if expr.text is None else expr.text)
+
+
+def plan_value_text(expr):
+    # for the helpers that take expressions
+    return expr.text if expr.text is not None else f'{expr.value} cm'
+
+
+def plan_operation(name):
+    FeatureOperations = adsk.fusion.FeatureOperations
+    return {'new': FeatureOperations.NewBodyFeatureOperation,
+            'join': FeatureOperations.JoinFeatureOperation,
+            'cut': FeatureOperations.CutFeatureOperation}[name]
+
+
+def plan_collection(entities, names):
+    # the entities the ids stand for, with groups of bodies taken apart
+    collection = adsk.core.ObjectCollection.create()
+    for name in names:
+        entity = entities[name]
+        for item in entity if isinstance(entity, list) else [entity]:
+            collection.add(item)
+    return collection
+
+
+def name_new_body(op, feature, entities):
+    if op.operation == 'new':
+        body = feature.bodies.item(0)
+        body.name = op.body.title()
+        entities[op.body] = body
+
+
+def emit_sketch(op, component, entities):
+    sketch = component.sketches.add(getattr(component, PLAN_PLANES[op.plane]))
+    sketch.name = op.name
+    with futil.SketchBuilder(sketch) as builder:
+        for polygon in op.polygons:
+            builder.polyline(polygon)
+        for (x, y), radius in op.circles:
+            # the diameter follows the parameter
+            builder.circle((x, y), radius.value, None if radius.text is None else f'{radius.text}*2')
+    entities[op.id] = sketch
+
+
+def emit_revolve(op, component, entities):
+    revolveFeats = component.features.revolveFeatures
+    revolveInput = revolveFeats.createInput(entities[op.sketch].profiles.item(0),
+                                            getattr(component, PLAN_AXES[op.axis]), plan_operation(op.operation))
+    revolveInput.setAngleExtent(False, plan_value(op.angle))
+    if op.operation != 'new':
+        revolveInput.participantBodies = [entities[op.body]]
+    feature = revolveFeats.add(revolveInput)
+    name_new_body(op, feature, entities)
+    entities[op.id] = feature
+
+
+def emit_extrude(op, component, entities):
+    direction = adsk.fusion.ExtentDirections.NegativeExtentDirection if op.direction < 0 else None
+    participants = [] if op.operation == 'new' else [entities[op.body]]
+    feature = extrude_profiles(entities[op.sketch], plan_value_text(op.distance), plan_operation(op.operation),
+                               participants, direction=direction, component=component)
+    name_new_body(op, feature, entities)
+    entities[op.id] = feature
+
+
+def emit_mirror(op, component, entities):
+    mirrorFeatures = component.features.mirrorFeatures
+    mirrorInput = mirrorFeatures.createInput(plan_collection(entities, [op.body]),
+                                             getattr(component, PLAN_PLANES[op.plane]))
+    mirrorInput.isCombine = True
+    entities[op.id] = mirrorFeatures.add(mirrorInput)
 
-    rect = create_centered_rectangle_dimensions(sketch, centerPoint, w, d, None, None)
 
-    #   sketch.sketchCurves.sketchLines.addCenterPointRectangle(centerPoint.geometry, cornerPoint)    
+def emit_pattern(op, component, entities):
+    rectangularPatterns = component.features.rectangularPatternFeatures
+    first, *others = op.directions
+    patternInput = rectangularPatterns.createInput(
+        plan_collection(entities, op.entities),
+        getattr(component, PLAN_AXES[first.axis]),
+        plan_value(first.count),
+        plan_value(first.spacing),
+        adsk.fusion.PatternDistanceType.SpacingPatternDistanceType)
+    for direction in others:
+        patternInput.setDirectionTwo(getattr(component, PLAN_AXES[direction.axis]),
+                                     plan_value(direction.count), plan_value(direction.spacing))
+    pattern = rectangularPatterns.add(patternInput)
 
+    # a pattern of bodies stands for the bodies it made
+    patternsBodies = any(isinstance(entities[name], (adsk.fusion.BRepBody, list)) for name in op.entities)
+    entities[op.id] = list(pattern.bodies) if patternsBodies else pattern
 
-    profile = sketch.profiles.item(0)
-    distance = adsk.core.ValueInput.createByString(h)
-    cubeExtrude = features.extrudeFeatures.addSimple(profile, distance, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
 
-    backBody = cubeExtrude.bodies.item(0)
-    backBody.name = "Back"
+def emit_move(op, component, entities):
+    moveFeats = component.features.moveFeatures
+    moveFeatureInput = moveFeats.createInput2(plan_collection(entities, [op.body]))
+    moveFeatureInput.defineAsTranslateXYZ(plan_value(op.x), plan_value(op.y), plan_value(op.z), True)
+    entities[op.id] = moveFeats.add(moveFeatureInput)
 
-    return backBody
 
+def emit_box(op, component, entities):
+    entities[op.id] = create_back_cube(op, parametric=op.width.text is not None or op.depth.text is not None)
 
-def create_slot():
 
-    slotSketch = root.sketches.add(root.xYConstructionPlane)
-    slotSketch.name = "Slot Profile"
+def emit_combine(op, component, entities):
+    target = plan_collection(entities, [op.target]).item(0)
+    tools = adsk.core.ObjectCollection.create()
+    for tool in plan_collection(entities, op.tools):
+        if tool != target:
+            tools.add(tool)
 
-    # the profile has a forced overlap to make we can join all the slots
-    # into one (join only works on overlapping objects)
-    profilePoints = [adsk.core.Point3D.create(x, y, 0) for x, y in
-                     [[0,0],
-                      [dotDiameter.value,0],
-                      [dotDiameter.value,0.12121],
-                      [0.765,0.3712],
-                      [0.765,0.5],
-                      [1.3, 0.5],
-                      [1.3, 1.0],
-                      [0, 1.0],
-                      [0,0.5]]]
+    combineFeatures = component.features.combineFeatures
+    combineInput = combineFeatures.createInput(target, tools)
+    combineInput.isNewComponent = False
+    combineInput.isKeepToolBodies = False
+    combineInput.operation = plan_operation(op.operation)
+    name = target.name
+    entities[op.id] = combineFeatures.add(combineInput)
+    target.name = name
 
-    drawPolyline(slotSketch, profilePoints)
- 
-    slotProfile = slotSketch.profiles.item(0)
+    if op.operation == 'join':
+        for joined in op.tools + (op.target,):
+            entities[joined] = target
 
-    axisLine = root.yConstructionAxis
 
-    revolveFeats = features.revolveFeatures
-    revolveInput = revolveFeats.createInput(slotProfile, axisLine, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-
-    # Set the rotation angle (90 degrees in radians)
-    revolveInput.setAngleExtent(False, adsk.core.ValueInput.createByReal(3.14159265359 * 0.5))
-
-    # Execute the revolve
-    revolveFeats.add(revolveInput)
-
-    # Extrude the slot length
-    extrudes = features.extrudeFeatures
-    distance = adsk.core.ValueInput.createByString("backHeight * -1")
-    extrude1 = extrudes.addSimple(slotProfile,
-                                  distance,
-                                  adsk.fusion.FeatureOperations.JoinFeatureOperation)        
-    # Get the extrusion body
-    body1 = extrude1.bodies.item(0)
-    body1.name = "Slot"
-
-    inputEntites = adsk.core.ObjectCollection.create()
-    inputEntites.add(body1)
-    mirrorFeatures = features.mirrorFeatures
-    mirrorInput = mirrorFeatures.createInput(inputEntites, root.yZConstructionPlane)
-    mirrorInput.isCombine = True
-        
-    # Create the mirror feature
-    mirrorFeature = mirrorFeatures.add(mirrorInput)
+TIMELINE_EMITTERS = {
+    mcback.Sketch: emit_sketch,
+    mcback.Revolve: emit_revolve,
+    mcback.Extrude: emit_extrude,
+    mcback.Mirror: emit_mirror,
+    mcback.Pattern: emit_pattern,
+    mcback.Move: emit_move,
+    mcback.Box: emit_box,
+    mcback.Combine: emit_combine,
+}
 
-    # TODO add conditional for onramp
-    rampFeature = createOnramp()
 
-#    rampSpacing = distanceBetweenSlots * onRampEveryXSlots
-#    rampQuantity = math.floor(backHeight/rampSpacing)
-    
-    patternCollection = adsk.core.ObjectCollection.create()
-    patternCollection.add(rampFeature)
-    rectangularPatterns = features.rectangularPatternFeatures
-    patternInput = rectangularPatterns.createInput(
-        patternCollection, 
-        root.zConstructionAxis,
-        adsk.core.ValueInput.createByString("floor(backHeight/(distanceBetweenSlots * onRampEveryXSlots))"),
-        adsk.core.ValueInput.createByString("(-distanceBetweenSlots) * onRampEveryXSlots"), 
-        adsk.fusion.PatternDistanceType.SpacingPatternDistanceType)
-    rectangularPattern = rectangularPatterns.add(patternInput)
+def emit_temporary_op(op, entities):
+    # emits an operation of a direct plan as temporary B-rep bodies
+    return TEMPORARY_EMITTERS[type(op)](adsk.fusion.TemporaryBRepManager.get(), op, entities)
 
-    # TODO add conditional for dimple
-    createDimple()
 
-    return body1
+def temporary_bodies(entity):
+    return entity if isinstance(entity, list) else [entity]
 
-def createOnramp():
-    # Create the sketch for the cylinder
-    rampSketch = root.sketches.add(root.xZConstructionPlane)
-    rampSketch.name = "Ramp Sketch"
 
-    circles = rampSketch.sketchCurves.sketchCircles
-    circle1 = circles.addByCenterRadius(adsk.core.Point3D.create(0,2, 0), dotDiameter.value*2)
-    circleDim = rampSketch.sketchDimensions.addDiameterDimension(circle1, adsk.core.Point3D.create(1.2, 1.2, 0)) 
-    # get ModelParameter
-    modelPrm: adsk.fusion.ModelParameter = circleDim.parameter
+def temporary_union(tbm, body, piece):
+    if body is None:
+        return piece
+    tbm.booleanOperation(body, piece, adsk.fusion.BooleanTypes.UnionBooleanType)
+    return body
 
-    # Set user parameter name in ModelParameter
-    modelPrm.expression = dotDiameter.name + "*2"
 
-    # extrude into cylinder
-    extrudes = features.extrudeFeatures
-    distance = adsk.core.ValueInput.createByReal(0.5)
-    rampExtrude = extrudes.addSimple(rampSketch.profiles.item(0), distance, adsk.fusion.FeatureOperations.JoinFeatureOperation)
+def temporary_feature(tbm, op, piece, entities):
+    # the piece is kept for patterns of the feature
+    temporary_piece(tbm, op.operation, op.body, piece, entities)
+    entities[op.id] = TemporaryFeature(piece, op.operation, op.body)
+
+
+def temporary_piece(tbm, operation, body, piece, entities):
+    # add the piece to the body, cut it from it, or make it the body
+    if operation == 'new':
+        entities[body] = piece
+        return
+    BooleanTypes = adsk.fusion.BooleanTypes
+    tbm.booleanOperation(entities[body], piece,
+                         BooleanTypes.UnionBooleanType if operation == 'join' else BooleanTypes.DifferenceBooleanType)
+
+
+def sketch_temporary(tbm, op, entities):
+    entities[op.id] = op
+
+
+def revolve_temporary(tbm, op, entities):
+    # Every band of the profile turns into a cylinder or a cone. Only full
+    # turns about y can be made that way, see mcback.complete_revolves.
+    sketch = entities[op.sketch]
+    if op.axis != 'y' or sketch.plane == 'xz' or not math.isclose(op.angle.value, 2 * math.pi):
+        raise ValueError(f'{op.id} can only be made as a timeline feature')
+    Point3D = adsk.core.Point3D
+    piece = None
+    for polygon in sketch.polygons:
+        for y0, x0, y1, x1 in mcback.profile_bands(polygon):
+            piece = temporary_union(tbm, piece, tbm.createCylinderOrCone(Point3D.create(0, y0, 0), x0,
+                                                                         Point3D.create(0, y1, 0), x1))
+    temporary_feature(tbm, op, piece, entities)
+
+
+def extrude_temporary(tbm, op, entities):
+    # Profiles on the xy plane are extruded band by band, each band a box
+    # trimmed to the slanted edge; circles become cylinders.
+    sketch = entities[op.sketch]
+    if sketch.polygons and sketch.plane != 'xy':
+        raise ValueError(f'{op.id} can only be made as a timeline feature')
+    distance = op.distance.value * op.direction
+    low, high = min(0, distance), max(0, distance)
+    sides = (1, -1) if op.mirrored else (1,)
+
+    piece = None
+    for polygon in sketch.polygons:
+        for y0, x0, y1, x1 in mcback.profile_bands(polygon):
+            band = create_temporary_box(tbm, (-max(x0, x1) if op.mirrored else 0, y0, low),
+                                        (max(x0, x1), y1, high))
+            if x0 != x1:
+                for side in sides:
+                    trim = create_temporary_half_space(tbm, (side * x0, y0), (side * x1, y1), side, low, high)
+                    tbm.booleanOperation(band, trim, adsk.fusion.BooleanTypes.DifferenceBooleanType)
+            piece = temporary_union(tbm, piece, band)
+
+    for (u, v), radius in sketch.circles:
+        for side in {u, -u} if op.mirrored else {u}:
+            cylinder = tbm.createCylinderOrCone(
+                adsk.core.Point3D.create(*mcback.sketch_to_model(sketch.plane, side, v, low)), radius.value,
+                adsk.core.Point3D.create(*mcback.sketch_to_model(sketch.plane, side, v, high)), radius.value)
+            piece = temporary_union(tbm, piece, cylinder)
+    temporary_feature(tbm, op, piece, entities)
+
+
+def mirror_temporary(tbm, op, entities):
+    raise ValueError(f"temporary bodies can't be mirrored, {op.id} should have been folded by mcback.optimize")
+
+
+def pattern_temporary(tbm, op, entities):
+    # Copies of bodies make a group, the originals first; copies of features
+    # are added to, or cut from, their body again.
+    offsets = [(0, 0, 0)]
+    for direction in op.directions:
+        axis = 'xyz'.index(direction.axis)
+        offsets = [tuple(o + (direction.spacing.value * i if k == axis else 0) for k, o in enumerate(offset))
+                   for offset in offsets for i in range(int(direction.count.value))]
+
+    group = []
+    for name in op.entities:
+        for entity in temporary_bodies(entities[name]):
+            isFeature = isinstance(entity, TemporaryFeature)
+            for offset in offsets:
+                if not any(offset):
+                    if not isFeature:
+                        group.append(entity)
+                    continue
+                copy = tbm.copy(entity.piece if isFeature else entity)
+                tbm.transform(copy, translation_matrix(*offset))
+                if isFeature:
+                    temporary_piece(tbm, entity.operation, entity.body, copy, entities)
+                else:
+                    group.append(copy)
+    entities[op.id] = group
+
+
+def move_temporary(tbm, op, entities):
+    for body in temporary_bodies(entities[op.body]):
+        tbm.transform(body, translation_matrix(op.x.value, op.y.value, op.z.value))
+
+
+def box_temporary(tbm, op, entities):
+    half = op.width.value / 2
+    entities[op.id] = create_temporary_box(tbm, (-half, 0, 0), (half, op.depth.value, op.height.value))
+
+
+def combine_temporary(tbm, op, entities):
+    target = temporary_bodies(entities[op.target])[0]
+    tools = [tool for name in op.tools for tool in temporary_bodies(entities[name]) if tool is not target]
+    BooleanTypes = adsk.fusion.BooleanTypes
+    booleanType = BooleanTypes.UnionBooleanType if op.operation == 'join' else BooleanTypes.DifferenceBooleanType
+    for i, tool in enumerate(tools):
+        if i and i % SLOTS_PER_CHUNK == 0:
+            yield i / len(tools)
+        tbm.booleanOperation(target, tool, booleanType)
+
+    if op.operation == 'join':
+        for joined in op.tools + (op.target,):
+            entities[joined] = target
+
+
+def translation_matrix(x=0, y=0, z=0):
+    matrix = adsk.core.Matrix3D.create()
+    matrix.translation = adsk.core.Vector3D.create(x, y, z)
+    return matrix
+
+
+TEMPORARY_EMITTERS = {
+    mcback.Sketch: sketch_temporary,
+    mcback.Revolve: revolve_temporary,
+    mcback.Extrude: extrude_temporary,
+    mcback.Mirror: mirror_temporary,
+    mcback.Pattern: pattern_temporary,
+    mcback.Move: move_temporary,
+    mcback.Box: box_temporary,
+    mcback.Combine: combine_temporary,
+}
+
+
+def create_temporary_box(tbm, low, high):
+    # axis aligned box between two corners
+    center = adsk.core.Point3D.create(*((a + b) / 2 for a, b in zip(low, high)))
+    box = adsk.core.OrientedBoundingBox3D.create(center,
+                                                 adsk.core.Vector3D.create(1, 0, 0),
+                                                 adsk.core.Vector3D.create(0, 1, 0),
+                                                 high[0] - low[0], high[1] - low[1], high[2] - low[2])
+    return tbm.createBox(box)
+
+
+def create_temporary_half_space(tbm, start, end, side, bottom, top):
+    # a box with one face on the line from start to end (in x/y), lying on the
+    # side of the line facing away from x = 0; side is 1 for the right of the slot
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    length = math.hypot(dx, dy)
+    along = (dx / length, dy / length)
+    outward = (along[1], -along[0]) if side > 0 else (-along[1], along[0])
+    size = 4 * length
+    center = adsk.core.Point3D.create((start[0] + end[0]) / 2 + outward[0] * size / 2,
+                                      (start[1] + end[1]) / 2 + outward[1] * size / 2,
+                                      (bottom + top) / 2)
+    box = adsk.core.OrientedBoundingBox3D.create(center,
+                                                 adsk.core.Vector3D.create(outward[0], outward[1], 0),
+                                                 adsk.core.Vector3D.create(along[0], along[1], 0),
+                                                 size, size, top - bottom + 1)
+    return tbm.createBox(box)
+
+
+def add_temporary_body(body, name):
+    # parametric designs only take new bodies inside a base feature
+    if design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+        baseFeature = features.baseFeatures.add()
+        baseFeature.name = name
+        baseFeature.startEdit()
+        added = root.bRepBodies.add(body, baseFeature)
+        baseFeature.finishEdit()
+    else:
+        added = root.bRepBodies.add(body)
+    added.name = name
+    return added
 
-    return rampExtrude
 
-def createDimple():
-    dimpleSketch = root.sketches.add(root.yZConstructionPlane)
-    dimpleSketch.name = "Dimple sketch"
+def extrude_profiles(sketch, distance, operation, participants,
+                     startOffset=None, direction=None, taperAngle=None, component=None):
+    # extrude every profile of the sketch in one feature of component, the root component by default
 
-    profilePoints = [adsk.core.Point3D.create(x, y, 0) for x, y in [[0,0],[0,0.15],[0.15,0]]]
-    drawPolyline(dimpleSketch, profilePoints)
+    profiles = adsk.core.ObjectCollection.create()
+    for profile in sketch.profiles:
+        profiles.add(profile)
 
-    profile = dimpleSketch.profiles.item(0)
-    axisLine = root.yConstructionAxis
+    extrudes = (component or root).features.extrudeFeatures
+    extrudeInput = extrudes.createInput(profiles, operation)
+    if startOffset:
+        extrudeInput.startExtent = adsk.fusion.OffsetStartDefinition.create(valueFromExpr(startOffset))
 
-    revolveFeats = features.revolveFeatures
+    extent = adsk.fusion.DistanceExtentDefinition.create(value_input(distance))
+    if direction is None:
+        direction = adsk.fusion.ExtentDirections.PositiveExtentDirection
+    if taperAngle:
+        extrudeInput.setOneSideExtent(extent, direction, valueFromExpr(taperAngle))
+    else:
+        extrudeInput.setOneSideExtent(extent, direction)
 
-    revolveInput = revolveFeats.createInput(profile, axisLine, adsk.fusion.FeatureOperations.CutFeatureOperation)
-    # Revolve the dimple
-    revolveInput.setAngleExtent(False, adsk.core.ValueInput.createByReal(3.14159265359 * 2))
+    if participants and operation != adsk.fusion.FeatureOperations.NewBodyFeatureOperation:
+        extrudeInput.participantBodies = participants
+    return extrudes.add(extrudeInput)
 
-    # Execute the revolve
-    revolveFeats.add(revolveInput)
 
+def create_back_cube(box, parametric=True):
+    # box is a plan Box; the profile is drawn at its size, and when parametric
+    # it is kept centred on the origin and its sides follow the expressions
+    sketch = root.sketches.add(root.xYConstructionPlane)
+    sketch.name = "Back Profile"
+    with futil.SketchBuilder(sketch, parametric) as builder:
+        rect = builder.rectangle(-box.width.value / 2, 0, box.width.value / 2, box.depth.value)
+        builder.midpoint(sketch.originPoint, rect[0])
+        builder.distance(rect[0].startSketchPoint, rect[0].endSketchPoint, plan_value_text(box.width), 'horizontal')
+        builder.distance(rect[1].startSketchPoint, rect[1].endSketchPoint, plan_value_text(box.depth), 'vertical')
 
-def drawPolyline(
-    skt :adsk.fusion.Sketch,
-    pnts :list):
+    profile = sketch.profiles.item(0)
+    cubeExtrude = features.extrudeFeatures.addSimple(profile, plan_value(box.height),
+                                                     adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
 
-    count = len(pnts)
-    pnts.append(pnts[0])
+    backBody = cubeExtrude.bodies.item(0)
+    backBody.name = "Back"
 
-    lines = skt.sketchCurves.sketchLines
+    return backBody
 
-    skt.isComputeDeferred = True
-    [lines.addByTwoPoints(pnts[i], pnts[i + 1]) for i in range(count)]
-    skt.isComputeDeferred = False
 
 # This event handler is called when the command needs to compute a new preview in the graphics window.
 def command_preview(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Preview Event')
+    logger.debug('%s Command Preview Event', CMD_NAME)
     inputs = args.command.commandInputs
+    use_design(active_design_context())
+
+    # The preview is drawn as custom graphics from a cheap mesh; nothing is
+    # added to the timeline, so it is quick enough for every input change.
+    state = dialog_state(inputs)
+    if state.isValid:
+        show_preview(state.layout)
+
+
+def show_preview(layout):
+    global previewGraphics, previewLayout
+
+    # nothing to redraw when the inputs changed but the back didn't
+    if layout == previewLayout and previewGraphics is not None and previewGraphics.isValid:
+        return
+
+    clear_preview()
+    previewLayout = layout
+    preview = mcback.back_preview(layout)
+
+    previewGraphics = root.customGraphicsGroups.add()
+    for mesh, color in ((preview.back, PREVIEW_BACK_COLOR), (preview.slots, PREVIEW_SLOT_COLOR)):
+        if mesh is None or not mesh.triangles:
+            continue
+        coordinates = adsk.fusion.CustomGraphicsCoordinates.create(mesh.coordinates)
+        graphicsMesh = previewGraphics.addMesh(coordinates, mesh.triangles, [], [])
+        graphicsMesh.color = adsk.fusion.CustomGraphicsSolidColorEffect.create(adsk.core.Color.create(*color))
+    app.activeViewport.refresh()
+
+
+def clear_preview():
+    global previewGraphics, previewLayout
+
+    if previewGraphics is not None and previewGraphics.isValid:
+        previewGraphics.deleteMe()
+    previewGraphics = None
+    previewLayout = None
 
 
 # This event handler is called when the user changes anything in the command dialog
@@ -553,36 +1622,68 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
     inputs = args.inputs
 
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Input Changed Event fired from a change to {changed_input.id}')
+    logger.debug('%s Input Changed Event fired from a change to %s', CMD_NAME, changed_input.id)
+
+    if changed_input.id == 'batch_add':
+        add_batch_row(inputs)
+    elif changed_input.id == 'batch_remove':
+        remove_batch_row(inputs)
+    elif changed_input.id == 'tile_to_bed':
+        for id in ('bed_width', 'bed_depth'):
+            inputs.itemById(id).isVisible = changed_input.value
+
+    invalidate_dialog_state(inputs)
+
+
+def add_batch_row(inputs):
+    # a row with the width and height currently in the dialog
+    batchTable = inputs.itemById('batch_table')
+    row = batchTable.rowCount
+    number = next(batchRowNumbers)
+    defaultLengthUnits = app.activeProduct.unitsManager.defaultLengthUnits
+    for column, name in enumerate(('width', 'height')):
+        value = inputs.itemById(f'{name}_value_input').value
+        rowInput = batchTable.commandInputs.addValueInput(f'batch_{name}_{number}', name.title(),
+                                                          defaultLengthUnits, value_input(value))
+        batchTable.addCommandInput(rowInput, row, column)
+
+
+def remove_batch_row(inputs):
+    # the selected row, or the last one
+    batchTable = inputs.itemById('batch_table')
+    if batchTable.rowCount:
+        row = batchTable.selectedRow
+        batchTable.deleteRow(row if row >= 0 else batchTable.rowCount - 1)
 
 
 # This event handler is called when the user interacts with any of the inputs in the dialog
 # which allows you to verify that all of the inputs are valid and enables the OK button.
 def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Validate Input Event')
+    logger.debug('%s Validate Input Event', CMD_NAME)
 
     inputs = args.inputs
     
     # Verify the validity of the input values. This controls if the OK button is enabled or not.
-    valueInput = inputs.itemById('width_value_input')
-    if valueInput.value >= 0:
-        args.areInputsValid = True
-    else:
-        args.areInputsValid = False
-        
-       
-    valueInput = inputs.itemById('height_value_input')
-    if valueInput.value >= 0:
-        args.areInputsValid = True
-    else:
-        args.areInputsValid = False
-        
+    use_design(active_design_context())
+    state = dialog_state(inputs)
+    args.areInputsValid = state.isValid
+
+    # validation follows every change of the inputs, and so does the estimate
+    show_estimate(inputs, state)
+
 
 # This event handler is called when the command terminates.
 def command_destroy(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Destroy Event')
+    logger.info('%s Command Destroy Event', CMD_NAME)
+
+    futil.release_handlers(args.command)
+
+    clear_preview()
+    dialogId = dialog_id(args.command.commandInputs)
+    dialogStates.pop(dialogId, None)
+    estimatesShown.pop(dialogId, None)
 
-    global local_handlers
-    local_handlers = []
+    # the messages of the dialog are written out once it closes
+    futil.flush_log()
@@ -10,6 +10,14 @@ import os
 # are ready to distribute it.
 DEBUG = True
 
+# The least severe messages that are logged: 'debug', 'info', 'warning' or
+# 'error'. MODULE_LOG_LEVELS sets the level of single modules or packages, by
+# any dotted part of their name, e.g. {'commandDialog': 'debug'}. Messages are buffered
+# and written to the Fusion log file (and, in Debug mode, to the Text Command
+# window) in batches; errors are written at once.
+LOG_LEVEL = 'info' if DEBUG else 'warning'
+MODULE_LOG_LEVELS = {}
+
 # Gets the name of the add-in from the name of the folder the py file is in.
 # This is used when defining unique internal names for various UI elements 
 # that need a unique name. It's also recommended to use a company name as 
@@ -17,5 +25,13 @@ DEBUG = True
 ADDIN_NAME = os.path.basename(os.path.dirname(__file__))
 COMPANY_NAME = 'ACME'
 
+# Flag that turns on tracing: every run of the command is timed stage by stage,
+# with the number of Fusion API calls made in each stage, and the trace is
+# written to TRACE_FOLDER, either as a tree of spans ('json') or in the Chrome
+# trace event format ('chrome') that chrome://tracing and Perfetto can open.
+TRACE = False
+TRACE_FOLDER = os.path.join(os.path.dirname(__file__), 'traces')
+TRACE_FORMAT = 'json'
+
 # Palettes
 sample_palette_id = f'{COMPANY_NAME}_{ADDIN_NAME}_palette_id'
\ No newline at end of file
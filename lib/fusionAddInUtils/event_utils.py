@@ -9,32 +9,53 @@
 #  AUTODESK, INC. DOES NOT WARRANT THAT THE OPERATION OF THE PROGRAM WILL BE
 #  UNINTERRUPTED OR ERROR FREE.
 
+import bisect
+import collections
 import sys
+import time
 from typing import Callable
 
 import adsk.core
-from .general_utils import handle_error
+from .general_utils import handle_error, get_logger
 
 
 # Global Variable to hold Event Handlers
 _handlers = []
 
+# One handler class per (handler type, callback, name), made on first use.
+_handler_classes = {}
+
+# The handlers added for the command that is running, by the id of its
+# command definition, see add_handler and release_handlers.
+_command_handlers = {}
+
+# Upper bounds, in milliseconds, of the buckets of the latency histograms.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# What handle_stats reports for one handler name: the number of dispatches,
+# their total and longest time in seconds, and the number of dispatches per
+# latency bucket, the last one for everything above the last bound.
+HandlerStats = collections.namedtuple('HandlerStats', 'count total longest histogram')
+
+_stats = {}
+
 
 def add_handler(
         event: adsk.core.Event,
         callback: Callable,
         *,
         name: str = None,
-        local_handlers: list = None
+        local_handlers: list = None,
+        command: adsk.core.Command = None
 ):
     """Adds an event handler to the specified event.
 
     Arguments:
     event -- The event object you want to connect a handler to.
     callback -- The function that will handle the event.
-    name -- A name to use in logging errors associated with this event.
-            Otherwise the name of the event object is used. This argument
-            must be specified by its keyword.
+    name -- A name to use in logging errors associated with this event, and
+            for its dispatch statistics. Otherwise the name of the callback
+            is used. This argument must be specified by its keyword.
     local_handlers -- A list of handlers you manage that is used to maintain
                       a reference to the handlers so they aren't released.
                       This argument must be specified by its keyword. If not
@@ -42,22 +63,64 @@ def add_handler(
                       be cleared using the clear_handlers function. You may want
                       to maintain your own handler list so it can be managed 
                       independently for each command.
+    command -- The command the handler belongs to. Its handlers are kept until
+               release_handlers is called for it, typically from its destroy
+               event. This argument must be specified by its keyword.
 
     :returns:
         The event handler that was created.  You don't often need this reference, but it can be useful in some cases.
     """   
     module = sys.modules[event.__module__]
     handler_type = module.__dict__[event.add.__annotations__['handler']]
+    if command is not None:
+        local_handlers = _command_list(command)
     handler = _create_handler(handler_type, callback, event, name, local_handlers)
     event.add(handler)
     return handler
 
 
+def release_handlers(command: adsk.core.Command):
+    """Drops the handlers added for a command, once it is done with them.
+
+    Arguments:
+    command -- The command passed to add_handler.
+    """
+    _command_handlers.pop(command.parentCommandDefinition.id, None)
+
+
 def clear_handlers():
-    """Clears the global list of handlers.
+    """Clears the global list of handlers, and those of commands.
     """
     global _handlers
     _handlers = []
+    _command_handlers.clear()
+    _handler_classes.clear()
+
+
+def handler_stats():
+    """The dispatch statistics of every handler name, as {name: HandlerStats}."""
+    return {name: HandlerStats(stats[0], stats[1], stats[2], tuple(stats[3])) for name, stats in _stats.items()}
+
+
+def reset_handler_stats():
+    for stats in _stats.values():
+        stats[:3] = [0, 0.0, 0.0]
+        stats[3][:] = [0] * len(stats[3])
+
+
+def _command_list(command):
+    # A command definition runs one command at a time, so handlers still
+    # kept for it when the next one starts were never released: they are
+    # dropped with a warning.
+    definition_id = command.parentCommandDefinition.id
+    handlers = _command_handlers.get(definition_id)
+    if handlers and handlers[0] != command:
+        get_logger(__name__).warning('%d handlers of a previous %s command were never released',
+                                     len(handlers[1]), definition_id)
+        handlers = None
+    if not handlers:
+        handlers = _command_handlers[definition_id] = (command, [])
+    return handlers[1]
 
 
 def _create_handler(
@@ -73,16 +136,31 @@ def _create_handler(
 
 
 def _define_handler(handler_type, callback, name: str = None):
-    name = name or handler_type.__name__
+    key = (handler_type, callback, name)
+    handler_class = _handler_classes.get(key)
+    if handler_class is not None:
+        return handler_class
+
+    name = name or getattr(callback, '__name__', handler_type.__name__)
+    # [dispatches, total seconds, longest, dispatches per bucket]
+    stats = _stats.setdefault(name, [0, 0.0, 0.0, [0] * (len(LATENCY_BUCKETS_MS) + 1)])
 
     class Handler(handler_type):
         def __init__(self):
             super().__init__()
 
         def notify(self, args):
+            start = time.perf_counter()
             try:
                 callback(args)
             except:
                 handle_error(name)
-
+            finally:
+                elapsed = time.perf_counter() - start
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+                stats[3][bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed * 1000)] += 1
+
+    _handler_classes[key] = Handler
     return Handler
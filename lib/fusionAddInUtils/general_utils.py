@@ -9,6 +9,8 @@
 #  AUTODESK, INC. DOES NOT WARRANT THAT THE OPERATION OF THE PROGRAM WILL BE
 #  UNINTERRUPTED OR ERROR FREE.
 
+import collections
+import itertools
 import os
 import traceback
 import adsk.core
@@ -16,34 +18,144 @@ import adsk.core
 app = adsk.core.Application.get()
 ui = app.userInterface
 
-# Attempt to read DEBUG flag from parent config.
+# Attempt to read DEBUG flag and log levels from parent config.
 try:
     from ... import config
     DEBUG = config.DEBUG
+    LOG_LEVEL = config.LOG_LEVEL
+    MODULE_LOG_LEVELS = config.MODULE_LOG_LEVELS
 except:
     DEBUG = False
+    LOG_LEVEL = 'warning'
+    MODULE_LOG_LEVELS = {}
+
+# Log levels from least to most severe, and the Fusion level each is logged at.
+LOG_LEVELS = ('debug', 'info', 'warning', 'error')
+_FUSION_LEVELS = (adsk.core.LogLevels.InfoLogLevel, adsk.core.LogLevels.InfoLogLevel,
+                  adsk.core.LogLevels.WarningLogLevel, adsk.core.LogLevels.ErrorLogLevel)
+_LEVEL_NAMES = {adsk.core.LogLevels.InfoLogLevel: 'info',
+                adsk.core.LogLevels.WarningLogLevel: 'warning',
+                adsk.core.LogLevels.ErrorLogLevel: 'error'}
+
+# Messages are kept in a ring buffer of LOG_BUFFER_SIZE and written out
+# LOG_FLUSH_SIZE at a time, or at once for errors; see flush_log.
+LOG_BUFFER_SIZE = 1000
+LOG_FLUSH_SIZE = 100
+
+# A message waiting to be written: formatted as message % args, or by calling
+# message when it is callable, only when it is written.
+LogRecord = collections.namedtuple('LogRecord', 'logger level message args console')
+
+_buffer = collections.deque(maxlen=LOG_BUFFER_SIZE)
+_dropped = 0
+_loggers = {}
+
+
+class Logger:
+    """Logs the messages of one module that are at or above its level.
+
+    Use get_logger to get one. Messages are %-format strings, or callables
+    that return the message, and are only formatted once they are written,
+    so a message below the level costs a comparison.
+    """
+
+    def __init__(self, name: str, level: str):
+        self.name = name
+        self.level = level
+
+    def enabled(self, level: str):
+        return LOG_LEVELS.index(level) >= LOG_LEVELS.index(self.level)
+
+    def log(self, level: str, message, *args, force_console: bool = False):
+        """Buffers a message at one of LOG_LEVELS, if the logger's level lets it through.
+
+        Arguments:
+        level -- 'debug', 'info', 'warning' or 'error'.
+        message -- A %-format string for args, or a callable returning the message.
+        force_console -- Writes the message, and whatever is buffered before
+                         it, to the Text Command window now.
+        """
+        global _dropped
+        if LOG_LEVELS.index(level) < LOG_LEVELS.index(self.level):
+            return
+        if len(_buffer) == _buffer.maxlen:
+            _dropped += 1
+        _buffer.append(LogRecord(self.name, level, message, args, force_console))
+        if force_console or level == 'error' or len(_buffer) >= LOG_FLUSH_SIZE:
+            flush_log()
+
+    def debug(self, message, *args):
+        self.log('debug', message, *args)
+
+    def info(self, message, *args):
+        self.log('info', message, *args)
+
+    def warning(self, message, *args):
+        self.log('warning', message, *args)
+
+    def error(self, message, *args):
+        self.log('error', message, *args)
+
+
+def get_logger(name: str):
+    """The logger of a module, usually called with __name__.
+
+    Its level is the one MODULE_LOG_LEVELS in config gives for the longest
+    dotted part of name it has, e.g. 'commandDialog' or 'commands.commandDialog.entry',
+    and LOG_LEVEL otherwise.
+    """
+    logger = _loggers.get(name)
+    if logger is None:
+        dotted = f'.{name}.'
+        matches = [key for key in MODULE_LOG_LEVELS if f'.{key}.' in dotted]
+        logger = Logger(name, MODULE_LOG_LEVELS[max(matches, key=len)] if matches else LOG_LEVEL)
+        _loggers[name] = logger
+    return logger
+
+
+def flush_log():
+    """Writes the buffered messages to the Fusion log file, and to the Text Command
+    window in debug mode or when a message asked for it.
+
+    Consecutive messages of the same level are written in one call.
+    """
+    global _dropped
+    records = list(_buffer)
+    _buffer.clear()
+    if _dropped:
+        records.insert(0, LogRecord(__name__, 'warning', '%d log messages were dropped', (_dropped,), False))
+        _dropped = 0
+
+    console = DEBUG or any(record.console for record in records)
+    for level, group in itertools.groupby(records, key=lambda record: record.level):
+        text = '\n'.join(_format(record) for record in group)
+        fusionLevel = _FUSION_LEVELS[LOG_LEVELS.index(level)]
+
+        # Always print to console, only seen through IDE.
+        print(text)
+        app.log(text, fusionLevel, adsk.core.LogTypes.FileLogType)
+        if console:
+            app.log(text, fusionLevel, adsk.core.LogTypes.ConsoleLogType)
+
+
+def _format(record):
+    try:
+        if callable(record.message):
+            return str(record.message())
+        return record.message % record.args if record.args else str(record.message)
+    except Exception as e:
+        return f'{record.message!r} {record.args!r} could not be formatted: {e}'
 
 
 def log(message: str, level: adsk.core.LogLevels = adsk.core.LogLevels.InfoLogLevel, force_console: bool = False):
     """Utility function to easily handle logging in your app.
 
     Arguments:
-    message -- The message to log.
+    message -- The message to log, or a callable returning it.
     level -- The logging severity level.
     force_console -- Forces the message to be written to the Text Command window. 
     """    
-    # Always print to console, only seen through IDE.
-    print(message)  
-
-    # Log all errors to Fusion log file.
-    if level == adsk.core.LogLevels.ErrorLogLevel:
-        log_type = adsk.core.LogTypes.FileLogType
-        app.log(message, level, log_type)
-
-    # If config.DEBUG is True write all log messages to the console.
-    if DEBUG or force_console:
-        log_type = adsk.core.LogTypes.ConsoleLogType
-        app.log(message, level, log_type)
+    get_logger(__name__).log(_LEVEL_NAMES[level], message, force_console=force_console)
 
 
 def handle_error(name: str, show_message_box: bool = False):
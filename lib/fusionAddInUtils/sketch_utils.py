@@ -0,0 +1,123 @@
+import adsk.core
+import adsk.fusion
+
+from .trace_utils import count
+
+ORIENTATIONS = {
+    'aligned': adsk.fusion.DimensionOrientations.AlignedDimensionOrientation,
+    'horizontal': adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation,
+    'vertical': adsk.fusion.DimensionOrientations.VerticalDimensionOrientation,
+}
+
+
+class SketchBuilder:
+    """Adds geometry to a sketch at coordinates worked out beforehand, with compute deferred.
+
+    Use it in a with statement: the sketch is solved once, when the block
+    ends, instead of after every line. Geometry is drawn where it belongs, so
+    it needs no dimensions to get there; dimensions and constraints are only
+    added for what has to follow parameter changes, and not at all when the
+    builder isn't parametric.
+
+    Arguments:
+    sketch -- The sketch to add to; coordinates are in its sketch space.
+    parametric -- Add the dimensions and constraints asked for. When False
+                  the geometry stays where it is drawn.
+    """
+
+    def __init__(self, sketch: adsk.fusion.Sketch, parametric: bool = True):
+        self.sketch = sketch
+        self.parametric = parametric
+        self._wasDeferred = None
+        # the sketch's collections, looked up once rather than per line or circle
+        self._lines = None
+        self._circles = None
+
+    @property
+    def lines(self) -> adsk.fusion.SketchLines:
+        if self._lines is None:
+            self._lines = self.sketch.sketchCurves.sketchLines
+        return self._lines
+
+    @property
+    def circles(self) -> adsk.fusion.SketchCircles:
+        if self._circles is None:
+            self._circles = self.sketch.sketchCurves.sketchCircles
+        return self._circles
+
+    def __enter__(self):
+        self._wasDeferred = self.sketch.isComputeDeferred
+        self.sketch.isComputeDeferred = True
+        return self
+
+    def __exit__(self, *exc):
+        # a builder inside another one leaves the solve to the outer one
+        self.sketch.isComputeDeferred = self._wasDeferred
+        return False
+
+    def polyline(self, points, closed: bool = True):
+        """Lines through (x, y) points, closed back to the first by default; returns the lines.
+
+        The ends of the lines are given as points rather than as the sketch
+        points of the lines before, which would cost an API call per line.
+        """
+        ends = [adsk.core.Point3D.create(x, y, 0) for x, y in points]
+        if closed and len(ends) > 2:
+            ends.append(ends[0])
+        result = [self.lines.addByTwoPoints(start, end) for start, end in zip(ends, ends[1:])]
+        count('sketch_lines', len(result))
+        return result
+
+    def rectangle(self, x0: float, y0: float, x1: float, y1: float):
+        """A rectangle between two corners; returns its lines, the first along x and the second along y.
+
+        Fusion makes its sides horizontal and vertical, so it is fully
+        defined by a size along each side and the position of one point.
+        """
+        count('sketch_lines', 4)
+        return self.lines.addTwoPointRectangle(adsk.core.Point3D.create(x0, y0, 0), adsk.core.Point3D.create(x1, y1, 0))
+
+    def circle(self, center, radius: float, diameter: str = None):
+        """A circle; with a diameter expression its size follows it, when parametric.
+
+        Arguments:
+        center -- An (x, y) pair, or a Point3D in sketch space such as one
+                  from modelToSketchSpace.
+        radius -- The radius it is drawn at.
+        diameter -- The expression the diameter follows.
+        """
+        point = center if isinstance(center, adsk.core.Point3D) else adsk.core.Point3D.create(*center, 0)
+        circle = self.circles.addByCenterRadius(point, radius)
+        if diameter is not None and self.parametric:
+            x, y = (point.x, point.y) if point is center else center
+            dimension = self.sketch.sketchDimensions.addDiameterDimension(
+                circle, adsk.core.Point3D.create(x + radius, y + radius, 0))
+            dimension.parameter.expression = diameter
+            count('sketch_dimensions')
+        return circle
+
+    def distance(self, one: adsk.fusion.SketchPoint, two: adsk.fusion.SketchPoint, expression: str,
+                 orientation: str = 'aligned'):
+        """Dimensions the distance between two sketch points to an expression, when parametric.
+
+        Arguments:
+        one, two -- The sketch points.
+        expression -- The expression the distance follows, such as a user parameter.
+        orientation -- 'aligned', 'horizontal' or 'vertical'.
+
+        Returns the dimension, or None when the builder isn't parametric.
+        """
+        if not self.parametric:
+            return None
+        a, b = one.geometry, two.geometry
+        textPoint = adsk.core.Point3D.create((a.x + b.x) / 2, (a.y + b.y) / 2, 0)
+        dimension = self.sketch.sketchDimensions.addDistanceDimension(one, two, ORIENTATIONS[orientation], textPoint)
+        dimension.parameter.expression = expression
+        count('sketch_dimensions')
+        return dimension
+
+    def midpoint(self, point: adsk.fusion.SketchPoint, line: adsk.fusion.SketchLine):
+        """Keeps a sketch point at the middle of a line, when parametric; returns the constraint or None."""
+        if not self.parametric:
+            return None
+        return self.sketch.geometricConstraints.addMidPoint(point, line)
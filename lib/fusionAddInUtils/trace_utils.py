@@ -0,0 +1,223 @@
+import collections
+import json
+import os
+import sys
+import time
+
+import adsk.core
+
+# Attempt to read the tracing settings from parent config.
+try:
+    from ... import config
+    TRACE = config.TRACE
+    TRACE_FOLDER = config.TRACE_FOLDER
+    TRACE_FORMAT = config.TRACE_FORMAT
+except:
+    TRACE = False
+    TRACE_FOLDER = None
+    TRACE_FORMAT = 'json'
+
+# The number of finished traces kept in memory, see traces().
+TRACE_HISTORY = 20
+
+# Calls into Python code of the adsk package count as Fusion API calls.
+_ADSK_FOLDER = os.path.dirname(os.path.abspath(adsk.core.__file__))
+
+_enabled = False
+_folder = None
+_format = 'json'
+_stack = []
+_traces = collections.deque(maxlen=TRACE_HISTORY)
+# the profiler, such as a debugger's, that was set before the outermost span
+# was entered; it is paused while spans count API calls, and set back after
+_previousProfile = None
+
+
+class Span:
+    """A timed part of a trace, with the spans it is made of and what was counted in it.
+
+    Counters include what was counted in the span's children, like the
+    duration includes their time.
+    """
+
+    __slots__ = ('name', 'args', 'parent', 'children', 'counters', 'start', 'end')
+
+    def __init__(self, name, parent, args):
+        self.name = name
+        self.args = args
+        self.parent = parent
+        self.children = []
+        self.counters = collections.Counter()
+        self.start = time.perf_counter_ns()
+        self.end = None
+        if parent is not None:
+            parent.children.append(self)
+
+    @property
+    def root(self):
+        span = self
+        while span.parent is not None:
+            span = span.parent
+        return span
+
+    @property
+    def duration(self):
+        """Seconds from start to end, or to now for a span that is still open."""
+        return ((self.end or time.perf_counter_ns()) - self.start) / 1e9
+
+    def __enter__(self):
+        global _previousProfile
+        if not _stack:
+            _previousProfile = sys.getprofile()
+            sys.setprofile(_count_api_calls)
+        _stack.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        global _previousProfile
+        _stack.pop()
+        if not _stack:
+            sys.setprofile(_previousProfile)
+            _previousProfile = None
+        close_span(self)
+        return False
+
+
+class _NoSpan:
+    """What span() returns while tracing is off."""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def enable_tracing(folder: str = None, format: str = 'json'):
+    """Starts tracing.
+
+    Arguments:
+    folder -- A folder every finished trace is written to, if given.
+    format -- 'json' for a tree of spans or 'chrome' for the Chrome trace
+              event format, which chrome://tracing and Perfetto can open.
+    """
+    global _enabled, _folder, _format
+    if format not in ('json', 'chrome'):
+        raise ValueError(f'unknown trace format {format!r}')
+    _enabled, _folder, _format = True, folder, format
+
+
+def disable_tracing():
+    """Stops tracing. Spans that are open are still finished."""
+    global _enabled
+    _enabled = False
+
+
+def span(name: str, parent: Span = None, **args):
+    """A span to time a block of code with a with statement.
+
+    Arguments:
+    name -- The name of the span.
+    parent -- The span it is part of; by default the span of the enclosing
+              with statement. A span without either is a trace of its own.
+    args -- Anything else to record with the span.
+
+    While tracing is off this returns a shared object that does nothing, so
+    a with statement costs no more than the call.
+    """
+    if not _enabled:
+        return _NO_SPAN
+    return Span(name, parent if parent is not None else (_stack[-1] if _stack else None), args)
+
+
+def open_span(name: str, parent: Span = None, **args):
+    """A span that stays open until close_span, for work spread over several events.
+
+    Spans are made part of it by passing it as their parent. Returns None
+    while tracing is off.
+    """
+    if not _enabled:
+        return None
+    return Span(name, parent if parent is not None else (_stack[-1] if _stack else None), args)
+
+
+def close_span(span: Span):
+    """Ends a span; a trace is finished, kept and written out when its root span ends."""
+    if span is None or span.end is not None:
+        return
+    span.end = time.perf_counter_ns()
+    if span.parent is None:
+        _traces.append(span)
+        if _folder:
+            write_trace(span, _folder, _format)
+
+
+def count(name: str, n: int = 1):
+    """Adds n to the counter name of the current span."""
+    if not _stack:
+        return
+    span = _stack[-1]
+    while span is not None:
+        span.counters[name] += n
+        span = span.parent
+
+
+def traces():
+    """The most recent finished traces, oldest first."""
+    return list(_traces)
+
+
+def trace_to_json(span: Span):
+    """The span and everything in it as a dict, with times in milliseconds from the start of the trace."""
+    origin = span.root.start
+
+    def node(span):
+        return {'name': span.name,
+                'start_ms': round((span.start - origin) / 1e6, 3),
+                'duration_ms': round(span.duration * 1000, 3),
+                'args': span.args,
+                'counters': dict(span.counters),
+                'children': [node(child) for child in span.children]}
+
+    return node(span)
+
+
+def trace_to_chrome(span: Span):
+    """The span and everything in it as complete events of the Chrome trace event format."""
+    events = []
+
+    def add(span):
+        events.append({'name': span.name, 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                       'ts': span.start / 1000, 'dur': span.duration * 1e6,
+                       'args': dict(span.args, **span.counters)})
+        for child in span.children:
+            add(child)
+
+    add(span)
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_trace(span: Span, folder: str, format: str = 'json'):
+    """Writes a trace to a new file in folder and returns its path."""
+    os.makedirs(folder, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(folder, f'{span.name}-{stamp}-{span.start % 1000000:06d}.{format}.json')
+    with open(path, 'w') as f:
+        json.dump(trace_to_chrome(span) if format == 'chrome' else trace_to_json(span), f, indent=1, default=str)
+    return path
+
+
+def _count_api_calls(frame, event, arg):
+    # Only calls made from outside the adsk package are counted, not the
+    # calls the API makes to itself.
+    if event == 'call' and frame.f_code.co_filename.startswith(_ADSK_FOLDER):
+        caller = frame.f_back
+        if caller is None or not caller.f_code.co_filename.startswith(_ADSK_FOLDER):
+            count('api_calls')
+
+
+if TRACE:
+    enable_tracing(TRACE_FOLDER, TRACE_FORMAT)
@@ -0,0 +1,12 @@
+# Headless model of a Multiconnect back. Nothing in this package imports adsk,
+# so it can be used by the add-in as well as from plain Python on a machine
+# without Fusion. Only the modules re-exported here are free of NumPy; import
+# the mesh modules (mesh, back, export, cache) explicitly where they are needed.
+from .expressions import *
+from .params import *
+from .polygons import *
+from .section import *
+from .preview import *
+from .plan import *
+from .tiles import *
+from .properties import *
@@ -0,0 +1,398 @@
+"""Triangle meshes of a Multiconnect back, built without Fusion.
+
+The back is a box with slotCount notches running up from its bottom edge. A
+notch is the part of the slot tool of plan.back_plan that overlaps the back:
+the straight dovetail, the rounded end left by the quarter revolve and its
+mirror, the onramp cylinders and the dimple. At any height z the notch is
+described by its half width at a fixed list of depths, so its walls can be
+lofted between cross-sections instead of running mesh booleans. When the
+rounded end closes up, the samples collapse onto the slot axis and weld()
+removes what is left of them.
+
+The back is assembled from identical cells, one per slot and
+distanceBetweenSlots wide, with a plain block at each end to make up the
+width. Closed, for 3MF, it is a stack of solids instead: the heights where
+every notch is straight are the exact cross-section of section.back_section
+extruded, so they cost the same however finely circles are divided, and
+cells are only made where the onramps, the dimple and the rounded ends are.
+"""
+
+import collections
+
+import numpy as np
+
+from .mesh import Mesh, merge, tiled, weld
+from .params import DIMPLE_SIZE, ONRAMP_LENGTH, SLOT_DEPTH, layout, slot_profile
+from .polygons import boundary, cross_points
+from .section import back_section
+
+
+# Number of segments used for a half circle. Lower it for previews.
+DEFAULT_SEGMENTS = 16
+
+# A mesh and the (n, 3) offsets it is placed at.
+Part = collections.namedtuple('Part', 'mesh offsets')
+
+
+def back_mesh(params, segments=DEFAULT_SEGMENTS):
+    """Mesh of the finished back, or of the slot tools when ``params.toolsOnly`` is set."""
+    if params.toolsOnly:
+        return slot_tools_mesh(layout(params), segments)
+    return weld(merge(tiled(part.mesh, part.offsets) for part in back_parts(params, segments)))
+
+
+def back_parts(params, segments=DEFAULT_SEGMENTS, closed=False):
+    """The back, or the slot tools, as a few meshes that are each placed at a list of offsets.
+
+    Placing and merging the parts gives back_mesh without the final weld. The
+    cells are open where they meet their neighbours; with ``closed`` every
+    part is a closed shell instead and the back is a stack of solids that
+    touch, see _stacked_parts.
+    """
+    lay = layout(params)
+    offsets = np.array([(x, 0, 0) for x in lay.slotXs])
+    if params.toolsOnly:
+        return [Part(slot_tool_mesh(lay, segments), offsets)]
+    if closed:
+        return _stacked_parts(lay, segments)
+
+    h = params.distanceBetweenSlots / 2
+    zs = _levels(lay, 0, lay.backHeight, segments, params.dotRadius)
+    ys = _boundary_depths(lay, segments)
+    parts = [Part(weld(_back_cell(lay, zs, segments)), offsets)]
+
+    here = np.zeros((1, 3))
+    left, right = -lay.backWidth / 2, lay.backWidth / 2
+    first, last = lay.slotXs[0] - h, lay.slotXs[-1] + h
+    if first - left > 1e-9:
+        parts.append(Part(weld(_block(left, first, ys, zs, sides=(True, False))), here))
+    else:
+        parts.append(Part(_flipped(_x_face(first, ys, zs)), here))
+    if right - last > 1e-9:
+        parts.append(Part(weld(_block(last, right, ys, zs, sides=(False, True))), here))
+    else:
+        parts.append(Part(_x_face(last, ys, zs), here))
+    return parts
+
+
+def _stacked_parts(lay, segments):
+    """The back as closed solids stacked from z = 0 up, each placed where it repeats.
+
+    The heights of the onramps, and of the dimple and rounded ends at the top,
+    are spans of closed cells with a box at each end of the row. The heights
+    between them are prisms of the back's cross-section, one per length. All
+    onramps clear of the bottom edge are alike, so their span is made once.
+    """
+    params = lay.params
+    r = params.dotRadius
+    height = lay.backHeight
+    spans = []
+    for lo, hi in sorted([(max(z - r, 0.0), min(z + r, height)) for z in lay.onrampZs]
+                         + [(lay.slotTop - DIMPLE_SIZE, height)]):
+        if spans and lo < spans[-1][1] + 1e-9:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], hi))
+        else:
+            spans.append((lo, hi))
+    gaps = [(lo, hi) for lo, hi in zip([0.0] + [hi for _, hi in spans], [lo for lo, _ in spans])
+            if hi - lo > 1e-9]
+
+    # what is made, by a key for its shape, as (its bottom, its meshes and how
+    # they repeat across the row) and the heights of its copies
+    made = {}
+    heights = collections.defaultdict(list)
+    for lo, hi in spans:
+        key = 'onramp' if any(abs(z - r - lo) < 1e-9 and abs(z + r - hi) < 1e-9 for z in lay.onrampZs) else lo
+        if key not in made:
+            made[key] = lo, _span_meshes(lay, lo, hi, segments)
+        heights[key].append(lo)
+    if gaps:
+        section = _section_faces(back_section(lay))
+    for lo, hi in gaps:
+        key = round(hi - lo, 9)
+        if key not in made:
+            made[key] = lo, [(_prism(section, lo, hi), [0.0])]
+        heights[key].append(lo)
+
+    parts = []
+    for key, (bottom, meshes) in made.items():
+        for mesh, xs in meshes:
+            parts.append(Part(mesh, np.array([(x, 0, z - bottom) for z in heights[key] for x in xs])))
+    return parts
+
+
+def _span_meshes(lay, lo, hi, segments):
+    """The closed slot cell and end boxes of the heights lo to hi, with the x each is placed at."""
+    h = lay.params.distanceBetweenSlots / 2
+    zs = _levels(lay, lo, hi, segments, lay.params.dotRadius)
+    ys = _boundary_depths(lay, segments)
+    meshes = [(weld(merge([_back_cell(lay, zs, segments), _flipped(_x_face(-h, ys, zs)), _x_face(h, ys, zs)])),
+               lay.slotXs)]
+    box = np.array([0, lay.params.backThickness])
+    left, right = -lay.backWidth / 2, lay.backWidth / 2
+    first, last = lay.slotXs[0] - h, lay.slotXs[-1] + h
+    for x0, x1 in ((left, first), (last, right)):
+        if x1 - x0 > 1e-9:
+            meshes.append((weld(_block(x0, x1, box, zs[[0, -1]], sides=(True, True))), [0.0]))
+    return meshes
+
+
+def _section_faces(traps):
+    """Points, counter-clockwise triangles and boundary edges of a cross-section given as trapezoids.
+
+    Each trapezoid is zipped up between the corners along its bottom and top,
+    its own and its neighbours', so the triangles meet without T-junctions.
+    """
+    index = {}
+
+    def at(x, y):
+        return index.setdefault((x, y), len(index))
+
+    faces = []
+    for trap, (bottomCuts, topCuts) in zip(traps, cross_points(traps)):
+        rows = []
+        for y, x0, x1, cuts in ((trap.bottom, trap.bottomLeft, trap.bottomRight, bottomCuts),
+                                (trap.top, trap.topLeft, trap.topRight, topCuts)):
+            xs = [x0] + cuts + [x1] if x1 > x0 else [x0]
+            rows.append(([at(x, y) for x in xs], [(x - x0) / (x1 - x0) if x1 > x0 else 0.0 for x in xs]))
+        (bottom, bottomAt), (top, topAt) = rows
+        i = j = 0
+        while i < len(bottom) - 1 or j < len(top) - 1:
+            if j == len(top) - 1 or (i < len(bottom) - 1 and bottomAt[i + 1] <= topAt[j + 1]):
+                faces.append((bottom[i], bottom[i + 1], top[j]))
+                i += 1
+            else:
+                faces.append((bottom[i], top[j + 1], top[j]))
+                j += 1
+
+    edges = [(at(*start), at(*end)) for start, end in boundary(traps)]
+    return np.array(list(index), dtype=float).reshape(-1, 2), np.array(faces).reshape(-1, 3), np.array(edges)
+
+
+def _prism(section, z0, z1):
+    """The closed mesh of a cross-section from _section_faces between heights z0 and z1."""
+    points, faces, edges = section
+    n = len(points)
+    vertices = np.concatenate([np.column_stack([points, np.full(n, z0)]), np.column_stack([points, np.full(n, z1)])])
+    a, b = edges[:, 0], edges[:, 1]
+    walls = np.concatenate([np.stack([a, b, b + n], axis=1), np.stack([a, b + n, a + n], axis=1)])
+    return Mesh(vertices, np.concatenate([faces[:, ::-1], faces + n, walls]))
+
+
+def slot_tools_mesh(lay, segments=DEFAULT_SEGMENTS):
+    """The patterned slot tools, one closed shell per slot."""
+    tool = slot_tool_mesh(lay, segments)
+    return tiled(tool, [(x, 0, 0) for x in lay.slotXs])
+
+
+def slot_tool_mesh(lay, segments=DEFAULT_SEGMENTS):
+    """A single slot tool, centred on x = 0 and placed like the first slot otherwise."""
+    params = lay.params
+    ys, ws, ramp = _side_samples(lay, segments)
+    r = params.dotRadius
+
+    lo = min([lay.slotBottom] + [z - r for z in lay.onrampZs])
+    hi = lay.slotTop + ws.max()
+    zs = _levels(lay, lo, hi, segments, ws.max())
+    prism = zs >= lay.slotBottom - 1e-9
+    if lo < lay.slotBottom:
+        # the onramp hangs below the straight part, so the end of the straight
+        # part is a step: take that height twice, without and with the prism
+        i = int(np.argmax(prism))
+        zs = np.insert(zs, i, zs[i])
+        prism = np.insert(prism, i, False)
+
+    xs = _half_widths(lay, zs, ws, ramp, prism)
+    fx, fy = _floor(lay, zs, xs[:, 0], segments)
+
+    count = len(zs)
+    ring = np.concatenate([_points(fx, fy, zs),
+                           _points(xs, ys, zs),
+                           _points(-xs[:, ::-1], ys[::-1], zs)], axis=1)
+    ring = np.concatenate([ring, ring[:, :1]], axis=1)
+    mirrored = np.arange(ring.shape[1] - 1) >= fx.shape[1] + len(ys) - 1
+    parts = [_grid(ring.transpose(1, 0, 2), mirrored)]
+
+    for level, flip in ((0, True), (count - 1, False)):
+        z = zs[level]
+        x = xs[level]
+        fan = np.array([(-x[1], ys[1], z), (-x[0], ys[0], z)]
+                       + [(a, b, z) for a, b in zip(fx[level], fy[level])]
+                       + [(x[0], ys[0], z), (x[1], ys[1], z)])
+        strip = np.stack([np.stack([-x[1:], ys[1:], np.full(len(ys) - 1, z)], axis=1),
+                          np.stack([x[1:], ys[1:], np.full(len(ys) - 1, z)], axis=1)])
+        cap = merge([_fan(fan), _grid(strip)])
+        parts.append(_flipped(cap) if flip else cap)
+
+    return weld(merge(parts))
+
+
+def _side_samples(lay, segments, depth=None):
+    """Depths and half widths down the right-hand side of the slot profile.
+
+    Depths are model y coordinates. Sloped edges are split so the rounded end
+    follows them closely. With ``depth`` the samples stop the first time that
+    depth below the slot floor is reached. ``ramp`` marks the samples the
+    onramp cylinders reach.
+    """
+    chain = slot_profile(lay.params.dotRadius)[1:-2]
+    ys, ws = [chain[0][1]], [chain[0][0]]
+    for (x0, y0), (x1, y1) in zip(chain, chain[1:]):
+        pieces = max(1, segments // 4) if x0 != x1 and y0 != y1 else 1
+        for t in np.linspace(0, 1, pieces + 1)[1:]:
+            ys.append(y0 + (y1 - y0) * t)
+            ws.append(x0 + (x1 - x0) * t)
+        if depth is not None and y1 >= depth:
+            break
+
+    ys = np.array(ys)
+    ws = np.array(ws)
+    ramp = np.arange(len(ys)) <= np.argmax(ys >= ONRAMP_LENGTH)
+    return ys + lay.slotFloor, ws, ramp
+
+
+def _boundary_depths(lay, segments):
+    ys, _, _ = _side_samples(lay, segments, SLOT_DEPTH)
+    return np.concatenate(([0], ys))
+
+
+def _levels(lay, lo, hi, segments, widest):
+    """Heights at which cross-sections are taken, between lo and hi."""
+    quarter = np.sin(np.linspace(0, np.pi / 2, segments // 2 + 1))
+    half = np.sin(np.linspace(-np.pi / 2, np.pi / 2, segments + 1))
+    r = lay.params.dotRadius
+
+    zs = [[lo, hi, lay.slotTop, lay.slotBottom],
+          lay.slotTop + widest * quarter,
+          lay.slotTop + DIMPLE_SIZE * half]
+    zs += [z + r * half for z in lay.onrampZs]
+    zs = np.unique(np.round(np.concatenate(zs), 9))
+    return zs[(zs >= round(lo, 9)) & (zs <= round(hi, 9))]
+
+
+def _half_widths(lay, zs, ws, ramp, prism):
+    """Half width of the slot tool at every (height, depth sample)."""
+    dz = zs[:, None] - lay.slotTop
+    straight = np.where(prism[:, None], ws[None, :], 0.0)
+    rounded = np.sqrt(np.clip(ws[None, :] ** 2 - dz ** 2, 0, None))
+    xs = np.where(dz <= 0, straight, rounded)
+
+    if lay.onrampZs:
+        r = lay.params.dotRadius
+        d = zs[:, None] - np.array(lay.onrampZs)[None, :]
+        disc = np.sqrt(np.clip(r ** 2 - d ** 2, 0, None)).max(axis=1)
+        xs = np.maximum(xs, np.where(ramp[None, :], disc[:, None], 0.0))
+
+    return xs
+
+
+def _floor(lay, zs, halfWidth, segments):
+    """Points across the slot floor, raised where the dimple cone is."""
+    across = DIMPLE_SIZE * np.linspace(-1, 1, 2 * max(1, segments // 4) + 1)
+    fx = np.clip(across[None, :], -halfWidth[:, None], halfWidth[:, None])
+    radius = np.hypot(fx, zs[:, None] - lay.slotTop)
+    fy = lay.slotFloor + np.clip(DIMPLE_SIZE - radius, 0, None)
+    return fx, fy
+
+
+def _back_cell(lay, zs, segments):
+    """One slot of the back and the material either side of it, centred on x = 0.
+
+    The faces at the two ends of the cell are left open; neighbouring cells
+    and the end blocks close them.
+    """
+    params = lay.params
+    h = params.distanceBetweenSlots / 2
+    t = params.backThickness
+    ys, ws, ramp = _side_samples(lay, segments, SLOT_DEPTH)
+    count = len(zs)
+
+    xs = np.minimum(_half_widths(lay, zs, ws, ramp, np.ones(count, dtype=bool)), h)
+    fx, fy = _floor(lay, zs, xs[:, 0], segments)
+
+    # along the front face and round the notch, right to left
+    ring = np.concatenate([_points(np.full((count, 1), h), [t], zs),
+                           _points(xs[:, ::-1], ys[::-1], zs),
+                           _points(fx[:, ::-1], fy[:, ::-1], zs),
+                           _points(-xs, ys, zs),
+                           _points(np.full((count, 1), -h), [t], zs)], axis=1)
+    rear = _points(np.tile([-h, h], (count, 1)), [0, 0], zs)
+    mirrored = np.arange(ring.shape[1] - 1) >= len(ys) + fx.shape[1]
+    parts = [_grid(ring.transpose(1, 0, 2), mirrored), _grid(rear.transpose(1, 0, 2))]
+
+    for level, flip in ((0, True), (count - 1, False)):
+        z = zs[level]
+        x = xs[level]
+        column = np.full(len(ys), z)
+        right = np.stack([np.stack([x, ys, column], axis=1),
+                          np.stack([np.full(len(ys), h), ys, column], axis=1)])
+        left = np.stack([np.stack([np.full(len(ys), -h), ys, column], axis=1),
+                         np.stack([-x, ys, column], axis=1)])
+        slab = np.array([(-h, 0, z), (h, 0, z), (h, ys[0], z), (x[0], ys[0], z)]
+                        + [(a, b, z) for a, b in zip(fx[level][::-1], fy[level][::-1])]
+                        + [(-x[0], ys[0], z), (-h, ys[0], z)])
+        cap = merge([_grid(right), _grid(left), _fan(slab)])
+        parts.append(_flipped(cap) if flip else cap)
+
+    return merge(parts)
+
+
+def _block(x0, x1, ys, zs, sides):
+    """Solid end block from x0 to x1; ``sides`` picks which of its two x faces to make."""
+    xs = np.array([x0, x1])
+    across = np.tile(xs, (len(zs), 1))
+    parts = [_grid(_points(across, [0, 0], zs).transpose(1, 0, 2)),
+             _flipped(_grid(_points(across, [ys[-1]] * 2, zs).transpose(1, 0, 2)))]
+
+    for z, flip in ((zs[0], True), (zs[-1], False)):
+        face = np.stack([np.stack([np.full(len(ys), x), ys, np.full(len(ys), z)], axis=1) for x in xs])
+        parts.append(_flipped(_grid(face)) if flip else _grid(face))
+
+    if sides[0]:
+        parts.append(_flipped(_x_face(x0, ys, zs)))
+    if sides[1]:
+        parts.append(_x_face(x1, ys, zs))
+    return merge(parts)
+
+
+def _x_face(x, ys, zs):
+    """Face at constant x facing +x."""
+    face = np.stack([np.stack([np.full(len(zs), x), np.full(len(zs), y), zs], axis=1) for y in ys])
+    return _grid(face)
+
+
+def _points(x, y, zs):
+    """Stack x (levels, n) and y (n,) or (levels, n) into (levels, n, 3) points."""
+    x = np.asarray(x, dtype=float)
+    y = np.broadcast_to(np.asarray(y, dtype=float), x.shape)
+    z = np.broadcast_to(zs[:, None], x.shape)
+    return np.stack([x, y, z], axis=2)
+
+
+def _grid(points, mirrored=None):
+    """Triangulate an (a, b, 3) grid of points; faces point along d/da x d/db.
+
+    Each quad is split along its (i, j)-(i+1, j+1) diagonal, or along the other
+    one for the rows of ``mirrored`` that are set. Mirror images of a wall need
+    opposite splits so their faces coincide when the slot closes up.
+    """
+    a, b = points.shape[:2]
+    index = np.arange(a * b).reshape(a, b)
+    p, q = index[:-1, :-1], index[1:, :-1]
+    r, s = index[1:, 1:], index[:-1, 1:]
+    if mirrored is None:
+        mirrored = np.zeros(a - 1, dtype=bool)
+    flip = np.broadcast_to(np.asarray(mirrored)[:, None], p.shape)
+    first = np.where(flip[..., None], np.stack([p, q, s], axis=2), np.stack([p, q, r], axis=2))
+    second = np.where(flip[..., None], np.stack([q, r, s], axis=2), np.stack([p, r, s], axis=2))
+    faces = np.concatenate([first.reshape(-1, 3), second.reshape(-1, 3)])
+    return Mesh(points.reshape(-1, 3), faces)
+
+
+def _fan(points):
+    """Triangle fan over a convex polygon given counter-clockwise."""
+    i = np.arange(1, len(points) - 1)
+    return Mesh(np.asarray(points, dtype=float), np.stack([np.zeros_like(i), i, i + 1], axis=1))
+
+
+def _flipped(mesh):
+    return Mesh(mesh.vertices, mesh.faces[:, ::-1])
@@ -0,0 +1,221 @@
+"""Generate a catalogue of backs as mesh files, in parallel, without Fusion.
+
+The catalogue is a CSV file with a header row, or a JSON list of objects,
+with a ``width`` and ``height`` per back and optionally ``name``,
+``toolsOnly`` and any other BackParams field. Lengths are in millimetres, as
+in the dialog. Every back is written to its own STL or 3MF file in the output
+directory, next to a manifest.json with what was made and how long it took.
+With ``--bed``, backs too wide for the printer bed are split into tiles (see
+tiles.py), each written to its own file and generated as a job of its own.
+An entry that makes no back, such as one without a height or one too high
+for the bed, is reported in the manifest with its error, and the rest of the
+catalogue is made all the same. The meshes of every back are kept in a
+cache.MeshCache shared by the workers, so sizes made before are only
+written out again; --no-cache makes them all afresh.
+
+    python -m lib.multiconnectBack.batch catalogue.csv --out backs
+    python -m lib.multiconnectBack.batch catalogue.json --out backs --format 3mf --jobs 8
+    python -m lib.multiconnectBack.batch catalogue.csv --out backs --bed 256x256
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import sys
+import time
+
+from .back import DEFAULT_SEGMENTS
+from .cache import MeshCache, default_cache_dir
+from .export import MM_PER_CM, write_3mf, write_stl
+from .params import BackParams, layout
+from .tiles import tiles
+
+
+FORMATS = {'stl': write_stl, '3mf': write_3mf}
+
+# BackParams fields given in millimetres in a catalogue
+LENGTH_FIELDS = ('width', 'height', 'dotRadius', 'distanceBetweenSlots', 'baseThickness', 'backThickness',
+                 'slotOffset')
+
+
+# BackParams fields every catalogue entry has to give
+REQUIRED_FIELDS = ('width', 'height')
+
+
+def read_catalogue(path):
+    """The entries of a CSV or JSON catalogue; raises ValueError for a JSON file that isn't a list.
+
+    The entries are what the file holds, checked one by one in entry_params.
+    """
+    with open(path, newline='') as f:
+        if not path.lower().endswith('.json'):
+            return list(csv.DictReader(f))
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f'a JSON catalogue is a list of backs, not a {type(entries).__name__}')
+    return entries
+
+
+def entry_params(entry):
+    """BackParams of a catalogue entry.
+
+    Raises ValueError for an entry that isn't an object, one without a width
+    or height, a value that isn't a number, and unknown keys other than name.
+    """
+    if not isinstance(entry, dict):
+        raise ValueError(f'a catalogue entry is an object with a width and height, not {entry!r}')
+    fields = {}
+    for key, value in entry.items():
+        if key == 'name' or value in (None, ''):
+            continue
+        if key not in BackParams._fields:
+            raise ValueError(f'unknown catalogue field {key!r}')
+        if key == 'toolsOnly':
+            fields[key] = value if isinstance(value, bool) else str(value).strip().lower() in ('1', 'true', 'yes')
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{key} is not a number: {value!r}') from None
+        fields[key] = number / MM_PER_CM if key in LENGTH_FIELDS else number
+    missing = [key for key in REQUIRED_FIELDS if key not in fields]
+    if missing:
+        raise ValueError(f'no {" or ".join(missing)} given')
+    return BackParams(**fields)
+
+
+def entry_name(entry, params):
+    if entry.get('name'):
+        return str(entry['name'])
+    name = f'back-{params.width * MM_PER_CM:g}x{params.height * MM_PER_CM:g}'
+    return name + '-tools' if params.toolsOnly else name
+
+
+def bed_size(text):
+    """(width, depth) in centimetres of a bed given as WIDTHxDEPTH in millimetres."""
+    try:
+        width, depth = (float(size) / MM_PER_CM for size in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected WIDTHxDEPTH in millimetres, not {text!r}')
+    return width, depth
+
+
+def generate(job):
+    """Write one back; runs in a worker process and reports back for the manifest.
+
+    With a cache directory, the parts of the back are taken from the
+    MeshCache there, or made and kept in it.
+    """
+    name, params, path, fileFormat, segments, tile, cacheDirectory = job
+    start = time.perf_counter()
+    record = {'name': name, 'file': os.path.basename(path), 'params': params._asdict()}
+    if tile:
+        record['tile'] = tile
+    try:
+        parts = None
+        if cacheDirectory:
+            meshCache = MeshCache(cacheDirectory)
+            parts = meshCache.parts(params, segments, closed=fileFormat == '3mf')
+            record['cached'] = meshCache.hits > 0
+        record['triangles'] = FORMATS[fileFormat](path, params, segments, parts=parts)
+        record['bytes'] = os.path.getsize(path)
+    except Exception as e:
+        record['error'] = f'{type(e).__name__}: {e}'
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def run(entries, out, fileFormat='stl', jobs=None, segments=DEFAULT_SEGMENTS, bed=None, cache=None):
+    """Generate every entry, split into tiles for a bed (width, depth) if given, and return the manifest.
+
+    The manifest has the number and count of each tile, and where along the
+    back its centre is, in millimetres. An entry that makes no back is
+    listed by its number in the catalogue, counted from 1, with the error.
+    cache is the directory of a MeshCache to take the meshes from, and with
+    one every back made says whether its meshes were cached.
+    """
+    os.makedirs(out, exist_ok=True)
+    work = []
+    backs = []
+    names = set()
+    for number, entry in enumerate(entries, 1):
+        try:
+            entryWork = entry_jobs(entry, out, fileFormat, segments, bed, cache)
+            taken = names.intersection(job[0] for job in entryWork)
+            if taken:
+                raise ValueError(f'another entry is named {min(taken)!r} already')
+        except ValueError as e:
+            name = entry.get('name') if isinstance(entry, dict) else None
+            backs.append({'name': str(name or f'entry {number}'), 'entry': number, 'error': str(e)})
+            continue
+        names.update(job[0] for job in entryWork)
+        backs += [len(work) + i for i in range(len(entryWork))]
+        work += entryWork
+
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        made = list(pool.map(generate, work, chunksize=max(1, len(work) // (4 * (jobs or os.cpu_count() or 1)))))
+    return {'format': fileFormat,
+            'segments': segments,
+            'bed': [size * MM_PER_CM for size in bed] if bed else None,
+            'seconds': round(time.perf_counter() - start, 3),
+            'backs': [made[back] if isinstance(back, int) else back for back in backs]}
+
+
+def entry_jobs(entry, out, fileFormat, segments, bed=None, cache=None):
+    """The jobs of generate for one catalogue entry, one per tile.
+
+    Raises ValueError for an entry that makes no back, before any work is started.
+    """
+    params = entry_params(entry)
+    name = entry_name(entry, params)
+    if bed:
+        backTiles = tiles(params, *bed)
+    else:
+        layout(params)
+        backTiles = [None]
+    if len(backTiles) == 1:
+        return [(name, params, os.path.join(out, f'{name}.{fileFormat}'), fileFormat, segments, None, cache)]
+    result = []
+    for number, tile in enumerate(backTiles, 1):
+        tileName = f'{name}-tile{number}'
+        result.append((tileName, tile.params, os.path.join(out, f'{tileName}.{fileFormat}'), fileFormat, segments,
+                       {'back': name, 'number': number, 'count': len(backTiles), 'x': round(tile.x * MM_PER_CM, 4)},
+                       cache))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('catalogue', help='CSV or JSON file of the backs to make')
+    parser.add_argument('--out', default='backs', help='directory for the mesh files and manifest.json')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='stl')
+    parser.add_argument('--jobs', type=int, help='worker processes, one per CPU by default')
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS, help='segments per half circle')
+    parser.add_argument('--bed', type=bed_size, help='split backs into tiles for a WIDTHxDEPTH mm printer bed')
+    parser.add_argument('--cache', default=default_cache_dir(), help='directory of the mesh cache')
+    parser.add_argument('--no-cache', dest='cache', action='store_const', const=None,
+                        help='make every mesh afresh and keep none')
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = run(read_catalogue(args.catalogue), args.out, args.format, args.jobs, args.segments, args.bed,
+                       args.cache)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    with open(os.path.join(args.out, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+
+    failed = [back for back in manifest['backs'] if 'error' in back]
+    for back in failed:
+        print(f'{back["name"]}: {back["error"]}', file=sys.stderr)
+    print(f'{len(manifest["backs"]) - len(failed)} of {len(manifest["backs"])} backs '
+          f'written to {args.out} in {manifest["seconds"]} s')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
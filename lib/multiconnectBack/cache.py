@@ -0,0 +1,182 @@
+"""Persistent cache of back meshes, keyed by what shapes them.
+
+Every entry is a file named after a hash of its BackParams, segment count and
+kind, holding a small header and raw (n, 3) arrays: the vertices and faces of
+the back's mesh, or those and the offsets of each of its back_parts, which
+is what the exporters write. Hits are read back with np.memmap, so nothing
+is copied until the arrays are used. The cache is bounded by size: a hit
+touches its file, and when a new entry takes the cache over its limit, the
+files touched longest ago are removed first. Several processes can share a
+directory; entries are written to a temporary file and renamed into place.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from .back import DEFAULT_SEGMENTS, Part, back_mesh, back_parts
+from .mesh import Mesh
+
+
+# Bump when the meshes made for the same parameters change.
+MESH_VERSION = 2
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+MAGIC = b'MCBMESH1'
+HEADER = np.dtype([('magic', 'S8'), ('version', '<u8'), ('arrays', '<u8')])
+# what follows the header for each array: its type, a key of ARRAY_TYPES, and its length
+ARRAY_HEADER = np.dtype([('type', '<u8'), ('rows', '<u8')])
+ARRAY_TYPES = {0: np.dtype('<f8'), 1: np.dtype('<i8')}
+SUFFIX = '.mesh'
+
+CacheStats = collections.namedtuple('CacheStats', 'hits misses evictions entries bytes')
+
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'multiconnect-back')
+
+
+def cache_key(params, segments=DEFAULT_SEGMENTS, kind='mesh'):
+    """Hex digest of every parameter that changes the mesh, and of what is kept of it.
+
+    kind is 'mesh' for back_mesh, or 'parts' or 'closed parts' for back_parts.
+    """
+    fields = {name: float(value) for name, value in params._asdict().items()}
+    fields.update(segments=segments, version=MESH_VERSION, kind=kind)
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+class MeshCache:
+    """Back meshes on disk, at most maxBytes of them."""
+
+    def __init__(self, directory=None, maxBytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def mesh(self, params, segments=DEFAULT_SEGMENTS, build=back_mesh):
+        """The mesh for params, from the cache or made by build and stored."""
+        mesh = self.get(params, segments)
+        if mesh is None:
+            mesh = build(params, segments)
+            self.put(params, mesh, segments)
+        return mesh
+
+    def get(self, params, segments=DEFAULT_SEGMENTS):
+        """The cached mesh, memory-mapped read-only, or None."""
+        arrays = self._get(params, segments, 'mesh')
+        return None if arrays is None else Mesh(*arrays)
+
+    def put(self, params, mesh, segments=DEFAULT_SEGMENTS):
+        self._put(params, segments, 'mesh', [mesh.vertices, mesh.faces])
+
+    def parts(self, params, segments=DEFAULT_SEGMENTS, closed=False, build=back_parts):
+        """back_parts of params, from the cache or made by build and stored; memory-mapped when cached."""
+        kind = 'closed parts' if closed else 'parts'
+        arrays = self._get(params, segments, kind)
+        if arrays is not None:
+            return [Part(Mesh(arrays[i], arrays[i + 1]), arrays[i + 2]) for i in range(0, len(arrays), 3)]
+        parts = build(params, segments, closed)
+        self._put(params, segments, kind, [array for part in parts
+                                           for array in (part.mesh.vertices, part.mesh.faces, part.offsets)])
+        return parts
+
+    def evict(self, keep=None):
+        """Remove the least recently used entries, except keep, until the cache fits."""
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.maxBytes:
+                break
+            if entry.path == keep:
+                continue
+            try:
+                size = entry.stat().st_size
+                os.unlink(entry.path)
+            except OSError:
+                # gone already, or still mapped on a system that won't delete it
+                continue
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        for entry in self._entries():
+            os.unlink(entry.path)
+
+    def stats(self):
+        entries = list(self._entries())
+        return CacheStats(self.hits, self.misses, self.evictions, len(entries),
+                          sum(entry.stat().st_size for entry in entries))
+
+    def _get(self, params, segments, kind):
+        path = self._path(params, segments, kind)
+        try:
+            arrays = _read(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return arrays
+
+    def _put(self, params, segments, kind, arrays):
+        path = self._path(params, segments, kind)
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as out:
+                _write(out, arrays)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self.evict(keep=path)
+
+    def _path(self, params, segments, kind='mesh'):
+        return os.path.join(self.directory, cache_key(params, segments, kind) + SUFFIX)
+
+    def _entries(self):
+        with os.scandir(self.directory) as entries:
+            return [entry for entry in entries if entry.name.endswith(SUFFIX)]
+
+
+def _write(out, arrays):
+    # (n, 3) arrays of floats or integers
+    arrays = [np.ascontiguousarray(array, dtype='<f8' if np.issubdtype(array.dtype, np.floating) else '<i8')
+              for array in arrays]
+    types = {dtype: key for key, dtype in ARRAY_TYPES.items()}
+    out.write(np.array([(MAGIC, MESH_VERSION, len(arrays))], dtype=HEADER).tobytes())
+    out.write(np.array([(types[array.dtype], len(array)) for array in arrays], dtype=ARRAY_HEADER).tobytes())
+    for array in arrays:
+        out.write(array.tobytes())
+
+
+def _read(path):
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    if len(header) != 1 or header['magic'][0] != MAGIC or header['version'][0] != MESH_VERSION:
+        raise ValueError(f'{path} is not a cached mesh')
+    count = int(header['arrays'][0])
+    arrayHeaders = np.fromfile(path, dtype=ARRAY_HEADER, count=count, offset=HEADER.itemsize)
+    if len(arrayHeaders) != count or not set(arrayHeaders['type'].tolist()) <= set(ARRAY_TYPES):
+        raise ValueError(f'{path} is not a cached mesh')
+    offset = HEADER.itemsize + ARRAY_HEADER.itemsize * count
+    if os.path.getsize(path) != offset + 24 * int(arrayHeaders['rows'].sum()):
+        raise ValueError(f'{path} is truncated')
+
+    arrays = []
+    for arrayType, rows in arrayHeaders.tolist():
+        # np.memmap can't map nothing
+        if rows:
+            arrays.append(np.memmap(path, dtype=ARRAY_TYPES[arrayType], mode='r', offset=offset, shape=(rows, 3)))
+        else:
+            arrays.append(np.empty((0, 3), dtype=ARRAY_TYPES[arrayType]))
+        offset += 24 * rows
+    return arrays
@@ -0,0 +1,122 @@
+"""Binary STL and 3MF files of a back, written without building its whole mesh.
+
+A back is a few small meshes placed many times: a cell per slot and a block
+at each end, or a slot tool per slot for tools only (see back.back_parts).
+The writers stream the placed triangles to the file one placement at a time,
+so memory use stays the same however wide the back is. The 3MF file stores
+each mesh once and places it with components, which also keeps it small.
+
+Lengths in the files are in millimetres.
+"""
+
+import struct
+import zipfile
+
+import numpy as np
+
+from .back import DEFAULT_SEGMENTS, back_parts
+from .mesh import face_normals, triangles
+
+
+MM_PER_CM = 10
+
+STL_HEADER = b'Multiconnect back'
+
+# 50 byte binary STL triangle: normal, three corners, attribute byte count.
+STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attributes', '<u2')])
+
+# Vertices and triangles are formatted this many at a time.
+XML_CHUNK = 4096
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+ <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+ <Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>
+</Types>
+"""
+
+RELATIONSHIPS = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+ <Relationship Target="/3D/3dmodel.model" Id="rel0"
+  Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>
+</Relationships>
+"""
+
+
+def write_stl(path, params, segments=DEFAULT_SEGMENTS, parts=None):
+    """Write the back (or the slot tools) to a binary STL file; returns the triangle count.
+
+    parts are the back_parts of params, such as those kept by cache.MeshCache;
+    they are made when not given.
+    """
+    parts = back_parts(params, segments) if parts is None else parts
+    count = sum(len(part.mesh.faces) * len(part.offsets) for part in parts)
+    with open(path, 'wb') as out:
+        out.write(STL_HEADER.ljust(80, b'\0'))
+        out.write(struct.pack('<I', count))
+        for chunk in stl_records(parts):
+            out.write(chunk)
+    return count
+
+
+def stl_records(parts):
+    """The STL records of the placed parts, as bytes, one placement at a time."""
+    for part in parts:
+        records = np.zeros(len(part.mesh.faces), dtype=STL_RECORD)
+        records['normal'] = face_normals(part.mesh)
+        corners = triangles(part.mesh) * MM_PER_CM
+        for offset in part.offsets:
+            records['corners'] = corners + offset * MM_PER_CM
+            yield records.tobytes()
+
+
+def write_3mf(path, params, segments=DEFAULT_SEGMENTS, name='Back', parts=None):
+    """Write the back (or the slot tools) to a 3MF file, each repeated mesh stored once.
+
+    parts are the closed back_parts of params, made when not given. Returns
+    the number of triangles placed.
+    """
+    parts = back_parts(params, segments, closed=True) if parts is None else parts
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', RELATIONSHIPS)
+        with archive.open('3D/3dmodel.model', 'w') as model:
+            for text in model_xml(parts, name):
+                model.write(text.encode('utf-8'))
+    return sum(len(part.mesh.faces) * len(part.offsets) for part in parts)
+
+
+def model_xml(parts, name):
+    """The 3D model part of a 3MF file, in pieces.
+
+    Every part is a mesh object; one more object holds the placements of all
+    of them as components, and is the single item of the build.
+    """
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<model unit="millimeter" xml:lang="en-US" '
+           'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n'
+           ' <resources>\n')
+
+    for objectId, part in enumerate(parts, 1):
+        yield f'  <object id="{objectId}" type="model">\n   <mesh>\n    <vertices>\n'
+        vertices = part.mesh.vertices * MM_PER_CM
+        for start in range(0, len(vertices), XML_CHUNK):
+            yield ''.join('     <vertex x="%.6g" y="%.6g" z="%.6g"/>\n' % tuple(v)
+                          for v in vertices[start:start + XML_CHUNK])
+        yield '    </vertices>\n    <triangles>\n'
+        faces = part.mesh.faces
+        for start in range(0, len(faces), XML_CHUNK):
+            yield ''.join('     <triangle v1="%d" v2="%d" v3="%d"/>\n' % tuple(f)
+                          for f in faces[start:start + XML_CHUNK])
+        yield '    </triangles>\n   </mesh>\n  </object>\n'
+
+    backId = len(parts) + 1
+    yield f'  <object id="{backId}" type="model" name="{name}">\n   <components>\n'
+    for objectId, part in enumerate(parts, 1):
+        for start in range(0, len(part.offsets), XML_CHUNK):
+            yield ''.join('    <component objectid="%d" transform="1 0 0 0 1 0 0 0 1 %.6g %.6g %.6g"/>\n'
+                          % ((objectId,) + tuple(offset * MM_PER_CM))
+                          for offset in part.offsets[start:start + XML_CHUNK])
+    yield '   </components>\n  </object>\n'
+
+    yield f' </resources>\n <build>\n  <item objectid="{backId}"/>\n </build>\n</model>\n'
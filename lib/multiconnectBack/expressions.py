@@ -0,0 +1,227 @@
+"""Fusion parameter expressions worked out in Python.
+
+The add-in drives its features with user parameters whose expressions refer
+to each other, such as ``max(height;2.5cm)`` or
+``floor(backWidth/distanceBetweenSlots)``. Fusion only works them out when it
+recomputes the design; this module does the same without Fusion, so slot and
+onramp counts are known, and impossible parameters are caught, before
+anything is built.
+
+The dialect is the part of Fusion's that the add-in writes: numbers with an
+optional unit, parameter names, ``+ - * / ^``, parentheses, the functions in
+FUNCTIONS with ``;`` between their arguments, and PI. Values are in Fusion's
+internal units, centimetres and radians. An expression is parsed once into
+a Python function and kept, so working one out again costs a function call.
+Nothing in this module needs Fusion or NumPy.
+"""
+
+import collections
+import functools
+import graphlib
+import math
+import re
+
+
+# Units and what one of each is in internal units.
+UNITS = {'mm': 0.1, 'cm': 1.0, 'm': 100.0, 'in': 2.54, 'ft': 30.48, 'deg': math.pi / 180, 'rad': 1.0}
+
+# Functions and how many arguments they take, None for one or more. Fusion
+# rounds halves up, where Python's round rounds them to even.
+FUNCTIONS = {'floor': (math.floor, 1), 'ceil': (math.ceil, 1), 'round': (lambda x: math.floor(x + 0.5), 1),
+             'abs': (abs, 1), 'sqrt': (math.sqrt, 1), 'sin': (math.sin, 1), 'cos': (math.cos, 1),
+             'tan': (math.tan, 1), 'max': (max, None), 'min': (min, None)}
+
+CONSTANTS = {'PI': math.pi}
+
+# Compiled expressions kept, by text and unit.
+EXPRESSION_CACHE_SIZE = 512
+
+_TOKEN = re.compile(r'\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|(?P<name>[A-Za-z_]\w*)'
+                    r'|(?P<symbol>[-+*/^();,]))')
+
+# text is the expression, names the parameters it refers to and function
+# works it out from a mapping of parameter values.
+Expression = collections.namedtuple('Expression', 'text names function')
+
+
+class ExpressionError(ValueError):
+    """An expression that can't be parsed or worked out, or parameters that can't be resolved."""
+
+
+@functools.lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(text, unit=''):
+    """The Expression of text; numbers without a unit are in unit, or internal units."""
+    parser = _Parser(text, UNITS.get(unit, 1.0))
+    source = parser.parse()
+    namespace = {'__builtins__': {}}
+    namespace.update((f'_{name}', function) for name, (function, _) in FUNCTIONS.items())
+    function = eval(compile(f'lambda _v: {source}', f'<expression {text!r}>', 'eval'), namespace)
+    return Expression(text, frozenset(parser.names), function)
+
+
+def expression_names(text):
+    """The parameters an expression refers to."""
+    return compile_expression(text).names
+
+
+def rename(text, names):
+    """text with the parameters it refers to renamed as names maps them; the rest is left as written."""
+    def rename_token(match):
+        name = match.group('name')
+        if name not in names:
+            return match.group(0)
+        return match.group(0)[:match.start('name') - match.start()] + names[name]
+    return _TOKEN.sub(rename_token, text)
+
+
+def evaluate(text, values=None, unit=''):
+    """The value of an expression, with the parameters it refers to taken from values."""
+    expression = compile_expression(text, unit)
+    values = values or {}
+    missing = expression.names.difference(values)
+    if missing:
+        raise ExpressionError(f'{text!r} refers to unknown parameters {", ".join(sorted(missing))}')
+    try:
+        return expression.function(values)
+    except (ArithmeticError, ValueError) as e:
+        raise ExpressionError(f'{text!r} can\'t be worked out: {e}') from None
+
+
+def resolve(parameters, units=None):
+    """The values of a set of parameters that refer to each other.
+
+    parameters maps names to values, in internal units, or to expressions;
+    units maps names to the unit of the bare numbers in their expression.
+    Expressions are worked out after the parameters they refer to. Raises
+    ExpressionError for an expression that refers to a parameter that isn't
+    in the set, for parameters that refer to each other in a circle, and for
+    an expression that can't be worked out, such as one dividing by zero.
+    """
+    units = units or {}
+    expressions = tuple(sorted((name, value, units.get(name, '')) for name, value in parameters.items()
+                               if isinstance(value, str)))
+    values = {name: value for name, value in parameters.items() if not isinstance(value, str)}
+    for name, text, unit in _resolution_order(expressions, frozenset(values)):
+        values[name] = evaluate(text, values, unit)
+    return values
+
+
+@functools.lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def _resolution_order(expressions, known):
+    # the (name, text, unit) expressions in an order where every one comes
+    # after those it refers to, worked out once per set of expressions
+    byName = {name: (name, text, unit) for name, text, unit in expressions}
+    graph = {}
+    for name, text, unit in expressions:
+        names = compile_expression(text, unit).names
+        unknown = names.difference(byName, known)
+        if unknown:
+            raise ExpressionError(f'{name} = {text!r} refers to unknown parameters {", ".join(sorted(unknown))}')
+        graph[name] = names.intersection(byName)
+    try:
+        return tuple(byName[name] for name in graphlib.TopologicalSorter(graph).static_order())
+    except graphlib.CycleError as e:
+        raise ExpressionError(f'parameters refer to each other in a circle: {" -> ".join(e.args[1])}') from None
+
+
+class _Parser:
+    """Recursive descent from an expression to the source of a Python expression."""
+
+    def __init__(self, text, numberScale):
+        self.text = text
+        self.numberScale = numberScale
+        self.names = set()
+        self.tokens = self._tokens()
+        self.position = 0
+
+    def parse(self):
+        source = self.sum()
+        if self.position < len(self.tokens):
+            self.fail(f'unexpected {self.tokens[self.position][1]!r}')
+        return source
+
+    def _tokens(self):
+        tokens = []
+        position = 0
+        text = self.text.rstrip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if match is None:
+                raise ExpressionError(f'{self.text!r}: unexpected {text[position:].split()[0]!r}')
+            tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            position = match.end()
+        return tokens
+
+    def fail(self, message):
+        raise ExpressionError(f'{self.text!r}: {message}')
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self, symbol=None):
+        token = self.peek()
+        if token[0] is None:
+            self.fail('ends too early')
+        if symbol is not None and token[1] != symbol:
+            self.fail(f'expected {symbol!r} instead of {token[1]!r}')
+        self.position += 1
+        return token
+
+    def sum(self):
+        source = self.product()
+        while self.peek()[1] in ('+', '-'):
+            source = f'({source} {self.take()[1]} {self.product()})'
+        return source
+
+    def product(self):
+        source = self.unary()
+        while self.peek()[1] in ('*', '/'):
+            source = f'({source} {self.take()[1]} {self.unary()})'
+        return source
+
+    def unary(self):
+        if self.peek()[1] in ('+', '-'):
+            return f'({self.take()[1]}{self.unary()})'
+        return self.power()
+
+    def power(self):
+        source = self.atom()
+        if self.peek()[1] == '^':
+            self.take()
+            source = f'({source} ** {self.unary()})'
+        return source
+
+    def atom(self):
+        kind, value = self.take()
+        if kind == 'number':
+            scale = self.numberScale
+            if self.peek()[0] == 'name' and self.peek()[1] in UNITS:
+                scale = UNITS[self.take()[1]]
+            return repr(float(value) * scale)
+        if kind == 'name':
+            if value in FUNCTIONS:
+                return self.call(value)
+            if value in CONSTANTS:
+                return repr(CONSTANTS[value])
+            if value in UNITS:
+                self.fail(f'unit {value!r} without a number')
+            self.names.add(value)
+            return f'_v[{value!r}]'
+        if value == '(':
+            source = self.sum()
+            self.take(')')
+            return source
+        self.fail(f'unexpected {value!r}')
+
+    def call(self, name):
+        self.take('(')
+        arguments = [self.sum()]
+        while self.peek()[1] in (';', ','):
+            if self.take()[1] == ',':
+                self.fail('arguments are separated by ;')
+            arguments.append(self.sum())
+        self.take(')')
+        arity = FUNCTIONS[name][1]
+        if arity is not None and len(arguments) != arity:
+            self.fail(f'{name} takes {arity} argument{"s" if arity > 1 else ""}, not {len(arguments)}')
+        return f'_{name}({", ".join(arguments)})'
@@ -0,0 +1,113 @@
+"""Indexed triangle meshes held in NumPy arrays.
+
+A mesh is a pair of arrays: ``vertices`` with shape (n, 3) and ``faces`` with
+shape (m, 3) holding counter-clockwise (outward facing) vertex indices.
+"""
+
+import collections
+
+import numpy as np
+
+
+Mesh = collections.namedtuple('Mesh', 'vertices faces')
+
+
+def empty_mesh():
+    return Mesh(np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64))
+
+
+def merge(meshes):
+    """Concatenate meshes into one, without joining coincident vertices."""
+    meshes = list(meshes)
+    if not meshes:
+        return empty_mesh()
+
+    counts = [len(mesh.vertices) for mesh in meshes]
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    vertices = np.concatenate([mesh.vertices for mesh in meshes])
+    faces = np.concatenate([mesh.faces + offset for mesh, offset in zip(meshes, offsets)])
+    return Mesh(vertices, faces)
+
+
+def translated(mesh, offset):
+    return Mesh(mesh.vertices + np.asarray(offset, dtype=float), mesh.faces)
+
+
+def tiled(mesh, offsets):
+    """One copy of the mesh per row of ``offsets``, in a single vectorized step."""
+    offsets = np.asarray(offsets, dtype=float).reshape(-1, 3)
+    vertices = (mesh.vertices[None, :, :] + offsets[:, None, :]).reshape(-1, 3)
+    faces = (mesh.faces[None, :, :]
+             + (np.arange(len(offsets)) * len(mesh.vertices))[:, None, None]).reshape(-1, 3)
+    return Mesh(vertices, faces)
+
+
+def weld(mesh, tolerance=1e-7):
+    """Join vertices closer than ``tolerance`` and drop the faces that collapse.
+
+    Faces that end up with a repeated vertex are removed, and so are pairs of
+    coincident faces with opposite orientation (the two walls of a slot that
+    has closed up to zero width).
+    """
+    keys = np.round(mesh.vertices / tolerance).astype(np.int64)
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    vertices = mesh.vertices[first]
+    faces = inverse[mesh.faces]
+
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])]
+    if len(faces) == 0:
+        return Mesh(vertices, faces)
+
+    # a face is "even" when sorting its indices is a rotation of it
+    ordered = np.sort(faces, axis=1)
+    start = np.argmin(faces, axis=1)
+    rotated = faces[np.arange(len(faces))[:, None], (start[:, None] + np.arange(3)[None, :]) % 3]
+    even = np.all(rotated == ordered, axis=1)
+
+    _, group, counts = np.unique(ordered, axis=0, return_inverse=True, return_counts=True)
+    group = group.reshape(-1)
+    evenCount = np.bincount(group, weights=even, minlength=len(counts))
+    cancelled = (counts == 2) & (evenCount == 1)
+    faces = faces[~cancelled[group]]
+
+    return Mesh(vertices, faces)
+
+
+def triangles(mesh):
+    """The mesh as an (m, 3, 3) array of triangle corners."""
+    return mesh.vertices[mesh.faces]
+
+
+def face_normals(mesh):
+    tri = triangles(mesh)
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    length = np.linalg.norm(normals, axis=1)
+    length[length == 0] = 1
+    return normals / length[:, None]
+
+
+def volume(mesh):
+    """Enclosed volume of a closed mesh (divergence theorem)."""
+    tri = triangles(mesh)
+    return float(np.einsum('ij,ij->i', tri[:, 0], np.cross(tri[:, 1], tri[:, 2])).sum() / 6)
+
+
+def surface_area(mesh):
+    tri = triangles(mesh)
+    return float(np.linalg.norm(np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0]), axis=1).sum() / 2)
+
+
+def bounds(mesh):
+    """(min corner, max corner) of the mesh."""
+    return mesh.vertices.min(axis=0), mesh.vertices.max(axis=0)
+
+
+def is_closed(mesh):
+    """True when every edge is shared by exactly one face in each direction."""
+    edges = np.concatenate([mesh.faces[:, [0, 1]], mesh.faces[:, [1, 2]], mesh.faces[:, [2, 0]]])
+    forward = np.unique(edges, axis=0, return_counts=True)
+    if np.any(forward[1] != 1):
+        return False
+    backward = np.unique(edges[:, ::-1], axis=0)
+    return len(forward[0]) == len(backward) and np.array_equal(forward[0], backward)
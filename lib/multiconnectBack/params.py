@@ -0,0 +1,140 @@
+"""Shape parameters of a Multiconnect back and the layout derived from them.
+
+All lengths are in centimetres, Fusion's internal length unit, so values can be
+passed straight through from ``ValueCommandInput.value`` and user parameters.
+Nothing in this module needs Fusion or NumPy.
+"""
+
+import collections
+
+from .expressions import resolve
+
+# Defaults, kept in step with the user parameters the add-in creates.
+DOT_RADIUS = 1.015
+ON_RAMP_EVERY_X_SLOTS = 1
+DISTANCE_BETWEEN_SLOTS = 2.5
+BASE_THICKNESS = 0.3
+BACK_THICKNESS = 0.65
+MIN_BACK_HEIGHT = 2.5
+
+# Placement of the slot tool on the back, as done by plan.back_plan.
+# The tool floor sits SLOT_DEPTH below the back face ("backThickness - 0.5cm")
+# and the straight part of the slot stops SLOT_TOP_MARGIN below the top edge
+# ("backHeight - 1.3cm").
+SLOT_DEPTH = 0.5
+SLOT_TOP_MARGIN = 1.3
+
+# Onramp cylinders, see plan.back_plan. The first one is centred ONRAMP_OFFSET
+# below the end of the straight part of the slot.
+ONRAMP_OFFSET = 2.0
+ONRAMP_LENGTH = 0.5
+
+# Size of the cone revolved for the dimple.
+DIMPLE_SIZE = 0.15
+
+# The user parameter holding the dot radius, created by the add-in.
+DOT_RADIUS_PARAM = 'DotRadius'
+
+# What the sizes of the back are worked out from, as the expressions the
+# add-in hands to Fusion: the user parameters it creates for a back, and the
+# count of the onramp pattern.
+BACK_EXPRESSIONS = {
+    'backHeight': f'max(height;{MIN_BACK_HEIGHT}cm)',
+    'backWidth': 'max(width;distanceBetweenSlots)',
+    'slotCount': 'floor(backWidth/distanceBetweenSlots)',
+}
+ONRAMP_COUNT_EXPRESSION = 'floor(backHeight/(distanceBetweenSlots * onRampEveryXSlots))'
+
+
+# slotOffset moves the slots along x, off the centre of the back; the end
+# tiles of a back split for the printer bed have their slots off centre, see
+# tiles.py.
+BackParams = collections.namedtuple(
+    'BackParams',
+    'width height dotRadius distanceBetweenSlots onRampEveryXSlots baseThickness backThickness toolsOnly slotOffset',
+    defaults=(DOT_RADIUS, DISTANCE_BETWEEN_SLOTS, ON_RAMP_EVERY_X_SLOTS, BASE_THICKNESS, BACK_THICKNESS, False, 0.0))
+
+BackLayout = collections.namedtuple(
+    'BackLayout',
+    'params backWidth backHeight slotCount onrampCount slotXs onrampZs slotFloor slotTop slotBottom')
+
+
+def slot_profile(dotRadius=DOT_RADIUS):
+    """Half cross-section of the slot tool, as sketched by plan.back_plan.
+
+    The profile is revolved by a quarter turn for the rounded end and mirrored
+    about x = 0. The part above SLOT_DEPTH sits outside the back and only exists
+    so the patterned slots overlap and can be joined into a single body.
+    """
+    return [(0, 0),
+            (dotRadius, 0),
+            (dotRadius, 0.12121),
+            (0.765, 0.3712),
+            (0.765, 0.5),
+            (1.3, 0.5),
+            (1.3, 1.0),
+            (0, 1.0),
+            (0, 0.5)]
+
+
+def back_values(params):
+    """The user parameters of a back and what BACK_EXPRESSIONS work out to for them, by name.
+
+    Raises expressions.ExpressionError (a ValueError) for parameters Fusion
+    couldn't work out either, such as no distance between slots.
+    """
+    values = resolve({**BACK_EXPRESSIONS,
+                      'onrampCount': ONRAMP_COUNT_EXPRESSION,
+                      'width': params.width,
+                      'height': params.height,
+                      'distanceBetweenSlots': params.distanceBetweenSlots,
+                      'onRampEveryXSlots': params.onRampEveryXSlots,
+                      'backThickness': params.backThickness,
+                      DOT_RADIUS_PARAM: params.dotRadius})
+    if values['slotCount'] < 1 or values['onrampCount'] < 0:
+        raise ValueError(f"a back can't have {values['slotCount']} slots and {values['onrampCount']} onramps")
+    return values
+
+
+def back_width(params):
+    return back_values(params)['backWidth']
+
+
+def back_height(params):
+    return back_values(params)['backHeight']
+
+
+def slot_count(params):
+    return back_values(params)['slotCount']
+
+
+def onramp_count(params):
+    return back_values(params)['onrampCount']
+
+
+def layout(params):
+    """Work out where everything goes, from the expressions command_execute hands to Fusion."""
+    values = back_values(params)
+    backWidth = values['backWidth']
+    backHeight = values['backHeight']
+    slotCount = values['slotCount']
+    onrampCount = values['onrampCount']
+    spacing = params.distanceBetweenSlots
+
+    # the slots are moved to the left edge and patterned along x
+    slotXs = tuple(params.slotOffset + spacing * (1 - slotCount) / 2 + spacing * i for i in range(slotCount))
+
+    slotTop = backHeight - SLOT_TOP_MARGIN
+    onrampSpacing = spacing * params.onRampEveryXSlots
+    onrampZs = tuple(slotTop - ONRAMP_OFFSET - onrampSpacing * i for i in range(onrampCount))
+
+    return BackLayout(params=params,
+                      backWidth=backWidth,
+                      backHeight=backHeight,
+                      slotCount=slotCount,
+                      onrampCount=onrampCount,
+                      slotXs=slotXs,
+                      onrampZs=onrampZs,
+                      slotFloor=params.backThickness - SLOT_DEPTH,
+                      slotTop=slotTop,
+                      slotBottom=slotTop - backHeight)
@@ -0,0 +1,431 @@
+"""The operations that build a back, worked out before anything is built.
+
+A plan is a list of sketches, features, patterns and booleans, each a
+namedtuple with an ``id`` that later operations refer to, and with its sizes
+given as ``Expr``: the expression handed to Fusion together with its value
+for the layout. ``optimize`` rewrites a plan into a cheaper one, and the
+add-in emits the result either as timeline features or as temporary B-rep
+bodies. Nothing in this module needs Fusion or NumPy.
+"""
+
+import collections
+import math
+
+from .expressions import expression_names, rename
+from .params import (DIMPLE_SIZE, DOT_RADIUS_PARAM, ONRAMP_COUNT_EXPRESSION, ONRAMP_LENGTH, ONRAMP_OFFSET,
+                     SLOT_DEPTH, SLOT_TOP_MARGIN, slot_profile)
+
+
+# text is None for a constant, which is emitted as its value.
+Expr = collections.namedtuple('Expr', 'text value')
+
+# The sizes of a pattern along one of the axes 'x', 'y' or 'z'.
+Direction = collections.namedtuple('Direction', 'axis count spacing')
+
+# Polygons and circle centres are in sketch coordinates of the origin plane
+# 'xy', 'xz' or 'yz'; circles are (centre, radius Expr) pairs.
+Sketch = collections.namedtuple('Sketch', 'id name plane polygons circles')
+
+# operation is 'new', 'join' or 'cut'; body is the body made, or the one
+# joined to or cut. A mirrored feature also builds its mirror image in the yz
+# plane, see fold_mirrors.
+Revolve = collections.namedtuple('Revolve', 'id sketch axis angle operation body mirrored', defaults=(False,))
+Extrude = collections.namedtuple('Extrude', 'id sketch distance operation body direction mirrored',
+                                 defaults=(1, False))
+
+# Mirrors body in plane and joins the mirror image to it.
+Mirror = collections.namedtuple('Mirror', 'id body plane')
+
+# A pattern of features or of bodies. A pattern of bodies is a group of
+# bodies, the originals included, that later operations refer to by its id.
+Pattern = collections.namedtuple('Pattern', 'id entities directions')
+
+Move = collections.namedtuple('Move', 'id body x y z')
+
+# The back: width centred on x = 0, depth along y and height along z.
+Box = collections.namedtuple('Box', 'id width depth height')
+
+# Joins the tools to the target, or cuts them from it. Joined bodies are
+# referred to by the id of the body they were joined to afterwards.
+Combine = collections.namedtuple('Combine', 'id target tools operation')
+
+# tool builds the body 'slot' at the origin, placement moves it to the first
+# slot and back makes the rest; result is the id of the finished body.
+BackPlan = collections.namedtuple('BackPlan', 'tool placement back result')
+
+
+def param(text, value):
+    return Expr(text, value)
+
+
+def const(value):
+    return Expr(None, value)
+
+
+def references(expr):
+    """The user parameters an expression refers to."""
+    if expr.text is None:
+        return set()
+    return set(expression_names(expr.text))
+
+
+def back_plan(lay):
+    """The operations the Pattern mode used to run one after the other."""
+    params = lay.params
+    spacing = params.distanceBetweenSlots
+    onrampSpacing = spacing * params.onRampEveryXSlots
+
+    # the profile has a forced overlap so all the slots can be joined into one
+    tool = [
+        Sketch('slotSketch', 'Slot Profile', 'xy', (tuple(slot_profile(params.dotRadius)),), ()),
+        Revolve('slotEnd', 'slotSketch', 'y', const(math.pi / 2), 'new', 'slot'),
+        Extrude('slotLength', 'slotSketch', param('backHeight', lay.backHeight), 'join', 'slot', direction=-1),
+        Mirror('slotMirror', 'slot', 'yz'),
+        Sketch('rampSketch', 'Ramp Sketch', 'xz', (),
+               (((0, ONRAMP_OFFSET), param(DOT_RADIUS_PARAM, params.dotRadius)),)),
+        Extrude('ramp', 'rampSketch', const(ONRAMP_LENGTH), 'join', 'slot'),
+        Pattern('ramps', ('ramp',), (Direction('z', param(ONRAMP_COUNT_EXPRESSION, lay.onrampCount),
+                                               param('(-distanceBetweenSlots) * onRampEveryXSlots',
+                                                     -onrampSpacing)),)),
+        Sketch('dimpleSketch', 'Dimple sketch', 'yz', (((0, 0), (0, DIMPLE_SIZE), (DIMPLE_SIZE, 0)),), ()),
+        Revolve('dimple', 'dimpleSketch', 'y', const(2 * math.pi), 'cut', 'slot'),
+    ]
+
+    # offset to the edge location, because symmetrical patterns aren't working correctly in the API
+    firstSlot = 'distanceBetweenSlots * ( 1 - slotCount)/2'
+    if params.slotOffset:
+        firstSlot += f' + {params.slotOffset!r}cm'
+    placement = [
+        Move('firstSlot', 'slot',
+             param(firstSlot, lay.slotXs[0]),
+             param(f'backThickness - {SLOT_DEPTH}cm', lay.slotFloor),
+             param(f'backHeight - {SLOT_TOP_MARGIN}cm', lay.slotTop)),
+    ]
+
+    back = [
+        Pattern('slots', ('slot',), (Direction('x', param('slotCount', lay.slotCount),
+                                               param('distanceBetweenSlots', spacing)),
+                                     Direction('y', const(1), const(0)))),
+        Combine('joinSlots', 'slots', ('slots',), 'join'),
+    ]
+    if params.toolsOnly:
+        return BackPlan(tool, placement, back, 'slots')
+
+    back += [
+        back_box(lay),
+        Combine('cutSlots', 'back', ('slots',), 'cut'),
+    ]
+    return BackPlan(tool, placement, back, 'back')
+
+
+def back_box(lay):
+    """The Box of the uncut back, with its sizes following the user parameters."""
+    return Box('back', param('backWidth', lay.backWidth), param('backThickness', lay.params.backThickness),
+               param('backHeight', lay.backHeight))
+
+
+def rename_parameters(ops, names):
+    """The operations with their expressions referring to the user parameters as names maps them.
+
+    Plans are written with the names of the parameters of a back, such as
+    backWidth; a back that has parameters of its own, such as backWidth_2,
+    gets its operations renamed.
+    """
+    def rename_expr(expr):
+        return expr if expr.text is None else param(rename(expr.text, names), expr.value)
+    return [_map_exprs(op, rename_expr) for op in ops]
+
+
+def describe(op):
+    """A few words on what an operation does, for progress messages."""
+    if isinstance(op, Combine):
+        return f"{'Joining' if op.operation == 'join' else 'Cutting'} {', '.join(op.tools)}"
+    if isinstance(op, Sketch):
+        return f'Sketching {op.name}'
+    if isinstance(op, Box):
+        return f'Making the {op.id}'
+    if isinstance(op, Pattern):
+        return f'Patterning {op.id}'
+    verb = {Revolve: 'Revolving', Extrude: 'Extruding', Mirror: 'Mirroring', Move: 'Moving'}[type(op)]
+    return f'{verb} the {op.body}'
+
+
+def optimize(plan, direct=False, fixed=()):
+    """A cheaper plan that builds the same back.
+
+    Constant expressions are folded, features that would repeat or extend
+    nothing are left out, moves that go nowhere are dropped and patterns that
+    can be one pattern are merged. For direct modeling (``direct=True``),
+    where nothing stays parametric, every expression is folded and mirrored
+    half profiles are built whole, see fold_mirrors. Expressions that refer
+    to one of the user parameters in ``fixed`` are folded as well.
+    """
+    sections = {op.id: name for name in ('tool', 'placement', 'back') for op in getattr(plan, name)}
+    ops = plan.tool + plan.placement + plan.back
+
+    ops = fold_constants(ops, direct, fixed)
+    ops = skip_empty(ops)
+    ops, renamed = drop_noop_moves(ops)
+    ops = merge_patterns(ops)
+    if direct:
+        ops = complete_revolves(fold_mirrors(ops))
+
+    return BackPlan(*([op for op in ops if sections[op.id] == name] for name in ('tool', 'placement', 'back')),
+                    result=renamed.get(plan.result, plan.result))
+
+
+def fold_constants(ops, direct=False, fixed=()):
+    """Expressions without user parameters, or all of them when direct, become their values.
+
+    So do expressions that refer to a fixed parameter, for backs that share
+    the design's user parameters but not their sizes.
+    """
+    fixed = set(fixed)
+
+    def fold(expr):
+        names = references(expr)
+        return const(expr.value) if direct or not names or names & fixed else expr
+    return [_map_exprs(op, fold) for op in ops]
+
+
+def skip_empty(ops):
+    """Leave out patterns of nothing, features of no size, and what only they used.
+
+    Fusion can't build a pattern of zero instances, so an onramp pattern whose
+    count is zero takes the onramp with it. Only constants count, as in
+    drop_noop_moves: a parametric count that is zero now may not be after the
+    next change of a user parameter, so its pattern and what it patterns are
+    kept.
+    """
+    dropped = set()
+    for op in ops:
+        if isinstance(op, Pattern) and any(direction.count.text is None and direction.count.value < 1
+                                           for direction in op.directions):
+            dropped.update((op.id,) + op.entities)
+        elif ((isinstance(op, Revolve) and _is_constant(op.angle, 0))
+              or (isinstance(op, Extrude) and _is_constant(op.distance, 0))):
+            dropped.add(op.id)
+
+    kept = []
+    for op in ops:
+        if op.id in dropped or dropped.intersection(_inputs(op)):
+            dropped.add(op.id)
+        else:
+            kept.append(op)
+
+    used = {name for op in kept for name in _inputs(op)}
+    return [op for op in kept if not isinstance(op, Sketch) or op.id in used]
+
+
+def drop_noop_moves(ops):
+    """Drop moves by a constant zero and pattern directions of one, merging consecutive moves.
+
+    Only constants count: a parametric offset that is zero now may not be
+    after the next change of a user parameter. Returns the new operations
+    and the ids of dropped patterns mapped to the body they stood for.
+    """
+    renamed = {}
+    result = []
+    for op in ops:
+        op = _rename(op, renamed)
+        if isinstance(op, Move):
+            if all(_is_constant(e, 0) for e in (op.x, op.y, op.z)):
+                continue
+            if result and isinstance(result[-1], Move) and result[-1].body == op.body:
+                last = result[-1]
+                result[-1] = last._replace(x=_sum(last.x, op.x), y=_sum(last.y, op.y), z=_sum(last.z, op.z))
+                continue
+        elif isinstance(op, Pattern):
+            directions = tuple(d for d in op.directions if not _is_constant(d.count, 1))
+            if not directions:
+                if len(op.entities) == 1:
+                    renamed[op.id] = op.entities[0]
+                continue
+            op = op._replace(directions=directions)
+        elif isinstance(op, Combine) and op.operation == 'join':
+            # joining a group joins its bodies to the first one, a single body is already joined
+            groups = {other.id for other in result if isinstance(other, Pattern)}
+            tools = tuple(tool for tool in op.tools if tool != op.target or tool in groups)
+            if not tools:
+                continue
+            op = op._replace(tools=tools)
+        result.append(op)
+    return result, renamed
+
+
+def merge_patterns(ops):
+    """Merge patterns that can be made as one.
+
+    A pattern of the bodies of a pattern along another axis becomes one
+    pattern in two directions, and patterns of features with the same
+    directions become one pattern of all their features.
+    """
+    bodies = _bodies(ops)
+    ops = list(ops)
+    i = 0
+    while i < len(ops):
+        op = ops[i]
+        if isinstance(op, Pattern):
+            j = _mergeable_pattern(ops, i, bodies)
+            if j is not None:
+                earlier = ops[j]
+                if op.entities == (earlier.id,):
+                    merged = op._replace(entities=earlier.entities, directions=earlier.directions + op.directions)
+                else:
+                    merged = earlier._replace(entities=earlier.entities + op.entities)
+                    ops = [_rename(other, {op.id: earlier.id}) for other in ops]
+                ops[i] = merged
+                del ops[j]
+                continue
+        i += 1
+    return ops
+
+
+def fold_mirrors(ops):
+    """Build half profiles together with their mirror image instead of mirroring the body.
+
+    A mirror in the yz plane is folded into the revolves about y and the
+    extrudes that made its body, as long as nothing else went into the body
+    before it. Temporary bodies can't be mirrored, but a profile and its mirror
+    image can be built as one.
+    """
+    result = list(ops)
+    for i, op in enumerate(ops):
+        if not isinstance(op, Mirror) or op.plane != 'yz':
+            continue
+        makers = [j for j, other in enumerate(result[:i]) if other is not None and other is not op
+                  and op.body in (getattr(other, 'body', None), getattr(other, 'target', None))]
+        patterned = {entity for other in result[:i] if isinstance(other, Pattern) for entity in other.entities}
+        if all(isinstance(result[j], (Revolve, Extrude)) and result[j].id not in patterned
+               and (not isinstance(result[j], Revolve) or result[j].axis == 'y') for j in makers):
+            for j in makers:
+                result[j] = result[j]._replace(mirrored=True)
+            result[i] = None
+    return [op for op in result if op is not None]
+
+
+def complete_revolves(ops):
+    """Turn mirrored partial revolves into full turns where an extrude already fills the rest.
+
+    A profile on the xy plane turned a quarter about y and mirrored is a half
+    turn. The other half lies inside the same profile extruded along z, as
+    long as the extrude is longer than the profile is wide, so the revolve
+    can just as well go all the way round.
+    """
+    result = []
+    for op in ops:
+        if isinstance(op, Revolve) and op.mirrored and op.angle.value >= math.pi / 2:
+            sketch = next(other for other in ops if other.id == op.sketch)
+            width = max(abs(x) for polygon in sketch.polygons for x, _ in polygon)
+            if sketch.plane == 'xy' and any(isinstance(other, Extrude) and other.sketch == op.sketch
+                                            and other.body == op.body and other.mirrored
+                                            and other.distance.value >= width for other in ops):
+                op = op._replace(angle=const(2 * math.pi))
+        result.append(op)
+    return result
+
+
+def profile_bands(polygon):
+    """The edges of a profile that lies against the y axis, as (y0, x0, y1, x1) with y0 < y1.
+
+    Turned about y, each band is a cylinder or cone; extruded, it is a
+    trapezoid. Horizontal edges and edges on the axis are left out.
+    """
+    if min(x for x, _ in polygon) < 0:
+        raise ValueError('profile crosses the axis')
+    bands = []
+    for (x0, y0), (x1, y1) in zip(polygon, polygon[1:] + polygon[:1]):
+        if y0 == y1 or (x0 == 0 and x1 == 0):
+            continue
+        bands.append((y0, x0, y1, x1) if y0 < y1 else (y1, x1, y0, x0))
+    return bands
+
+
+def sketch_to_model(plane, u, v, w=0):
+    """Model coordinates of the point (u, v) of a sketch on an origin plane, w along its normal."""
+    if plane == 'xy':
+        return (u, v, w)
+    if plane == 'xz':
+        return (u, w, -v)
+    return (w, v, -u)
+
+
+def _map_exprs(value, fn):
+    if isinstance(value, Expr):
+        return fn(value)
+    if isinstance(value, tuple):
+        items = [_map_exprs(item, fn) for item in value]
+        return type(value)(*items) if hasattr(value, '_fields') else tuple(items)
+    return value
+
+
+def _inputs(op):
+    # the ids an operation refers to
+    if isinstance(op, (Revolve, Extrude)):
+        return (op.sketch,) if op.operation == 'new' else (op.sketch, op.body)
+    if isinstance(op, (Mirror, Move)):
+        return (op.body,)
+    if isinstance(op, Pattern):
+        return op.entities
+    if isinstance(op, Combine):
+        return (op.target,) + op.tools
+    return ()
+
+
+def _rename(op, renamed):
+    if not renamed:
+        return op
+    fields = {}
+    for field in ('sketch', 'body', 'target'):
+        if field in op._fields:
+            fields[field] = renamed.get(getattr(op, field), getattr(op, field))
+    for field in ('entities', 'tools'):
+        if field in op._fields:
+            fields[field] = tuple(renamed.get(name, name) for name in getattr(op, field))
+    return op._replace(**fields)
+
+
+def _bodies(ops):
+    # ids that stand for bodies or groups of bodies
+    bodies = set()
+    for op in ops:
+        if isinstance(op, (Revolve, Extrude)) and op.operation == 'new':
+            bodies.add(op.body)
+        elif isinstance(op, Box) or (isinstance(op, Pattern) and bodies.intersection(op.entities)):
+            bodies.add(op.id)
+    return bodies
+
+
+def _mergeable_pattern(ops, i, bodies):
+    # index of an earlier pattern that ops[i] can be merged into, if any
+    op = ops[i]
+    for j in range(i - 1, -1, -1):
+        earlier = ops[j]
+        if not isinstance(earlier, Pattern):
+            continue
+        between = {name for other in ops[j + 1:i] for name in _inputs(other)}
+        if earlier.id in between:
+            return None
+        used_later = any(earlier.id in _inputs(other) for other in ops[i + 1:])
+        if (op.entities == (earlier.id,) and earlier.id in bodies and not used_later
+                and len(earlier.directions) + len(op.directions) <= 2
+                and not {d.axis for d in earlier.directions} & {d.axis for d in op.directions}):
+            return j
+        if (earlier.directions == op.directions
+                and not bodies.intersection(earlier.entities + op.entities)):
+            return j
+    return None
+
+
+def _is_constant(expr, value):
+    return expr.text is None and math.isclose(expr.value, value, abs_tol=1e-12)
+
+
+def _sum(a, b):
+    if a.text is None and b.text is None:
+        return const(a.value + b.value)
+    return param(f'({_text(a)}) + ({_text(b)})', a.value + b.value)
+
+
+def _text(expr):
+    return expr.text if expr.text is not None else f'{expr.value} cm'
@@ -0,0 +1,253 @@
+"""Booleans of polygons, by sweeping them in horizontal bands.
+
+The plane is cut into bands at every vertex and at every crossing of two
+edges. Within a band no edges cross, so the edges that span it can be sorted
+left to right and the result is a row of trapezoids between them: a point is
+inside a set of polygons when the edges to its left wind round it (nonzero
+winding), and inside the result when the operation says so for the two sets.
+Nothing is sampled, so the trapezoids are exact up to floating point, and
+their number grows with the number of edges, not with any resolution.
+Polygons are lists of (x, y) points; holes run clockwise.
+Nothing in this module needs Fusion or NumPy.
+"""
+
+import bisect
+import collections
+import math
+
+
+# Relative size of the rounding errors ignored: edges that cross by less do
+# not cross, and points that are this far off a straight edge are on it.
+TOLERANCE = 1e-12
+
+OPERATIONS = {
+    'union': lambda a, b: a or b,
+    'intersection': lambda a, b: a and b,
+    'difference': lambda a, b: a and not b,
+    'xor': lambda a, b: a != b,
+}
+
+# The part of a band between two edges, at y from bottom to top; the left
+# and right edges run from (bottomLeft, bottom) to (topLeft, top) and from
+# (bottomRight, bottom) to (topRight, top).
+Trapezoid = collections.namedtuple('Trapezoid', 'bottom top bottomLeft bottomRight topLeft topRight')
+
+# An edge going up from (x0, y0) to (x1, y1), winding +1 when the polygon
+# went up along it and -1 when it came down; clip marks the second set.
+_Edge = collections.namedtuple('_Edge', 'x0 y0 x1 y1 winding clip')
+
+
+def trapezoids(subject, clip=(), operation='union'):
+    """The result of subject operation clip, as trapezoids, bottom band first.
+
+    subject and clip are lists of polygons; operation is one of OPERATIONS.
+    The trapezoids of a band are in order left to right and don't touch.
+    """
+    inside = OPERATIONS[operation]
+    edges = _edges(subject, False) + _edges(clip, True)
+    ys = sorted({y for edge in edges for y in (edge.y0, edge.y1)})
+
+    result = []
+    for bottom, top in zip(ys, ys[1:]):
+        spanning = [edge for edge in edges if edge.y0 <= bottom and edge.y1 >= top]
+        for low, high, ordered in _bands(spanning, bottom, top):
+            windings = [0, 0]
+            start = None
+            for edge in ordered:
+                windings[edge.clip] += edge.winding
+                now = inside(windings[0] != 0, windings[1] != 0)
+                if now and start is None:
+                    start = edge
+                elif not now and start is not None:
+                    result.append(Trapezoid(low, high, _x(start, low), _x(edge, low),
+                                            _x(start, high), _x(edge, high)))
+                    start = None
+    return _snapped(result)
+
+
+def boolean(subject, clip=(), operation='union', simplify=True):
+    """The outlines of subject operation clip: outer boundaries counter-clockwise, holes clockwise.
+
+    With simplify, points in the middle of a straight edge are left out.
+    """
+    return outlines(trapezoids(subject, clip, operation), simplify)
+
+
+def union(polygons):
+    return boolean(polygons)
+
+
+def difference(subject, clip):
+    return boolean(subject, clip, 'difference')
+
+
+def intersection(subject, clip):
+    return boolean(subject, clip, 'intersection')
+
+
+def area(traps):
+    """The area covered by trapezoids."""
+    return sum((trap.top - trap.bottom) * (trap.bottomRight - trap.bottomLeft + trap.topRight - trap.topLeft) / 2
+               for trap in traps)
+
+
+def polygon_area(polygon):
+    """Signed area of a polygon, positive when it runs counter-clockwise."""
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(polygon, polygon[1:] + polygon[:1])) / 2
+
+
+def boundary(traps):
+    """The edges round the trapezoids as (start, end) points, with the inside on their left.
+
+    Every point where a trapezoid's corner meets the edge of another is kept,
+    so the trapezoids can be meshed without T-junctions along the outlines.
+    """
+    segments = []
+    bands = collections.defaultdict(list)
+    for trap in traps:
+        bands[trap.bottom].append(trap)
+        segments.append(((trap.bottomRight, trap.bottom), (trap.topRight, trap.top)))
+        segments.append(((trap.topLeft, trap.top), (trap.bottomLeft, trap.bottom)))
+
+    # along each boundary between bands, the parts covered on one side only
+    tops = collections.defaultdict(list)
+    for trap in traps:
+        tops[trap.top].append((trap.topLeft, trap.topRight))
+    for y in sorted(set(tops) | set(bands)):
+        below = sorted(tops.get(y, []))
+        above = sorted((trap.bottomLeft, trap.bottomRight) for trap in bands.get(y, []))
+        cuts = sorted({x for interval in below + above for x in interval})
+        for x0, x1 in zip(cuts, cuts[1:]):
+            middle = (x0 + x1) / 2
+            under = _covered(below, middle)
+            over = _covered(above, middle)
+            if over and not under:
+                segments.append(((x0, y), (x1, y)))
+            elif under and not over:
+                segments.append(((x1, y), (x0, y)))
+    return [(start, end) for start, end in segments if start != end]
+
+
+def outlines(traps, simplify=True):
+    """The loops round the trapezoids, see boolean."""
+    following = collections.defaultdict(list)
+    for start, end in boundary(traps):
+        following[start].append(end)
+
+    loops = []
+    for first in list(following):
+        while following[first]:
+            loop = [first]
+            point = following[first].pop()
+            while point != first and following[point]:
+                loop.append(point)
+                point = following[point].pop()
+            loops.append(_simplified(loop) if simplify else loop)
+    return [loop for loop in loops if len(loop) >= 3]
+
+
+def cross_points(traps):
+    """For every trapezoid, the corners of others on its bottom and top edge, left to right.
+
+    Meshing a trapezoid with these as well as its own corners makes neighbours share their vertices.
+    """
+    byY = collections.defaultdict(set)
+    for trap in traps:
+        byY[trap.bottom].update((trap.bottomLeft, trap.bottomRight))
+        byY[trap.top].update((trap.topLeft, trap.topRight))
+    return [([x for x in sorted(byY[trap.bottom]) if trap.bottomLeft < x < trap.bottomRight],
+             [x for x in sorted(byY[trap.top]) if trap.topLeft < x < trap.topRight])
+            for trap in traps]
+
+
+def _covered(intervals, x):
+    # intervals are sorted and, being those of one band, don't overlap
+    i = bisect.bisect(intervals, (x, math.inf)) - 1
+    return i >= 0 and intervals[i][1] >= x
+
+
+def _edges(polygons, clip):
+    edges = []
+    for polygon in polygons:
+        for (x0, y0), (x1, y1) in zip(polygon, polygon[1:] + polygon[:1]):
+            if y0 < y1:
+                edges.append(_Edge(x0, y0, x1, y1, 1, clip))
+            elif y0 > y1:
+                edges.append(_Edge(x1, y1, x0, y0, -1, clip))
+    return edges
+
+
+def _x(edge, y):
+    if y == edge.y0:
+        return edge.x0
+    if y == edge.y1:
+        return edge.x1
+    return edge.x0 + (edge.x1 - edge.x0) * (y - edge.y0) / (edge.y1 - edge.y0)
+
+
+def _bands(edges, bottom, top):
+    """The band from bottom to top split where edges cross, as (bottom, top, edges left to right)."""
+    middle = (bottom + top) / 2
+    ordered = sorted(edges, key=lambda edge: (_x(edge, middle), _x(edge, top)))
+    crossings = set()
+    for a, b in zip(ordered, ordered[1:]):
+        for y in (bottom, top):
+            if _x(a, y) - _x(b, y) > TOLERANCE * (1 + abs(_x(a, y))):
+                # a line from b to a at y, so they cross between y and the middle
+                da = _x(a, top) - _x(a, bottom)
+                db = _x(b, top) - _x(b, bottom)
+                t = (_x(b, bottom) - _x(a, bottom)) / (da - db)
+                crossing = bottom + t * (top - bottom)
+                if bottom + TOLERANCE * (1 + abs(bottom)) < crossing < top - TOLERANCE * (1 + abs(top)):
+                    crossings.add(crossing)
+    if not crossings:
+        return [(bottom, top, ordered)]
+    ys = [bottom]
+    for y in sorted(crossings):
+        # several pairs crossing at one point give the same crossing, rounded differently
+        if y - ys[-1] > TOLERANCE * (1 + abs(y)):
+            ys.append(y)
+    ys.append(top)
+    return [band for low, high in zip(ys, ys[1:]) for band in _bands(edges, low, high)]
+
+
+def _snapped(traps):
+    """The trapezoids with corners that are a rounding error apart along a band boundary made the same.
+
+    Where edges cross on a boundary, the x of the crossing worked out from
+    the edges below and from the edges above can differ in the last bit.
+    """
+    byY = collections.defaultdict(set)
+    for trap in traps:
+        byY[trap.bottom].update((trap.bottomLeft, trap.bottomRight))
+        byY[trap.top].update((trap.topLeft, trap.topRight))
+    snap = {}
+    for y, xs in byY.items():
+        last = None
+        for x in sorted(xs):
+            if last is None or x - last > TOLERANCE * (1 + abs(x)):
+                last = x
+            snap[y, x] = last
+    return [Trapezoid(trap.bottom, trap.top, snap[trap.bottom, trap.bottomLeft], snap[trap.bottom, trap.bottomRight],
+                      snap[trap.top, trap.topLeft], snap[trap.top, trap.topRight])
+            for trap in traps]
+
+
+def _simplified(loop):
+    # leave out the points where the loop goes straight on, or nowhere
+    points = []
+    for point in loop:
+        while len(points) >= 2 and _straight(points[-2], points[-1], point):
+            points.pop()
+        points.append(point)
+    while len(points) >= 3 and _straight(points[-2], points[-1], points[0]):
+        points.pop()
+    while len(points) >= 3 and _straight(points[-1], points[0], points[1]):
+        points.pop(0)
+    return points
+
+
+def _straight(before, point, after):
+    turn = (point[0] - before[0]) * (after[1] - point[1]) - (point[1] - before[1]) * (after[0] - point[0])
+    scale = sum(abs(p - q) for p, q in zip(point + after, before + point))
+    return abs(turn) <= TOLERANCE * scale * scale
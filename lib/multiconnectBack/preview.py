@@ -0,0 +1,98 @@
+"""Cheap meshes of a back for the live preview in the dialog.
+
+These are plain lists, ready for Fusion's custom graphics, and are built
+without NumPy. They are an impression of the back, not the back: the slots
+are shown as prisms next to the back instead of being cut out of it, and
+above ``maxDetailedSlots`` slots they are simple boxes without onramps.
+"""
+
+import collections
+import math
+
+from .params import ONRAMP_LENGTH, SLOT_DEPTH, slot_profile
+
+
+# More slots than this are previewed as boxes.
+PREVIEW_DETAIL_SLOTS = 40
+
+# Sides of the polygons standing in for the onramp cylinders.
+ONRAMP_SIDES = 8
+
+
+# Flat coordinate list (x, y, z, x, y, z, ...) and flat triangle index list.
+PreviewMesh = collections.namedtuple('PreviewMesh', 'coordinates triangles')
+
+BackPreview = collections.namedtuple('BackPreview', 'back slots')
+
+
+def back_preview(lay, maxDetailedSlots=PREVIEW_DETAIL_SLOTS):
+    """The back box (None for tools only) and the slot tools of a layout."""
+    back = None
+    if not lay.params.toolsOnly:
+        half = lay.backWidth / 2
+        back = _mesh([_prism([(-half, 0), (half, 0), (half, lay.params.backThickness),
+                              (-half, lay.params.backThickness)], 0, lay.backHeight, 'z')])
+
+    detailed = lay.slotCount <= maxDetailedSlots
+    section = _slot_section(lay) if detailed else _slot_box(lay)
+    ramp = _circle(lay.params.dotRadius, ONRAMP_SIDES)
+
+    prisms = []
+    for x in lay.slotXs:
+        prisms.append(_prism([(x + u, v) for u, v in section], lay.slotBottom, lay.slotTop, 'z'))
+        if detailed:
+            for z in lay.onrampZs:
+                prisms.append(_prism([(x + u, z + v) for u, v in ramp],
+                                     lay.slotFloor, lay.slotFloor + ONRAMP_LENGTH, 'y'))
+    return BackPreview(back, _mesh(prisms))
+
+
+def _slot_section(lay):
+    # the part of the slot profile that is inside the back, as a convex polygon
+    right = [(x, lay.slotFloor + y) for x, y in slot_profile(lay.params.dotRadius)[1:5]]
+    return [(-x, y) for x, y in reversed(right)] + right
+
+
+def _slot_box(lay):
+    r, floor = lay.params.dotRadius, lay.slotFloor
+    return [(-r, floor + SLOT_DEPTH), (-r, floor), (r, floor), (r, floor + SLOT_DEPTH)]
+
+
+def _circle(radius, sides):
+    return [(radius * math.cos(2 * math.pi * i / sides), radius * math.sin(2 * math.pi * i / sides))
+            for i in range(sides)]
+
+
+def _prism(polygon, low, high, axis):
+    """Vertices and triangles of a convex polygon extruded from low to high.
+
+    The polygon is in the (x, y) plane for axis 'z' and the (x, z) plane for
+    axis 'y', and runs counter-clockwise seen from +z (or +y).
+    """
+    def point(u, v, w):
+        return (u, v, w) if axis == 'z' else (u, w, v)
+
+    n = len(polygon)
+    vertices = [point(u, v, low) for u, v in polygon] + [point(u, v, high) for u, v in polygon]
+    triangles = []
+    for i in range(n):
+        j = (i + 1) % n
+        triangles += [(i, j, n + j), (i, n + j, n + i)]
+    for i in range(1, n - 1):
+        triangles += [(0, i + 1, i), (n, n + i, n + i + 1)]
+
+    if axis == 'y':
+        # (x, z, y) is a mirror image, so the winding flips
+        triangles = [(a, c, b) for a, b, c in triangles]
+    return vertices, triangles
+
+
+def _mesh(prisms):
+    coordinates, indices = [], []
+    for vertices, triangles in prisms:
+        offset = len(coordinates) // 3
+        for vertex in vertices:
+            coordinates.extend(vertex)
+        for triangle in triangles:
+            indices.extend(index + offset for index in triangle)
+    return PreviewMesh(coordinates, indices)
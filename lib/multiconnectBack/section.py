@@ -0,0 +1,36 @@
+"""Cross-sections of the back and of the slot tools in the plane of the slot sketch."""
+
+from .params import slot_profile
+from .polygons import trapezoids, union
+
+
+def slot_polygons(lay):
+    """The cross-section of every slot tool in model x/y, counter-clockwise.
+
+    Each slot is slot_profile() mirrored about the slot centre.
+    """
+    chain = slot_profile(lay.params.dotRadius)[1:7]   # right side, floor corner to top corner
+    floor = lay.slotFloor
+    return [[(xk - x, floor + y) for x, y in chain[::-1]] + [(xk + x, floor + y) for x, y in chain]
+            for xk in lay.slotXs]
+
+
+def slot_outlines(lay):
+    """Outlines of all slot tools in model x/y, merged where the tools overlap.
+
+    The wide band at the top of the profile is what makes neighbouring tools
+    overlap; when it does, the result is a single comb shaped outline.
+    """
+    return union(slot_polygons(lay))
+
+
+def back_section(lay):
+    """The cross-section of the back where its notches are straight, as polygons.trapezoids.
+
+    It is the back's width by its thickness less the slot tools; the outlines
+    are polygons.outlines of it. Empty for tools only.
+    """
+    if lay.params.toolsOnly:
+        return []
+    w, t = lay.backWidth / 2, lay.params.backThickness
+    return trapezoids([[(-w, 0), (w, 0), (w, t), (-w, t)]], slot_polygons(lay), 'difference')
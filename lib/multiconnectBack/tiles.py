@@ -0,0 +1,72 @@
+"""Splitting a back that is too wide for the printer bed into tiles.
+
+A back is cut between slots, halfway from one slot to the next, into tiles
+that are backs of their own: each is a whole number of slot spacings wide,
+so the slots of tiles laid side by side keep their spacing across the seams.
+A back wider than its slots has a margin, less than one spacing, at each
+end; the first and last tile are that much wider, with their slots moved
+away from the end (BackParams.slotOffset), so together the tiles are as wide
+as the back. Nothing in this module needs Fusion or NumPy.
+"""
+
+import collections
+import math
+
+from .params import layout
+
+
+# A tile as a back of its own, and where its centre is along the back it was cut from.
+Tile = collections.namedtuple('Tile', 'params x')
+
+
+def tiles(params, bedWidth, bedDepth=None):
+    """The tiles of a back, as few and as even as will fit on a bedWidth by bedDepth bed.
+
+    A back that fits is a single tile. Tiles can lie either way round on the
+    bed. Raises ValueError when the back is too high for the bed, or the bed
+    too small for a single slot.
+    """
+    bedDepth = bedWidth if bedDepth is None else bedDepth
+    lay = layout(params)
+    spacing = params.distanceBetweenSlots
+
+    # the longest run of slots the bed has room for beside the back's height
+    lengths = [length for length, side in ((bedWidth, bedDepth), (bedDepth, bedWidth))
+               if lay.backHeight <= side + 1e-9]
+    if not lengths:
+        raise ValueError(f'a back {lay.backHeight:g} cm high does not fit on a {bedWidth:g} x {bedDepth:g} cm bed')
+    if lay.backWidth <= max(lengths) + 1e-9:
+        return [Tile(params, 0.0)]
+    perTile = math.floor(max(lengths) / spacing + 1e-9)
+    margin = round((lay.backWidth - lay.slotCount * spacing) / 2, 9)
+    perEndTile = math.floor((max(lengths) - margin) / spacing + 1e-9)
+    if perEndTile < 1:
+        raise ValueError(f'a {bedWidth:g} x {bedDepth:g} cm bed has no room for a slot {spacing:g} cm wide '
+                         f'and the {margin:g} cm margin at the end of the back')
+
+    # as many slots on each tile as the others have, or as near as the end tiles allow
+    count = 2 if lay.slotCount <= 2 * perEndTile else 2 + math.ceil((lay.slotCount - 2 * perEndTile) / perTile)
+    room = [perEndTile] + [perTile] * (count - 2) + [perEndTile]
+    slots = [0] * count
+    for _ in range(lay.slotCount):
+        i = min((i for i in range(count) if slots[i] < room[i]), key=lambda i: slots[i])
+        slots[i] += 1
+
+    result = []
+    left = lay.slotXs[0] - spacing / 2 - margin
+    for i in range(count):
+        ends = (i == 0) + (i == count - 1)
+        width = _width(slots[i], spacing) + margin * ends
+        offset = margin / 2 * ((i == 0) - (i == count - 1))
+        result.append(Tile(params._replace(width=width, slotOffset=offset), left + width / 2))
+        left += width
+    return result
+
+
+def _width(slots, spacing):
+    # the width of a back with that many slots, made a hair wider where
+    # floor(width / spacing) would come out one short
+    width = slots * spacing
+    while math.floor(width / spacing) < slots:
+        width = math.nextafter(width, math.inf)
+    return width
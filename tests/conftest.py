@@ -0,0 +1,25 @@
+"""Puts the add-in's libraries, and the fake adsk package in bench/, on the path.
+
+The headless engines in lib/multiconnectBack are tested as they are; the
+command, and the fusionAddInUtils it uses, are run inside the fake Fusion the
+benchmark uses.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'lib'), os.path.join(ROOT, 'bench')]
+
+
+@pytest.fixture
+def futil():
+    """fusionAddInUtils as the add-in imports it, fresh, in a new fake Fusion."""
+    import adsk.core
+    import adsk.fusion
+    import bench_command_execute as bench
+
+    adsk.core._newApplication(adsk.fusion.Design)
+    return bench.load_addin().futil
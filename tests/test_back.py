@@ -0,0 +1,47 @@
+"""Meshes of the back from back.py are closed shells."""
+
+import numpy as np
+import pytest
+
+import multiconnectBack as mcback
+from multiconnectBack import back, mesh
+
+SIZES = [
+    mcback.BackParams(14.0, 10.0),
+    mcback.BackParams(7.5, 5.0),
+    mcback.BackParams(2.5, 2.5),
+    mcback.BackParams(21.0, 13.3, slotOffset=0.25),
+    mcback.BackParams(14.0, 6.2, onRampEveryXSlots=2),
+    mcback.BackParams(14.0, 10.0, toolsOnly=True),
+]
+
+
+def placed_volume(parts):
+    return sum(mesh.volume(part.mesh) * len(part.offsets) for part in parts)
+
+
+@pytest.mark.parametrize('params', SIZES)
+def test_the_back_mesh_is_closed(params):
+    backMesh = back.back_mesh(params)
+
+    assert mesh.is_closed(backMesh)
+    # faces wound outwards enclose a positive volume
+    assert mesh.volume(backMesh) > 0
+
+
+@pytest.mark.parametrize('params', SIZES)
+def test_the_closed_parts_are_closed_and_make_up_the_back(params):
+    parts = back.back_parts(params, closed=True)
+
+    assert all(mesh.is_closed(part.mesh) for part in parts)
+    assert placed_volume(parts) == pytest.approx(mesh.volume(back.back_mesh(params)), rel=1e-9)
+
+
+def test_a_mesh_with_a_face_missing_or_turned_is_not_closed():
+    backMesh = back.back_mesh(SIZES[0])
+
+    assert not mesh.is_closed(mesh.Mesh(backMesh.vertices, backMesh.faces[1:]))
+    turned = backMesh.faces.copy()
+    turned[0] = turned[0, ::-1]
+    assert not mesh.is_closed(mesh.Mesh(backMesh.vertices, turned))
+    assert not mesh.is_closed(mesh.Mesh(backMesh.vertices, np.concatenate([backMesh.faces, backMesh.faces[:1]])))
@@ -0,0 +1,265 @@
+"""Backs made by the command in the fake Fusion of bench/adsk."""
+
+import adsk.core
+import adsk.fusion
+import pytest
+
+import bench_command_execute as bench
+
+PARAMETRIC_MODES = ('Pattern', 'Single sketch', 'Components')
+
+
+@pytest.fixture
+def addin():
+    app = adsk.core._newApplication(adsk.fusion.Design)
+    entry = bench.load_addin()
+    entry.start()
+    yield app, entry
+    entry.stop()
+
+
+def open_dialog(addin, width, height, mode='Pattern', **inputs):
+    """The command with its dialog filled in, the width and height in mm."""
+    app, entry = addin
+    definition = app.userInterface.commandDefinitions.itemById(entry.CMD_ID)
+    command = definition._createCommand(app.activeProduct.unitsManager)
+    commandInputs = command.commandInputs
+    commandInputs.itemById('width_value_input').value = width / 10
+    commandInputs.itemById('height_value_input').value = height / 10
+    commandInputs.itemById('generation_mode')._select(mode)
+    for id, value in inputs.items():
+        commandInputs.itemById(id).value = value
+    return command
+
+
+def make_back(addin, width, height, mode='Pattern', **inputs):
+    """Run the command once, with the width and height in mm; returns the tag of the back it made."""
+    app, entry = addin
+    command = open_dialog(addin, width, height, mode, **inputs)
+    command.execute._fire(adsk.core.CommandEventArgs(command))
+    app._drain()
+    command.destroy._fire(adsk.core.CommandEventArgs(command))
+    assert not [message for message in app.userInterface._messages if message.startswith('Failed')]
+    return max(backs(addin).values(), key=lambda tag: tag.made)
+
+
+def backs(addin):
+    """{back id: BackTag} of the backs in the active design."""
+    app, entry = addin
+    return {tag.id: tag for tag in (entry.BackTag(**entry.json.loads(attribute.value))
+                                    for attribute in app.activeProduct.findAttributes(entry.ATTRIBUTE_GROUP,
+                                                                                      entry.BACK_ATTRIBUTE))}
+
+
+def sizes(addin, tag):
+    """What the expressions of the features and sketch dimensions of a back work out to now."""
+    app, entry = addin
+    design = app.activeProduct
+    values = []
+    for attribute in design.findAttributes(entry.ATTRIBUTE_GROUP, entry.BACK_ATTRIBUTE):
+        entity = attribute.parent
+        if entry.BackTag(**entry.json.loads(attribute.value)).id != tag.id:
+            continue
+        values += [adsk.fusion._evaluate(text, design._parameterValue) for text in getattr(entity, '_expressions', ())]
+        if isinstance(entity, adsk.fusion.Sketch):
+            values += [dimension.parameter.value for dimension in entity.sketchDimensions]
+    return values
+
+
+@pytest.mark.parametrize('mode', PARAMETRIC_MODES)
+def test_a_new_back_leaves_the_size_of_earlier_backs_alone(addin, mode):
+    first = make_back(addin, 140, 30, mode)
+    firstSizes = sizes(addin, first)
+    assert firstSizes
+
+    make_back(addin, 280, 100, mode)
+
+    assert sizes(addin, first) == pytest.approx(firstSizes)
+
+
+def parameter(addin, name):
+    app, entry = addin
+    return app.activeProduct.userParameters.itemByName(name).value
+
+
+def test_updating_a_back_changes_only_its_own_parameters(addin):
+    first = make_back(addin, 140, 30)
+    second = make_back(addin, 280, 30)
+    firstSizes = sizes(addin, first)
+
+    updated = make_back(addin, 290, 30, update_existing=True)
+
+    assert updated == second
+    assert parameter(addin, 'width' + second.parameterSuffix) == pytest.approx(29.0)
+    assert parameter(addin, 'width' + first.parameterSuffix) == pytest.approx(14.0)
+    assert sizes(addin, first) == pytest.approx(firstSizes)
+
+
+def test_a_back_made_again_takes_over_its_parameters(addin):
+    first = make_back(addin, 140, 30)
+
+    remade = make_back(addin, 140, 100, update_existing=True)
+
+    assert remade.id != first.id and list(backs(addin)) == [remade.id]
+    assert remade.parameterSuffix == first.parameterSuffix
+    assert parameter(addin, 'height' + remade.parameterSuffix) == pytest.approx(10.0)
+
+
+def add_user_feature(addin):
+    app, _ = addin
+    root = app.activeProduct.rootComponent
+    planeInput = root.constructionPlanes.createInput()
+    planeInput.setByOffset(root.xYConstructionPlane, adsk.core.ValueInput.createByReal(1.0))
+    root.constructionPlanes.add(planeInput)
+
+
+def test_making_a_back_again_asks_before_losing_later_features(addin):
+    app, _ = addin
+    first = make_back(addin, 140, 30)
+    add_user_feature(addin)
+
+    app.userInterface._answers = [adsk.core.DialogResults.DialogNo]
+    kept = make_back(addin, 140, 100, update_existing=True)
+    assert len(app.userInterface._messages) == 1
+    assert kept == first and list(backs(addin)) == [first.id]
+
+    remade = make_back(addin, 140, 100, update_existing=True)
+    assert len(app.userInterface._messages) == 2
+    assert list(backs(addin)) == [remade.id] and remade.id != first.id
+
+
+def preview_meshes(addin):
+    app, _ = addin
+    return [list(group) for group in app.activeProduct.rootComponent.customGraphicsGroups]
+
+
+def test_the_preview_is_drawn_without_touching_the_timeline(addin):
+    app, entry = addin
+    design = app.activeProduct
+    command = open_dialog(addin, 140, 30)
+
+    command.validateInputs._fire(adsk.core.ValidateInputsEventArgs(command))
+    command.executePreview._fire(adsk.core.CommandEventArgs(command))
+    meshes = preview_meshes(addin)
+    # the back and the slots
+    assert len(meshes) == 1 and len(meshes[0]) == 2
+    assert design.timeline.count == 0 and list(design.userParameters) == []
+
+    # a changed input draws it again, in place of the one before
+    widthInput = command.commandInputs.itemById('width_value_input')
+    widthInput.value = 28.0
+    command.inputChanged._fire(adsk.core.InputChangedEventArgs(command, widthInput))
+    command.executePreview._fire(adsk.core.CommandEventArgs(command))
+    redrawn = preview_meshes(addin)
+    assert len(redrawn) == 1 and redrawn[0] != meshes[0]
+    assert max(redrawn[0][0]._coordinates._coordinates[::3]) == pytest.approx(14.0)
+
+    # and OK takes it away before making the back
+    command.execute._fire(adsk.core.CommandEventArgs(command))
+    app._drain()
+    command.destroy._fire(adsk.core.CommandEventArgs(command))
+    assert preview_meshes(addin) == [] and len(backs(addin)) == 1
+
+
+def test_the_preview_of_tools_only_has_no_back(addin):
+    command = open_dialog(addin, 140, 30, tools_only=True)
+
+    command.executePreview._fire(adsk.core.CommandEventArgs(command))
+
+    assert len(preview_meshes(addin)) == 1 and len(preview_meshes(addin)[0]) == 1
+
+
+def test_the_dialog_goes_by_the_dot_radius_of_the_design(addin):
+    app, entry = addin
+    app.activeProduct.userParameters.add(entry.paramName, adsk.core.ValueInput.createByReal(0.9), 'cm', '')
+    command = open_dialog(addin, 140, 30)
+
+    command.validateInputs._fire(adsk.core.ValidateInputsEventArgs(command))
+
+    assert entry.dialog_state(command.commandInputs).layout.params.dotRadius == pytest.approx(0.9)
+
+
+def test_a_new_back_leaves_the_shared_settings_as_the_user_set_them(addin):
+    app, entry = addin
+    design = app.activeProduct
+    first = make_back(addin, 140, 30)
+    spacing = design.userParameters.itemByName(entry.distanceBetweenSlotsParm)
+    design.modifyParameters([spacing], [adsk.core.ValueInput.createByString('3 cm')])
+    firstSizes = sizes(addin, first)
+
+    second = make_back(addin, 280, 30)
+
+    assert parameter(addin, entry.distanceBetweenSlotsParm) == pytest.approx(3.0)
+    assert sizes(addin, first) == pytest.approx(firstSizes)
+    # the dialog laid the back out with the design's spacing, as Fusion builds it
+    assert second.slotCount == 9
+    assert parameter(addin, 'slotCount' + second.parameterSuffix) == pytest.approx(9)
+
+
+def cancel(addin):
+    app, entry = addin
+    entry.generation.progressDialog.wasCancelled = True
+
+
+def fail(addin):
+    app, entry = addin
+
+    def broken(op, component, entities):
+        raise RuntimeError('the cut failed')
+    entry.TIMELINE_EMITTERS[entry.mcback.Combine] = broken
+
+
+@pytest.mark.parametrize('stop', [cancel, fail])
+def test_a_back_made_again_stays_when_the_new_one_is_not_finished(addin, stop, monkeypatch):
+    app, entry = addin
+    monkeypatch.setattr(entry, 'TIMELINE_EMITTERS', dict(entry.TIMELINE_EMITTERS))
+    first = make_back(addin, 140, 30)
+    firstSizes = sizes(addin, first)
+    timelineCount = app.activeProduct.timeline.count
+
+    command = open_dialog(addin, 140, 100, update_existing=True)
+    command.execute._fire(adsk.core.CommandEventArgs(command))
+    app._drain(limit=2)
+    stop(addin)
+    app._drain()
+    command.destroy._fire(adsk.core.CommandEventArgs(command))
+
+    assert entry.generation is None
+    assert list(backs(addin)) == [first.id]
+    assert app.activeProduct.timeline.count == timelineCount
+    assert parameter(addin, 'height' + first.parameterSuffix) == pytest.approx(3.0)
+    assert sizes(addin, first) == pytest.approx(firstSizes)
+
+
+def add_batch_rows(command, *sizes):
+    # a row of the batch table per (width, height) in mm, as Add Row makes them
+    inputs = command.commandInputs
+    addRow = inputs.itemById('batch_table').commandInputs.itemById('batch_add')
+    for width, height in sizes:
+        inputs.itemById('width_value_input').value = width / 10
+        inputs.itemById('height_value_input').value = height / 10
+        command.inputChanged._fire(adsk.core.InputChangedEventArgs(command, addRow))
+
+
+def test_a_batch_is_one_timeline_group_of_every_feature_it_made(addin):
+    app, entry = addin
+    timeline = app.activeProduct.timeline
+    make_back(addin, 140, 30)
+    before = timeline.count
+
+    command = open_dialog(addin, 140, 30)
+    add_batch_rows(command, (140, 30), (280, 60), (100, 30))
+    command.execute._fire(adsk.core.CommandEventArgs(command))
+    app._drain()
+    command.destroy._fire(adsk.core.CommandEventArgs(command))
+
+    batchTag = max(backs(addin).values(), key=lambda tag: tag.made)
+    assert batchTag.slotCount == [5, 11, 4]
+    batchEntities = [attribute.parent
+                     for attribute in app.activeProduct.findAttributes(entry.ATTRIBUTE_GROUP, entry.BACK_ATTRIBUTE)
+                     if entry.BackTag(**entry.json.loads(attribute.value)).id == batchTag.id]
+    group, = timeline.timelineGroups
+    assert group.name == '3 Multiconnect Backs'
+    # everything the batch added, slot templates included, and nothing from before
+    assert group._entities == [timeline.item(i).entity for i in range(before, timeline.count)]
+    assert batchEntities and all(entity in group._entities for entity in batchEntities)
@@ -0,0 +1,66 @@
+"""Catalogues made from the command line by batch.py."""
+
+import json
+
+import pytest
+
+from multiconnectBack import batch
+
+
+def test_entries_that_make_no_back_are_reported_and_the_rest_made(tmp_path):
+    entries = [
+        {'name': 'small', 'width': 140, 'height': 30},
+        {'name': 'no height', 'width': 140},
+        {'width': 'wide', 'height': 30},
+        [140, 30],
+        {'name': 'too high', 'width': 140, 'height': 300},
+        {'name': 'small', 'width': 200, 'height': 30},
+    ]
+    manifest = batch.run(entries, str(tmp_path), jobs=1, segments=4, bed=(25.6, 25.6))
+
+    backs = manifest['backs']
+    assert [back['name'] for back in backs] == ['small', 'no height', 'entry 3', 'entry 4', 'too high', 'small']
+    assert 'error' not in backs[0] and (tmp_path / 'small.stl').exists()
+    assert [back['entry'] for back in backs[1:]] == [2, 3, 4, 5, 6]
+    assert 'no height' in backs[1]['error']
+    assert 'not a number' in backs[2]['error']
+    assert 'does not fit' in backs[4]['error']
+    assert 'named' in backs[5]['error']
+
+
+def test_a_json_catalogue_has_to_be_a_list(tmp_path):
+    catalogue = tmp_path / 'catalogue.json'
+    catalogue.write_text(json.dumps({'width': 140, 'height': 30}))
+
+    with pytest.raises(ValueError):
+        batch.read_catalogue(str(catalogue))
+    with pytest.raises(SystemExit):
+        batch.main([str(catalogue), '--out', str(tmp_path / 'backs'), '--no-cache'])
+
+
+def test_main_fails_when_an_entry_does(tmp_path, capsys):
+    catalogue = tmp_path / 'catalogue.json'
+    catalogue.write_text(json.dumps([{'width': 140, 'height': 30}, {'width': 140}]))
+
+    assert batch.main([str(catalogue), '--out', str(tmp_path / 'backs'), '--jobs', '1', '--segments', '4',
+                       '--cache', str(tmp_path / 'cache')]) == 1
+    assert 'entry 2: no height given' in capsys.readouterr().err
+    manifest = json.loads((tmp_path / 'backs' / 'manifest.json').read_text())
+    assert len(manifest['backs']) == 2
+
+
+@pytest.mark.parametrize('fileFormat', ['stl', '3mf'])
+def test_sizes_made_before_come_from_the_cache(tmp_path, fileFormat):
+    entries = [{'name': 'small', 'width': 140, 'height': 30}, {'name': 'wide', 'width': 300, 'height': 30}]
+    cache = str(tmp_path / 'cache')
+
+    first = batch.run(entries, str(tmp_path / 'first'), fileFormat, jobs=1, segments=4, bed=(25.6, 25.6), cache=cache)
+    again = batch.run(entries, str(tmp_path / 'again'), fileFormat, jobs=1, segments=4, bed=(25.6, 25.6), cache=cache)
+
+    assert [back['cached'] for back in first['backs']] == [False, False, False]
+    assert [back['cached'] for back in again['backs']] == [True, True, True]
+    for back in first['backs']:
+        if fileFormat == 'stl':
+            # a zip file has the times it was written in it
+            assert (tmp_path / 'again' / back['file']).read_bytes() == (tmp_path / 'first' / back['file']).read_bytes()
+    assert [back['triangles'] for back in again['backs']] == [back['triangles'] for back in first['backs']]
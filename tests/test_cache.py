@@ -0,0 +1,135 @@
+"""The persistent mesh cache: what is kept, what is evicted and reading it back."""
+
+import os
+
+import numpy as np
+import pytest
+
+import multiconnectBack as mcback
+from multiconnectBack import back, cache, export
+from multiconnectBack.mesh import Mesh
+
+
+def small_mesh(n):
+    # a mesh with n vertices and faces, cheaper to make than a back
+    return Mesh(np.arange(3 * n, dtype=float).reshape(n, 3), np.arange(3 * n).reshape(n, 3) % n)
+
+
+def entry_size(n):
+    # the header, and the vertices and faces of n each
+    return cache.HEADER.itemsize + 2 * cache.ARRAY_HEADER.itemsize + 48 * n
+
+
+def entry_path(meshCache, params):
+    return os.path.join(meshCache.directory, cache.cache_key(params) + cache.SUFFIX)
+
+
+def age(meshCache, params, seconds):
+    # the time a file was last used, set rather than waited for
+    os.utime(entry_path(meshCache, params), (seconds, seconds))
+
+
+def test_a_mesh_is_built_once_and_read_back_mapped(tmp_path):
+    params = mcback.BackParams(5.0, 3.0)
+    built = []
+
+    def build(params, segments):
+        built.append(params)
+        return small_mesh(4)
+
+    first = cache.MeshCache(str(tmp_path)).mesh(params, build=build)
+    reopened = cache.MeshCache(str(tmp_path))
+    again = reopened.mesh(params, build=build)
+
+    assert built == [params]
+    assert isinstance(again.vertices, np.memmap) and isinstance(again.faces, np.memmap)
+    np.testing.assert_array_equal(again.vertices, first.vertices)
+    np.testing.assert_array_equal(again.faces, first.faces)
+    with pytest.raises(ValueError):
+        again.vertices[0, 0] = 1.0
+    assert reopened.stats() == cache.CacheStats(1, 0, 0, 1, entry_size(4))
+
+
+def test_the_least_recently_used_mesh_is_evicted(tmp_path):
+    meshCache = cache.MeshCache(str(tmp_path), maxBytes=2 * entry_size(4))
+    first, second, third = (mcback.BackParams(width, 3.0) for width in (5.0, 7.5, 10.0))
+    meshCache.put(first, small_mesh(4))
+    meshCache.put(second, small_mesh(4))
+    age(meshCache, first, 1000)
+    age(meshCache, second, 2000)
+
+    # using the first makes the second the one used longest ago
+    assert meshCache.get(first) is not None
+    meshCache.put(third, small_mesh(4))
+
+    assert meshCache.get(second) is None
+    assert meshCache.get(first) is not None and meshCache.get(third) is not None
+    assert meshCache.stats().evictions == 1
+    assert meshCache.stats().bytes <= meshCache.maxBytes
+
+
+def test_a_mesh_bigger_than_the_cache_is_kept_until_the_next_one(tmp_path):
+    meshCache = cache.MeshCache(str(tmp_path), maxBytes=entry_size(4))
+    first, second = mcback.BackParams(5.0, 3.0), mcback.BackParams(7.5, 3.0)
+    meshCache.put(first, small_mesh(8))
+    assert meshCache.get(first) is not None
+
+    meshCache.put(second, small_mesh(2))
+    assert meshCache.get(first) is None and meshCache.get(second) is not None
+
+
+def test_the_key_follows_every_parameter_and_the_segments():
+    params = mcback.BackParams(5.0, 3.0)
+
+    assert cache.cache_key(params) == cache.cache_key(mcback.BackParams(5, 3))
+    assert cache.cache_key(params) != cache.cache_key(params._replace(slotOffset=0.5))
+    assert cache.cache_key(params) != cache.cache_key(params, cache.DEFAULT_SEGMENTS + 1)
+
+
+def test_broken_entries_are_misses(tmp_path):
+    meshCache = cache.MeshCache(str(tmp_path))
+    params = mcback.BackParams(5.0, 3.0)
+    meshCache.put(params, small_mesh(4))
+    path = entry_path(meshCache, params)
+    with open(path, 'r+b') as file:
+        file.truncate(entry_size(4) - 8)
+
+    assert meshCache.get(params) is None
+    with open(path, 'wb') as file:
+        file.write(b'not a mesh at all')
+    assert meshCache.get(params) is None
+    assert meshCache.stats().misses == 2
+
+    meshCache.clear()
+    assert meshCache.stats().entries == 0
+
+
+@pytest.mark.parametrize('closed', [False, True])
+def test_the_parts_of_a_back_are_kept(tmp_path, closed):
+    params = mcback.BackParams(14.0, 10.0)
+    made = back.back_parts(params, closed=closed)
+    cache.MeshCache(str(tmp_path)).parts(params, closed=closed)
+
+    reopened = cache.MeshCache(str(tmp_path))
+    kept = reopened.parts(params, closed=closed, build=None)
+
+    assert reopened.stats().hits == 1
+    assert len(kept) == len(made)
+    for keptPart, part in zip(kept, made):
+        np.testing.assert_array_equal(keptPart.mesh.vertices, part.mesh.vertices)
+        np.testing.assert_array_equal(keptPart.mesh.faces, part.mesh.faces)
+        np.testing.assert_array_equal(keptPart.offsets, part.offsets)
+    # the mesh, the parts and the closed parts are apart
+    assert reopened.get(params) is None
+
+
+def test_the_exporters_write_the_same_from_kept_parts(tmp_path):
+    params = mcback.BackParams(14.0, 10.0)
+    meshCache = cache.MeshCache(str(tmp_path / 'cache'))
+    export.write_stl(str(tmp_path / 'made.stl'), params)
+    meshCache.parts(params)
+
+    export.write_stl(str(tmp_path / 'kept.stl'), params, parts=meshCache.parts(params))
+
+    assert meshCache.stats().hits == 1
+    assert (tmp_path / 'kept.stl').read_bytes() == (tmp_path / 'made.stl').read_bytes()
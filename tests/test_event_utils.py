@@ -0,0 +1,132 @@
+"""Event handlers in fusionAddInUtils: their classes, the handlers of a command and dispatch statistics."""
+
+import types
+
+import adsk.core
+import pytest
+
+
+@pytest.fixture
+def events(futil):
+    """event_utils with no handlers or statistics yet."""
+    futil.clear_handlers()
+    futil.event_utils._stats.clear()
+    return futil.event_utils
+
+
+@pytest.fixture
+def definition(events):
+    return adsk.core.Application.get().userInterface.commandDefinitions.addButtonDefinition('testCommand', 'Test', '')
+
+
+@pytest.fixture
+def warnings(futil):
+    """The warnings logged so far."""
+    futil.flush_log()
+    app = adsk.core.Application.get()
+    app._log.clear()
+
+    def logged():
+        futil.flush_log()
+        return [message for level, type, message in app._log
+                if level == adsk.core.LogLevels.WarningLogLevel and type == adsk.core.LogTypes.FileLogType]
+    return logged
+
+
+def test_a_handler_class_is_made_once_per_type_callback_and_name(events):
+    def callback(args):
+        pass
+
+    first = events.add_handler(adsk.core.CustomEvent('first'), callback)
+    second = events.add_handler(adsk.core.CustomEvent('second'), callback)
+    named = events.add_handler(adsk.core.CustomEvent('third'), callback, name='named')
+    command = events.add_handler(adsk.core.CommandEvent('execute'), callback)
+
+    assert first is not second and type(first) is type(second)
+    assert type(named) is not type(first) and type(command) is not type(first)
+    assert isinstance(first, adsk.core.CustomEventHandler) and isinstance(command, adsk.core.CommandEventHandler)
+    assert len(events._handler_classes) == 3
+    assert events._handlers == [first, second, named, command]
+
+    events.clear_handlers()
+    assert events._handlers == [] and events._handler_classes == {}
+
+
+def test_the_handlers_of_a_command_are_kept_until_it_is_released(events, definition):
+    command = definition._createCommand(None)
+    handlers = [events.add_handler(command.execute, lambda args: None, command=command),
+                events.add_handler(command.destroy, lambda args: None, command=command)]
+
+    assert events._command_handlers['testCommand'] == (command, handlers)
+    assert events._handlers == []
+
+    events.release_handlers(command)
+    assert 'testCommand' not in events._command_handlers
+    # releasing it again does nothing
+    events.release_handlers(command)
+    assert events._command_handlers == {}
+
+
+def test_handlers_of_a_command_never_released_are_dropped_with_a_warning(events, definition, warnings):
+    first = definition._createCommand(None)
+    for event in (first.execute, first.destroy, first.inputChanged):
+        events.add_handler(event, lambda args: None, command=first)
+
+    second = definition._createCommand(None)
+    handler = events.add_handler(second.execute, lambda args: None, command=second)
+
+    assert events._command_handlers['testCommand'] == (second, [handler])
+    assert warnings() == ['3 handlers of a previous testCommand command were never released']
+
+
+def test_a_released_command_does_not_warn_the_next(events, definition, warnings):
+    first = definition._createCommand(None)
+    events.add_handler(first.execute, lambda args: None, command=first)
+    events.release_handlers(first)
+    second = definition._createCommand(None)
+    events.add_handler(second.execute, lambda args: None, command=second)
+
+    assert warnings() == []
+
+
+def test_handler_stats_count_every_dispatch_and_bucket_its_time(events, monkeypatch):
+    # perf_counter is read before and after each dispatch, which takes the
+    # next of these many milliseconds
+    durations = iter([0.5, 3, 3, 7000])
+    clock = types.SimpleNamespace(now=0.0, running=False)
+
+    def perf_counter():
+        if clock.running:
+            clock.now += next(durations) / 1000
+        clock.running = not clock.running
+        return clock.now
+
+    monkeypatch.setattr(events, 'time', types.SimpleNamespace(perf_counter=perf_counter))
+
+    def failing(args):
+        raise RuntimeError('failed')
+
+    event = adsk.core.CustomEvent('event')
+    events.add_handler(event, lambda args: None, name='fine')
+    events.add_handler(event, failing)
+    event._fire(adsk.core.CustomEventArgs())
+    event._fire(adsk.core.CustomEventArgs())
+
+    stats = events.handler_stats()
+    assert set(stats) == {'fine', 'failing'}
+    fine, failing = stats['fine'], stats['failing']
+    # a handler that raises is still counted
+    assert (fine.count, failing.count) == (2, 2)
+    assert fine.total == pytest.approx(0.0035) and fine.longest == pytest.approx(0.003)
+    assert failing.total == pytest.approx(7.003) and failing.longest == pytest.approx(7.0)
+
+    buckets = events.LATENCY_BUCKETS_MS
+    assert len(fine.histogram) == len(buckets) + 1
+    assert fine.histogram[buckets.index(1)] == 1 and fine.histogram[buckets.index(5)] == 1
+    # the last bucket is for everything slower than the last bound
+    assert failing.histogram[buckets.index(5)] == 1 and failing.histogram[-1] == 1
+    assert sum(fine.histogram) == sum(failing.histogram) == 2
+
+    events.reset_handler_stats()
+    empty = events.HandlerStats(0, 0.0, 0.0, (0,) * (len(buckets) + 1))
+    assert events.handler_stats() == {'fine': empty, 'failing': empty}
@@ -0,0 +1,102 @@
+"""Binary STL and 3MF files of a back."""
+
+import struct
+import xml.etree.ElementTree as ElementTree
+import zipfile
+
+import numpy as np
+import pytest
+
+import multiconnectBack as mcback
+from multiconnectBack import back, export, mesh
+
+NAMESPACE = {'m': 'http://schemas.microsoft.com/3dmanufacturing/core/2015/02'}
+
+SIZES = [
+    mcback.BackParams(14.0, 10.0),
+    mcback.BackParams(7.5, 5.0),
+    mcback.BackParams(14.0, 10.0, toolsOnly=True),
+]
+
+
+def corners_volume(corners):
+    # the volume inside (n, 3, 3) triangle corners, by the divergence theorem
+    return float(np.einsum('ij,ij->i', corners[:, 0], np.cross(corners[:, 1], corners[:, 2])).sum() / 6)
+
+
+def back_volume_mm3(params):
+    return mesh.volume(back.back_mesh(params)) * export.MM_PER_CM ** 3
+
+
+@pytest.mark.parametrize('params', SIZES)
+def test_stl(tmp_path, params):
+    path = tmp_path / 'back.stl'
+    count = export.write_stl(str(path), params)
+
+    data = path.read_bytes()
+    assert count == sum(len(part.mesh.faces) * len(part.offsets) for part in back.back_parts(params))
+    assert len(data) == 84 + 50 * count
+    assert data[:80].rstrip(b'\0') == export.STL_HEADER
+    assert struct.unpack('<I', data[80:84]) == (count,)
+
+    records = np.frombuffer(data, dtype=export.STL_RECORD, offset=84)
+    assert len(records) == count
+    assert corners_volume(records['corners'].astype(float)) == pytest.approx(back_volume_mm3(params), rel=1e-6)
+    # the normals of the triangles that have an area are unit length and
+    # point the way the corners wind
+    corners = records['corners'].astype(float)
+    wound = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    flat = np.linalg.norm(wound, axis=1) < 1e-9
+    normals = records['normal'].astype(float)[~flat]
+    assert np.allclose(np.linalg.norm(normals, axis=1), 1, atol=1e-5)
+    assert np.all(np.einsum('ij,ij->i', normals, wound[~flat]) > 0)
+
+
+def read_3mf(path):
+    with zipfile.ZipFile(path) as archive:
+        assert {'[Content_Types].xml', '_rels/.rels', '3D/3dmodel.model'} <= set(archive.namelist())
+        return ElementTree.fromstring(archive.read('3D/3dmodel.model'))
+
+
+def object_mesh(element):
+    vertices = np.array([[float(v.get(axis)) for axis in 'xyz']
+                         for v in element.iterfind('m:mesh/m:vertices/m:vertex', NAMESPACE)])
+    faces = np.array([[int(t.get(corner)) for corner in ('v1', 'v2', 'v3')]
+                      for t in element.iterfind('m:mesh/m:triangles/m:triangle', NAMESPACE)])
+    return mesh.Mesh(vertices, faces)
+
+
+@pytest.mark.parametrize('params', SIZES)
+def test_3mf(tmp_path, params):
+    path = tmp_path / 'back.3mf'
+    count = export.write_3mf(str(path), params, name='Test Back')
+    parts = back.back_parts(params, closed=True)
+
+    model = read_3mf(str(path))
+    assert model.get('unit') == 'millimeter'
+    objects = model.findall('m:resources/m:object', NAMESPACE)
+    meshes = {element.get('id'): object_mesh(element) for element in objects
+              if element.find('m:mesh', NAMESPACE) is not None}
+    assemblies = [element for element in objects if element.find('m:components', NAMESPACE) is not None]
+
+    # every part is stored once, as the mesh it is
+    assert len(meshes) == len(parts)
+    assert len({partMesh.vertices.tobytes() + partMesh.faces.tobytes() for partMesh in meshes.values()}) == len(parts)
+    for part, partMesh in zip(parts, meshes.values()):
+        assert np.allclose(partMesh.vertices, part.mesh.vertices * export.MM_PER_CM, rtol=1e-5, atol=1e-4)
+        assert np.array_equal(partMesh.faces, part.mesh.faces)
+
+    # and placed at each of its offsets by one object, the single item of the build
+    assert len(assemblies) == 1 and assemblies[0].get('name') == 'Test Back'
+    components = assemblies[0].findall('m:components/m:component', NAMESPACE)
+    assert len(components) == sum(len(part.offsets) for part in parts)
+    for objectId, part in zip(meshes, parts):
+        placed = [[float(value) for value in component.get('transform').split()[9:]]
+                  for component in components if component.get('objectid') == objectId]
+        assert np.allclose(placed, part.offsets * export.MM_PER_CM, atol=1e-4)
+    items = model.findall('m:build/m:item', NAMESPACE)
+    assert [item.get('objectid') for item in items] == [assemblies[0].get('id')]
+
+    assert count == sum(len(partMesh.faces) * len(part.offsets) for partMesh, part in zip(meshes.values(), parts))
+    placedVolume = sum(mesh.volume(partMesh) * len(part.offsets) for partMesh, part in zip(meshes.values(), parts))
+    assert placedVolume == pytest.approx(back_volume_mm3(params), rel=1e-5)
@@ -0,0 +1,77 @@
+"""Fusion parameter expressions worked out without Fusion."""
+
+import math
+
+import pytest
+
+import multiconnectBack as mcback
+
+
+def test_parameters_are_worked_out_after_those_they_refer_to():
+    values = mcback.resolve({
+        'slotCount': 'floor(backWidth/distanceBetweenSlots)',
+        'backWidth': 'max(width;distanceBetweenSlots)',
+        'width': 14.0,
+        'distanceBetweenSlots': '25 mm',
+    })
+
+    assert values == pytest.approx({'width': 14.0, 'distanceBetweenSlots': 2.5, 'backWidth': 14.0, 'slotCount': 5})
+
+
+def test_bare_numbers_are_in_the_unit_of_their_parameter():
+    values = mcback.resolve({'angle': '90', 'depth': '5 + 1cm'}, units={'angle': 'deg', 'depth': 'mm'})
+
+    assert values == pytest.approx({'angle': math.pi / 2, 'depth': 1.5})
+
+
+@pytest.mark.parametrize('text, value', [
+    ('2 + 3 * 4', 14.0),
+    ('2 ^ 3 ^ 2', 512.0),
+    ('-(1 + 2) * 2', -6.0),
+    ('min(3;1;2) + abs(-2)', 3.0),
+    ('round(PI)', 3.0),
+    ('round(2.5)', 3.0),
+    ('round(3.5)', 4.0),
+    ('round(-2.5)', -2.0),
+    ('1 in', 2.54),
+])
+def test_evaluate(text, value):
+    assert mcback.evaluate(text) == pytest.approx(value)
+
+
+def test_parameters_that_refer_to_each_other_in_a_circle_are_an_error():
+    with pytest.raises(mcback.ExpressionError, match='circle'):
+        mcback.resolve({'a': 'b + 1cm', 'b': 'c * 2', 'c': 'a', 'd': 1.0})
+
+
+def test_a_parameter_that_refers_to_itself_is_an_error():
+    with pytest.raises(mcback.ExpressionError, match='circle'):
+        mcback.resolve({'a': 'a + 1cm'})
+
+
+def test_unknown_parameters_are_an_error_that_names_them():
+    with pytest.raises(mcback.ExpressionError, match='nope, other'):
+        mcback.resolve({'width': 'nope + other', 'height': 2.0})
+    with pytest.raises(mcback.ExpressionError, match='unknown parameters missing'):
+        mcback.evaluate('missing * 2', {'width': 1.0})
+
+
+@pytest.mark.parametrize('text', ['1 +', '(2', 'floor(1;2)', 'nosuch(1)', '1 $ 2', '3 furlong'])
+def test_expressions_that_cant_be_parsed_are_an_error(text):
+    with pytest.raises(mcback.ExpressionError):
+        mcback.evaluate(text)
+
+
+def test_expressions_that_cant_be_worked_out_are_an_error():
+    with pytest.raises(mcback.ExpressionError, match='worked out'):
+        mcback.resolve({'zero': 0.0, 'ratio': '1 / zero'})
+
+
+def test_expression_names():
+    assert mcback.expression_names('floor(backWidth / distanceBetweenSlots) * 2cm + PI') == {
+        'backWidth', 'distanceBetweenSlots'}
+
+
+def test_rename_only_touches_the_parameters_named():
+    assert mcback.rename('max(width;distanceBetweenSlots) + widthX', {'width': 'width_2'}) == (
+        'max(width_2;distanceBetweenSlots) + widthX')
@@ -0,0 +1,110 @@
+"""Logging in fusionAddInUtils: levels, lazy formatting, the ring buffer and when it is written."""
+
+import adsk.core
+import pytest
+
+
+@pytest.fixture
+def logs(futil):
+    """general_utils with nothing buffered or written yet."""
+    futil.general_utils.flush_log()
+    adsk.core.Application.get()._log.clear()
+    return futil.general_utils
+
+
+@pytest.fixture
+def written(logs):
+    """The (level, text) of each write to the Fusion log file so far."""
+    app = adsk.core.Application.get()
+    return lambda: [(level, message) for level, type, message in app._log if type == adsk.core.LogTypes.FileLogType]
+
+
+def test_messages_below_the_level_are_not_buffered(logs):
+    logger = logs.Logger('test', 'warning')
+    logger.debug('debug')
+    logger.info('info')
+    logger.warning('warning')
+
+    assert [record.message for record in logs._buffer] == ['warning']
+    assert not logger.enabled('info') and logger.enabled('warning') and logger.enabled('error')
+
+
+def test_messages_are_formatted_only_when_written(logs, written):
+    class Counted:
+        formatted = 0
+
+        def __str__(self):
+            Counted.formatted += 1
+            return 'counted'
+
+    called = []
+    logger = logs.Logger('test', 'info')
+    logger.debug('%s', Counted())
+    logger.debug(lambda: called.append('debug'))
+    logger.info('%s and %d', Counted(), 2)
+    logger.info(lambda: called.append('info') or 'called')
+
+    assert Counted.formatted == 0 and called == []
+    logs.flush_log()
+    assert Counted.formatted == 1 and called == ['info']
+    assert written() == [(adsk.core.LogLevels.InfoLogLevel, 'counted and 2\ncalled')]
+
+
+def test_a_message_that_cannot_be_formatted_is_still_written(logs, written):
+    logs.Logger('test', 'info').info('%d', 'text')
+    logs.flush_log()
+
+    [(_, message)] = written()
+    assert message.startswith("'%d' ('text',) could not be formatted")
+
+
+def test_the_buffer_is_written_every_hundred_messages(logs, written):
+    logger = logs.Logger('test', 'info')
+    for i in range(logs.LOG_FLUSH_SIZE - 1):
+        logger.info('%d', i)
+    assert written() == [] and len(logs._buffer) == logs.LOG_FLUSH_SIZE - 1
+
+    logger.info('last')
+    assert len(logs._buffer) == 0
+    [(level, message)] = written()
+    assert level == adsk.core.LogLevels.InfoLogLevel
+    assert message.split('\n') == [str(i) for i in range(logs.LOG_FLUSH_SIZE - 1)] + ['last']
+
+
+def test_an_error_writes_the_buffer_at_once(logs, written):
+    logger = logs.Logger('test', 'info')
+    logger.info('before')
+    logger.warning('warned')
+    assert written() == []
+
+    logger.error('failed')
+    assert len(logs._buffer) == 0
+    # consecutive messages of a level are written together, in order
+    assert written() == [(adsk.core.LogLevels.InfoLogLevel, 'before'),
+                         (adsk.core.LogLevels.WarningLogLevel, 'warned'),
+                         (adsk.core.LogLevels.ErrorLogLevel, 'failed')]
+
+
+def test_a_full_buffer_drops_the_oldest_messages_and_says_how_many(logs, written, monkeypatch):
+    # with flushes far apart the ring buffer is what bounds the messages kept
+    monkeypatch.setattr(logs, 'LOG_FLUSH_SIZE', 10 * logs.LOG_BUFFER_SIZE)
+    logger = logs.Logger('test', 'info')
+    for i in range(logs.LOG_BUFFER_SIZE + 5):
+        logger.info('%d', i)
+
+    assert len(logs._buffer) == logs.LOG_BUFFER_SIZE and logs._dropped == 5
+    logs.flush_log()
+    assert logs._dropped == 0
+    (warningLevel, warning), (infoLevel, messages) = written()
+    assert (warningLevel, warning) == (adsk.core.LogLevels.WarningLogLevel, '5 log messages were dropped')
+    assert messages.split('\n') == [str(i) for i in range(5, logs.LOG_BUFFER_SIZE + 5)]
+
+
+def test_module_levels_come_from_the_longest_matching_name(logs, monkeypatch):
+    monkeypatch.setattr(logs, 'LOG_LEVEL', 'warning')
+    monkeypatch.setattr(logs, 'MODULE_LOG_LEVELS', {'commands': 'info', 'commandDialog.entry': 'debug'})
+
+    assert logs.get_logger('addin.commands.commandDialog.entry').level == 'debug'
+    assert logs.get_logger('addin.commands.other').level == 'info'
+    assert logs.get_logger('addin.lib').level == 'warning'
+    assert logs.get_logger('addin.lib') is logs.get_logger('addin.lib')
@@ -0,0 +1,100 @@
+"""What optimize keeps of a back plan, and what it drops."""
+
+import math
+
+import multiconnectBack as mcback
+from multiconnectBack import plan as mcplan
+from multiconnectBack.plan import Combine, Direction, Extrude, Move, Pattern, Revolve, Sketch, const, param
+
+
+def ids(ops):
+    return [op.id for op in ops]
+
+
+def ramp_ops(count):
+    return [
+        Sketch('rampSketch', 'Ramp Sketch', 'xz', (), (((0, 2), const(1)),)),
+        Extrude('ramp', 'rampSketch', const(0.5), 'join', 'slot'),
+        Pattern('ramps', ('ramp',), (Direction('z', count, const(-2.5)),)),
+    ]
+
+
+def test_skip_empty_drops_a_pattern_of_constant_zero_with_what_it_patterns():
+    assert ids(mcplan.skip_empty(ramp_ops(const(0)))) == []
+
+
+def test_skip_empty_keeps_a_parametric_pattern_that_is_zero_for_now():
+    ops = ramp_ops(param('floor(backHeight/distanceBetweenSlots)', 0))
+    assert ids(mcplan.skip_empty(ops)) == ['rampSketch', 'ramp', 'ramps']
+
+
+def test_skip_empty_drops_features_of_constant_zero_size_only():
+    ops = [
+        Sketch('s', 'Profile', 'xy', (((0, 0), (1, 0), (1, 1)),), ()),
+        Extrude('flat', 's', const(0), 'new', 'a'),
+        Extrude('thin', 's', param('thickness', 0), 'new', 'b'),
+        Revolve('none', 's', 'y', const(0), 'new', 'c'),
+    ]
+    assert ids(mcplan.skip_empty(ops)) == ['s', 'thin']
+
+
+def test_drop_noop_moves_keeps_parametric_moves_and_merges_consecutive_ones():
+    ops = [
+        Move('nowhere', 'slot', const(0), const(0), const(0)),
+        Move('edge', 'slot', param('distanceBetweenSlots * (1 - slotCount)/2', 0), const(0), const(0)),
+        Move('up', 'slot', const(0), const(0), const(1)),
+    ]
+    result, renamed = mcplan.drop_noop_moves(ops)
+
+    assert ids(result) == ['edge'] and renamed == {}
+    assert 'slotCount' in result[0].x.text
+    assert result[0].z == const(1)
+
+
+def test_drop_noop_moves_drops_patterns_of_one_and_renames_what_they_stood_for():
+    ops = [
+        Pattern('one', ('slot',), (Direction('y', const(1), const(0)),)),
+        Combine('join', 'back', ('one',), 'cut'),
+    ]
+    result, renamed = mcplan.drop_noop_moves(ops)
+
+    assert renamed == {'one': 'slot'}
+    assert result == [Combine('join', 'back', ('slot',), 'cut')]
+
+
+def test_optimize_folds_the_fixed_parameters_and_keeps_the_rest():
+    lay = mcback.layout(mcback.BackParams(14, 3))
+    plan = mcback.optimize(mcback.back_plan(lay), fixed=('backHeight',))
+    ops = plan.tool + plan.placement + plan.back
+    texts = {expr.text for op in ops for expr in _exprs(op) if expr.text is not None}
+
+    assert not any('backHeight' in text for text in texts)
+    assert 'slotCount' in texts and 'DotRadius' in texts
+    assert plan.result == 'back'
+
+
+def test_optimize_keeps_the_parametric_onramps_of_a_back_too_short_for_them():
+    # an onramp every two slots doesn't fit on the shortest back
+    lay = mcback.layout(mcback.BackParams(14, 2.5, onRampEveryXSlots=2))
+    assert lay.onrampCount == 0
+
+    assert 'ramps' in ids(mcback.optimize(mcback.back_plan(lay)).tool)
+    assert 'ramps' not in ids(mcback.optimize(mcback.back_plan(lay), direct=True).tool)
+
+
+def test_optimize_for_direct_modeling_folds_every_expression_and_mirror():
+    lay = mcback.layout(mcback.BackParams(14, 3))
+    plan = mcback.optimize(mcback.back_plan(lay), direct=True)
+    ops = plan.tool + plan.placement + plan.back
+
+    assert all(expr.text is None for op in ops for expr in _exprs(op))
+    assert not [op for op in ops if isinstance(op, mcplan.Mirror)]
+    assert any(isinstance(op, Revolve) and math.isclose(op.angle.value, 2 * math.pi) for op in ops)
+
+
+def _exprs(value):
+    if isinstance(value, mcback.Expr):
+        yield value
+    elif isinstance(value, tuple):
+        for item in value:
+            yield from _exprs(item)
@@ -0,0 +1,83 @@
+"""Booleans of polygons under nonzero winding."""
+
+import math
+
+import pytest
+
+import multiconnectBack as mcback
+
+
+def square(x0, y0, x1, y1):
+    # counter-clockwise
+    return [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+
+
+def areas(loops):
+    # the signed areas of outlines, largest first
+    return sorted((mcback.polygon_area(loop) for loop in loops), reverse=True)
+
+
+def test_union_of_overlapping_squares():
+    loops = mcback.union([square(0, 0, 2, 2), square(1, 1, 3, 3)])
+
+    assert len(loops) == 1
+    assert sorted(loops[0]) == sorted([(0, 0), (2, 0), (2, 1), (3, 1), (3, 3), (1, 3), (1, 2), (0, 2)])
+    assert areas(loops) == pytest.approx([7.0])
+
+
+def test_union_keeps_apart_what_doesnt_touch():
+    loops = mcback.union([square(0, 0, 1, 1), square(2, 0, 3, 1)])
+
+    assert areas(loops) == pytest.approx([1.0, 1.0])
+
+
+def test_difference_leaves_a_clockwise_hole():
+    loops = mcback.difference([square(0, 0, 4, 4)], [square(1, 1, 2, 2)])
+
+    assert areas(loops) == pytest.approx([16.0, -1.0])
+
+
+def test_difference_cut_across():
+    loops = mcback.difference([square(0, 0, 4, 2)], [square(1, -1, 2, 3)])
+
+    assert areas(loops) == pytest.approx([4.0, 2.0])
+
+
+def test_intersection_of_a_square_and_a_diamond():
+    diamond = [(2, 0), (4, 2), (2, 4), (0, 2)]
+    loops = mcback.intersection([square(0, 0, 4, 4)], [diamond])
+
+    assert areas(loops) == pytest.approx([8.0])
+    assert mcback.intersection([square(0, 0, 1, 1)], [square(2, 2, 3, 3)]) == []
+
+
+def test_a_pentagram_is_filled_in_the_middle():
+    # its middle is wound round twice, which is inside under nonzero winding
+    star = [(math.cos(math.pi / 2 + 4 * math.pi * k / 5), math.sin(math.pi / 2 + 4 * math.pi * k / 5))
+            for k in range(5)]
+    traps = mcback.trapezoids([star])
+    loops = mcback.boolean([star])
+    # the outline of the filled star has its five points and the five crossings
+    assert len(loops) == 1 and len(loops[0]) == 10
+    assert mcback.area(traps) == pytest.approx(mcback.polygon_area(loops[0]))
+    # all of the star, a decagon of the five points and the five crossings at
+    # inner from the middle; under even-odd the middle pentagon would be left out
+    inner = math.cos(2 * math.pi / 5) / math.cos(math.pi / 5)
+    assert mcback.area(traps) == pytest.approx(5 * inner * math.sin(math.pi / 5))
+
+
+def test_windings_add_up():
+    outer = square(0, 0, 4, 4)
+    # a square wound round twice is still inside once
+    assert mcback.area(mcback.trapezoids([outer, outer])) == pytest.approx(16.0)
+    # one running the other way cancels a square out, leaving a hole
+    hole = square(1, 1, 3, 3)[::-1]
+    assert areas(mcback.union([outer, hole])) == pytest.approx([16.0, -4.0])
+    # xor drops where both sets are
+    assert mcback.area(mcback.trapezoids([outer], [square(2, 0, 6, 4)], 'xor')) == pytest.approx(16.0)
+
+
+def test_trapezoids_of_a_band_are_left_to_right_and_apart():
+    traps = mcback.trapezoids([square(0, 0, 5, 1)], [square(1, 0, 2, 1), square(3, 0, 4, 1)], 'difference')
+
+    assert [(trap.bottomLeft, trap.bottomRight) for trap in traps] == [(0, 1), (2, 3), (4, 5)]
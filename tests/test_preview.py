@@ -0,0 +1,53 @@
+"""The cheap meshes of the live preview."""
+
+import pytest
+
+import multiconnectBack as mcback
+
+
+def vertices(mesh):
+    return [tuple(mesh.coordinates[i:i + 3]) for i in range(0, len(mesh.coordinates), 3)]
+
+
+def edge_counts(mesh):
+    # how often every directed edge is used; a closed mesh uses each once, and its reverse once
+    counts = {}
+    triangles = mesh.triangles
+    for i in range(0, len(triangles), 3):
+        a, b, c = triangles[i:i + 3]
+        for edge in ((a, b), (b, c), (c, a)):
+            counts[edge] = counts.get(edge, 0) + 1
+    return counts
+
+
+@pytest.mark.parametrize('width, height', [(14.0, 3.0), (14.0, 10.0), (120.0, 10.0)])
+def test_the_preview_meshes_are_closed_and_in_the_back(width, height):
+    lay = mcback.layout(mcback.BackParams(width, height))
+    preview = mcback.back_preview(lay)
+
+    for mesh in (preview.back, preview.slots):
+        assert len(mesh.coordinates) % 3 == 0 and len(mesh.triangles) % 3 == 0
+        assert 0 <= min(mesh.triangles) and max(mesh.triangles) < len(mesh.coordinates) // 3
+        counts = edge_counts(mesh)
+        assert all(count == 1 and counts.get((b, a)) == 1 for (a, b), count in counts.items())
+
+    xs, ys, zs = zip(*vertices(preview.back))
+    assert (min(xs), max(xs)) == pytest.approx((-lay.backWidth / 2, lay.backWidth / 2))
+    assert (min(ys), max(ys), min(zs), max(zs)) == pytest.approx((0, lay.params.backThickness, 0, lay.backHeight))
+    assert len(preview.back.triangles) == 3 * 12
+
+
+def test_many_slots_are_boxes_without_onramps():
+    lay = mcback.layout(mcback.BackParams(14.0, 10.0))
+    detailed = mcback.back_preview(lay)
+    boxes = mcback.back_preview(lay, maxDetailedSlots=lay.slotCount - 1)
+
+    # a box has 12 triangles; the detailed slots have onramps as well
+    assert len(boxes.slots.triangles) == 3 * 12 * lay.slotCount
+    assert len(detailed.slots.triangles) > len(boxes.slots.triangles)
+
+
+def test_tools_only_has_no_back():
+    preview = mcback.back_preview(mcback.layout(mcback.BackParams(14.0, 10.0, toolsOnly=True)))
+
+    assert preview.back is None and preview.slots.triangles
@@ -0,0 +1,28 @@
+"""The closed form volume and area of a back against a fine mesh of it."""
+
+import pytest
+
+import multiconnectBack as mcback
+from multiconnectBack import back, mesh
+
+SEGMENTS = 256
+
+
+# 14 by 10 and 7.5 by 5 both have an onramp cut by the bottom edge
+@pytest.mark.parametrize('width, height', [(14.0, 10.0), (7.5, 5.0)])
+def test_the_properties_match_a_mesh_of_the_back(width, height):
+    params = mcback.BackParams(width, height)
+    properties = mcback.back_properties(mcback.layout(params))
+    backMesh = back.back_mesh(params, SEGMENTS)
+
+    assert properties.volume == pytest.approx(mesh.volume(backMesh), rel=1e-5)
+    # the mesh's facets make its area a little off that of the curved surfaces
+    assert properties.area == pytest.approx(mesh.surface_area(backMesh), rel=5e-5)
+    for corner, meshCorner in zip(properties.bounds, mesh.bounds(backMesh)):
+        assert corner == pytest.approx(tuple(meshCorner), abs=1e-9)
+
+
+def test_tools_only_have_no_volume_or_area():
+    properties = mcback.back_properties(mcback.layout(mcback.BackParams(14.0, 10.0, toolsOnly=True)))
+
+    assert properties.volume is None and properties.area is None
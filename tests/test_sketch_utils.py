@@ -0,0 +1,93 @@
+"""SketchBuilder in fusionAddInUtils: deferred compute, and what it adds with and without parametric."""
+
+import adsk.core
+import pytest
+
+
+@pytest.fixture
+def sketch(futil):
+    """A new sketch on the XY plane, counting how often it is solved in _solves."""
+    root = adsk.core.Application.get().activeProduct.rootComponent
+    sketch = root.sketches.add(root.xYConstructionPlane)
+    sketch._solves = 0
+
+    def solve():
+        sketch._solves += 1
+    sketch._solve = solve
+    return sketch
+
+
+def test_the_sketch_is_solved_once_when_the_builder_ends(futil, sketch):
+    with futil.SketchBuilder(sketch) as builder:
+        lines = builder.polyline([(0, 0), (1, 0), (1, 1), (0, 1)])
+        builder.circle((0.5, 0.5), 0.2)
+        assert sketch.isComputeDeferred and sketch._solves == 0
+
+    assert len(lines) == 4 and sketch._solves == 1
+    assert not sketch.isComputeDeferred
+
+
+def test_a_builder_inside_another_leaves_the_solve_to_the_outer_one(futil, sketch):
+    with futil.SketchBuilder(sketch) as outer:
+        with futil.SketchBuilder(sketch) as inner:
+            inner.rectangle(0, 0, 1, 1)
+        assert sketch.isComputeDeferred and sketch._solves == 0
+        outer.circle((2, 2), 0.5)
+
+    assert sketch._solves == 1 and not sketch.isComputeDeferred
+
+
+def test_polylines_are_closed_unless_asked_not_to(futil, sketch):
+    points = [(0, 0), (2, 0), (2, 1), (0, 1)]
+    with futil.SketchBuilder(sketch) as builder:
+        closed = builder.polyline(points)
+        open_ = builder.polyline([(x + 5, y) for x, y in points], closed=False)
+        segment = builder.polyline([(10, 0), (11, 0)])
+
+    assert (len(closed), len(open_), len(segment)) == (4, 3, 1)
+    end, start = closed[-1].endSketchPoint.geometry, closed[0].startSketchPoint.geometry
+    assert (end.x, end.y) == (start.x, start.y)
+    # only the closed one makes a profile
+    assert sketch.profiles.count == 1
+
+
+def test_a_parametric_builder_adds_the_dimensions_and_constraints_asked_for(futil, sketch):
+    with futil.SketchBuilder(sketch) as builder:
+        bottom, side, _, _ = builder.rectangle(0, 0, 4, 2)
+        width = builder.distance(bottom.startSketchPoint, bottom.endSketchPoint, 'backWidth', 'horizontal')
+        height = builder.distance(side.startSketchPoint, side.endSketchPoint, 'backHeight', 'vertical')
+        circle = builder.circle((1, 1), 0.25, diameter='dotRadius * 2')
+        point = sketch.sketchPoints.add(adsk.core.Point3D.create(2, 0, 0))
+        constraint = builder.midpoint(point, bottom)
+
+    assert width.parameter.expression == 'backWidth' and height.parameter.expression == 'backHeight'
+    [_, _, diameter] = sketch.sketchDimensions
+    assert diameter.parameter.expression == 'dotRadius * 2'
+    assert circle.radius == 0.25
+    assert constraint == ('midpoint', (point, bottom))
+
+
+def test_a_builder_that_isnt_parametric_adds_only_geometry(futil, sketch):
+    with futil.SketchBuilder(sketch, parametric=False) as builder:
+        bottom, side, _, _ = builder.rectangle(0, 0, 4, 2)
+        width = builder.distance(bottom.startSketchPoint, bottom.endSketchPoint, 'backWidth', 'horizontal')
+        circle = builder.circle((1, 1), 0.25, diameter='dotRadius * 2')
+        point = sketch.sketchPoints.add(adsk.core.Point3D.create(2, 0, 0))
+        constraint = builder.midpoint(point, bottom)
+
+    assert width is None and constraint is None
+    assert sketch.sketchDimensions.count == 0 and sketch.geometricConstraints.count == 0
+    # the geometry is drawn where it belongs all the same
+    assert circle.radius == 0.25 and sketch.sketchCurves.sketchLines.count == 4
+
+
+def test_sketch_geometry_is_counted_in_the_open_span(futil, sketch):
+    futil.enable_tracing()
+    with futil.span('sketch') as span:
+        with futil.SketchBuilder(sketch) as builder:
+            builder.polyline([(0, 0), (1, 0), (1, 1)])
+            lines = builder.rectangle(0, 0, 1, 1)
+            builder.circle((0.5, 0.5), 0.1, diameter='1 mm')
+            builder.distance(lines[0].startSketchPoint, lines[0].endSketchPoint, '1 cm')
+
+    assert (span.counters['sketch_lines'], span.counters['sketch_dimensions']) == (7, 2)
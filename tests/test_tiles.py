@@ -0,0 +1,47 @@
+"""Backs split into tiles for the printer bed."""
+
+import pytest
+
+import multiconnectBack as mcback
+
+BED = 25.6
+
+
+def slot_positions(params, pieces):
+    # where the slots of the tiles are along the back
+    return [tile.x + x for tile in pieces for x in mcback.layout(tile.params).slotXs]
+
+
+@pytest.mark.parametrize('width', [28.0, 29.9, 51.3, 100.0, 200.0])
+def test_the_tiles_are_as_wide_as_the_back(width):
+    params = mcback.BackParams(width, 3.0)
+    pieces = mcback.tiles(params, BED)
+
+    assert len(pieces) > 1
+    assert sum(mcback.layout(tile.params).backWidth for tile in pieces) == pytest.approx(
+        mcback.layout(params).backWidth)
+
+
+@pytest.mark.parametrize('width', [28.0, 29.9, 51.3, 100.0, 200.0])
+def test_the_tiles_fit_on_the_bed_and_keep_the_slots_where_they_were(width):
+    params = mcback.BackParams(width, 3.0)
+    lay = mcback.layout(params)
+    pieces = mcback.tiles(params, BED)
+
+    assert all(mcback.layout(tile.params).backWidth <= BED + 1e-9 for tile in pieces)
+    assert slot_positions(params, pieces) == pytest.approx(list(lay.slotXs))
+    # the tiles abut, from one end of the back to the other
+    edges = [(tile.x - mcback.layout(tile.params).backWidth / 2, tile.x + mcback.layout(tile.params).backWidth / 2)
+             for tile in pieces]
+    assert edges[0][0] == pytest.approx(-lay.backWidth / 2) and edges[-1][1] == pytest.approx(lay.backWidth / 2)
+    assert all(right == pytest.approx(left) for (_, right), (left, _) in zip(edges, edges[1:]))
+
+
+def test_a_back_that_fits_is_one_tile():
+    params = mcback.BackParams(14.0, 3.0)
+    assert mcback.tiles(params, BED) == [mcback.Tile(params, 0.0)]
+
+
+def test_a_back_too_high_for_the_bed_is_an_error():
+    with pytest.raises(ValueError):
+        mcback.tiles(mcback.BackParams(14.0, 30.0), BED)
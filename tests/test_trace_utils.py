@@ -0,0 +1,112 @@
+"""Span tracing in fusionAddInUtils: nesting, counters, API calls and the files written."""
+
+import json
+import sys
+
+import adsk.core
+import pytest
+
+
+def test_spans_do_nothing_while_tracing_is_off(futil):
+    with futil.span('nothing') as nothing:
+        futil.count('things')
+
+    assert nothing is None and futil.open_span('nothing') is None
+    assert futil.traces() == []
+
+
+def test_spans_nest_and_counters_add_up_to_the_root(futil):
+    futil.enable_tracing()
+    with futil.span('outer', size=3) as outer:
+        with futil.span('first') as first:
+            futil.count('things', 2)
+        with futil.span('second') as second:
+            futil.count('things')
+            futil.count('others')
+        futil.count('others')
+    futil.count('outside')
+
+    assert [child.name for child in outer.children] == ['first', 'second']
+    assert first.parent is outer and second.root is outer and outer.args == {'size': 3}
+    assert first.counters == {'things': 2}
+    assert second.counters == {'things': 1, 'others': 1}
+    assert outer.counters == {'things': 3, 'others': 2}
+    assert outer.start <= first.start <= first.end <= second.start <= second.end <= outer.end
+    # only the root makes a trace
+    assert futil.traces() == [outer]
+
+
+def test_an_open_span_gathers_spans_until_it_is_closed(futil):
+    futil.enable_tracing()
+    run = futil.open_span('run')
+    for step in range(3):
+        with futil.span('step', parent=run, step=step):
+            futil.count('chunks')
+    assert futil.traces() == []
+
+    futil.close_span(run)
+    futil.close_span(run)
+
+    assert [child.args['step'] for child in run.children] == [0, 1, 2]
+    assert run.counters == {'chunks': 3} and futil.traces() == [run]
+
+
+def test_api_calls_are_counted_once_per_call_from_outside_the_api(futil):
+    futil.enable_tracing()
+    with futil.span('calls') as calls:
+        for _ in range(4):
+            adsk.core.ValueInput.createByReal(1.0)
+
+    assert calls.counters['api_calls'] == 4
+
+
+def test_a_profiler_set_before_is_set_back(futil):
+    def profiler(frame, event, arg):
+        pass
+
+    futil.enable_tracing()
+    previous = sys.getprofile()
+    sys.setprofile(profiler)
+    try:
+        with futil.span('outer'):
+            with futil.span('inner'):
+                assert sys.getprofile() is not profiler
+        assert sys.getprofile() is profiler
+    finally:
+        sys.setprofile(previous)
+
+
+def test_chrome_traces(futil, tmp_path):
+    futil.enable_tracing(str(tmp_path), 'chrome')
+    with futil.span('outer', size=3):
+        with futil.span('inner'):
+            futil.count('things', 2)
+
+    path, = tmp_path.iterdir()
+    assert path.name.startswith('outer-') and path.name.endswith('.chrome.json')
+    trace = json.loads(path.read_text())
+    outer, inner = trace['traceEvents']
+    assert (outer['name'], inner['name']) == ('outer', 'inner')
+    assert {event['ph'] for event in trace['traceEvents']} == {'X'}
+    assert outer['args'] == {'size': 3, 'things': 2} and inner['args'] == {'things': 2}
+    # times in microseconds, the inner span within the outer one
+    assert outer['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+
+
+def test_json_traces_are_trees(futil, tmp_path):
+    futil.enable_tracing(str(tmp_path))
+    with futil.span('outer'):
+        with futil.span('inner'):
+            futil.count('things')
+
+    path, = tmp_path.iterdir()
+    tree = json.loads(path.read_text())
+    assert tree['name'] == 'outer' and tree['start_ms'] == 0 and tree['counters'] == {'things': 1}
+    inner, = tree['children']
+    assert inner['name'] == 'inner' and inner['children'] == []
+    assert inner['start_ms'] + inner['duration_ms'] <= tree['duration_ms'] + 1e-3
+
+
+def test_unknown_trace_formats_are_refused(futil):
+    with pytest.raises(ValueError):
+        futil.enable_tracing(format='xml')